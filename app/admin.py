@@ -1,30 +1,67 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import Category, Product, Cart, CartItem, Cliente
+from django.db.models import Q
+from .api.v1.filters import search_products
+from .core.admin import LargeTableAdmin
+from .core.authentication import update_users
+from .models import Category, Product, Cart, CartItem, Cliente, OutboxEvent, Payment
 
 # Register your models here.
+# As listagens carregam as FKs mostradas com select_related (nada de N+1), as FKs
+# usam autocomplete/raw id (nada de <select> com a tabela inteira) e as buscas
+# usam só lookups com índice: prefixo (LIKE 'x%'), igualdade ou a busca textual.
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(LargeTableAdmin):
     list_display = ("name", "description")
-    search_fields = ("name",)
-    list_filter = ("name",)
+    # istartswith: índice em UPPER(name) (text_pattern_ops) no Postgres
+    search_fields = ("^name",)
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
-    list_display = ("name", "price", "stock", "category")
-    search_fields = ("name", "price", "category")
+class ProductAdmin(LargeTableAdmin):
+    list_display = ("name", "sku", "price", "stock", "category")
+    list_select_related = ("category",)
     list_filter = ("category",)
+    autocomplete_fields = ("category",)
+    # a busca de fato está em get_search_results
+    search_fields = ("=sku",)
+
+    def get_search_results(self, request, queryset, search_term):
+        # sku exato ou a busca textual da API (índice GIN no Postgres)
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        matches = search_products(Product.objects.all(), term).values('pk')
+        return queryset.filter(Q(sku=term) | Q(pk__in=matches)), False
 
 @admin.register(Cart)
-class CartAdmin(admin.ModelAdmin):
-    list_display = ("cliente",)
-    search_fields = ("cliente",)
+class CartAdmin(LargeTableAdmin):
+    list_display = ("__str__", "item_count", "subtotal", "updated_at")
+    list_select_related = ("cliente__user",)
+    raw_id_fields = ("cliente",)
+    search_fields = ("cliente__user__username__startswith",)
 
 @admin.register(CartItem)
-class CartItemAdmin(admin.ModelAdmin):
+class CartItemAdmin(LargeTableAdmin):
     list_display = ("cart", "product", "quantity")
+    list_select_related = ("cart__cliente__user", "product")
+    autocomplete_fields = ("cart", "product")
+    search_fields = ("product__sku__exact", "cart__cliente__user__username__startswith")
+
+@admin.register(Payment)
+class PaymentAdmin(LargeTableAdmin):
+    list_display = ("id", "cart", "payment_method", "status", "amount", "paid_at", "created_at")
+    list_select_related = ("cart__cliente__user",)
+    list_filter = ("status", "payment_method")
+    autocomplete_fields = ("cart",)
+    search_fields = ("cart__cliente__user__username__startswith",)
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(LargeTableAdmin):
+    list_display = ("id", "topic", "status", "attempts", "available_at", "processed_at")
+    list_filter = ("status", "topic")
+    readonly_fields = ("claimed_by", "last_error", "created_at", "processed_at")
 
 
 class ClienteInline(admin.StackedInline):
@@ -34,6 +71,13 @@ class ClienteInline(admin.StackedInline):
 
 class UserAdmin(BaseUserAdmin):
     inlines = (ClienteInline,)
+    actions = ("deactivate_users",)
+
+    @admin.action(description="Desativar os usuários selecionados")
+    def deactivate_users(self, request, queryset):
+        # update em lote que também revoga os tokens já emitidos (descarta os snapshots)
+        updated = update_users(queryset, is_active=False)
+        self.message_user(request, f"{updated} usuário(s) desativado(s).")
 
 admin.site.unregister(User)
-admin.site.register(User, UserAdmin)
\ No newline at end of file
+admin.site.register(User, UserAdmin)
@@ -0,0 +1,160 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404, HttpResponse
+from django.views import View
+from rest_framework import exceptions
+from rest_framework.filters import OrderingFilter
+from rest_framework.request import Request
+
+from app.core.authentication import CachedJWTAuthentication
+from app.core.eager import eager_load
+from app.core.fastread import ValuesReader
+from app.core.metrics import timed
+from app.core.renderers import FastJSONRenderer
+from app.models import Cart, Category, Product
+from .filters import ProductFilterBackend
+from .mixins import aresolve_cart_id
+from .pagination import AsyncPageNumberPagination, KeysetPagination
+from .serializers import CartSerializer, CategorySerializer, ProductSerializer
+from .viewsets import ProductViewSet
+
+# Versões assíncronas (ORM async do Django) das leituras mais quentes, em /api/v1/async/.
+# Rodando sob ASGI (ver README) não ocupam uma thread por request enquanto
+# esperam o banco. Mesma autenticação (JWT com snapshot em cache), mesmos filtros,
+# mesma paginação e o mesmo JSON das rotas síncronas; só respondem JSON e só GET.
+
+
+class AsyncReadMixin:
+    # autenticação, renderização e erros das views abaixo; cada view concreta
+    # (AsyncListView, AsyncDetailView) define o get_data() que monta a resposta
+    http_method_names = ['get', 'head', 'options']
+    authenticator = CachedJWTAuthentication()
+    renderer = FastJSONRenderer()
+    serializer_class = None
+
+    async def get(self, request, *args, **kwargs):
+        request = Request(request)
+        try:
+            await self.authenticate(request)
+            data = await self.get_data(request, *args, **kwargs)
+        except Http404:
+            return self.error_response(exceptions.NotFound())
+        except exceptions.APIException as exc:
+            return self.error_response(exc)
+        with timed('render'):
+            content = self.renderer.render(data)
+        return HttpResponse(content, content_type=self.renderer.media_type)
+
+    async def authenticate(self, request):
+        result = await self.authenticator.aauthenticate(request)
+        if result is None:
+            raise exceptions.NotAuthenticated()
+        request.user, request.auth = result
+
+    def error_response(self, exc):
+        # mesmo formato do exception handler do DRF
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+        response = HttpResponse(self.renderer.render(data), status=exc.status_code,
+                                content_type=self.renderer.media_type)
+        if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+            response.status_code = 401
+            response['WWW-Authenticate'] = self.authenticator.authenticate_header(None)
+        return response
+
+    def get_reader(self):
+        if not getattr(settings, 'FAST_READ_ENABLED', True):
+            return None
+        return ValuesReader.for_serializer(self.serializer_class, self.request)
+
+    async def serialize(self, request, rows, many):
+        # caminho normal do serializer (sem ValuesReader): roda numa thread, já que
+        # o serializer pode acessar relações e o ORM síncrono não roda no event loop
+        serializer_class = self.serializer_class
+        return await sync_to_async(
+            lambda: serializer_class(rows, many=many, context={'request': request}).data)()
+
+
+class AsyncListView(AsyncReadMixin, View):
+    pagination_class = None
+    filter_backends = ()
+
+    def get_queryset(self, request):
+        return self.queryset.all()
+
+    async def get_data(self, request, *args, **kwargs):
+        queryset = self.get_queryset(request)
+        for backend in self.filter_backends:
+            queryset = backend().filter_queryset(request, queryset, self)
+
+        paginator = self.pagination_class() if self.pagination_class else None
+        reader = self.get_reader()
+        if reader is not None:
+            extra = getattr(paginator, 'ordering', ()) if paginator is not None else ()
+            queryset = reader.values(queryset, extra)
+        else:
+            queryset = eager_load(queryset, self.serializer_class(context={'request': request}))
+
+        rows = await paginator.apaginate_queryset(queryset, request, self) if paginator is not None else None
+        paginated = rows is not None
+        if not paginated:
+            rows = [row async for row in queryset]
+
+        with timed('serialize'):
+            data = await reader.abuild(rows) if reader is not None else await self.serialize(request, rows, True)
+        if paginated:
+            return paginator.get_paginated_response(data).data
+        return data
+
+
+class AsyncDetailView(AsyncReadMixin, View):
+    def get_queryset(self, request, **kwargs):
+        return self.queryset.filter(pk=kwargs['pk'])
+
+    async def get_data(self, request, *args, **kwargs):
+        reader = self.get_reader()
+        try:
+            queryset = self.get_queryset(request, **kwargs)
+            if reader is not None:
+                rows = [row async for row in reader.values(queryset)[:1]]
+            else:
+                queryset = eager_load(queryset, self.serializer_class(context={'request': request}))
+                rows = [row async for row in queryset[:1]]
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if not rows:
+            raise Http404
+        with timed('serialize'):
+            if reader is not None:
+                return (await reader.abuild(rows))[0]
+            return await self.serialize(request, rows[0], False)
+
+
+class ProductListView(AsyncListView):
+    queryset = Product.objects.all()
+    serializer_class = ProductSerializer
+    pagination_class = KeysetPagination
+    filter_backends = (ProductFilterBackend, OrderingFilter)
+    ordering_fields = ProductViewSet.ordering_fields
+
+
+class ProductDetailView(AsyncDetailView):
+    queryset = Product.objects.all()
+    serializer_class = ProductSerializer
+
+
+class CategoryListView(AsyncListView):
+    queryset = Category.objects.all()
+    serializer_class = CategorySerializer
+    pagination_class = AsyncPageNumberPagination
+
+
+class CurrentCartView(AsyncDetailView):
+    serializer_class = CartSerializer
+
+    async def get_data(self, request, *args, **kwargs):
+        kwargs['pk'] = await aresolve_cart_id(request)
+        return await super().get_data(request, *args, **kwargs)
+
+    def get_queryset(self, request, **kwargs):
+        return Cart.objects.filter(pk=kwargs['pk'])
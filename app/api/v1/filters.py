@@ -0,0 +1,104 @@
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Count, Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from app.models import Product
+
+# Busca e filtros de produtos.
+# No Postgres a busca textual usa o mesmo SearchVector do índice GIN
+# (Product.search_vector()), então é resolvida pelo índice; em outros bancos
+# (SQLite nos testes) cai num icontains por palavra.
+
+TRUE_VALUES = ('1', 'true', 'yes', 'sim')
+FALSE_VALUES = ('0', 'false', 'no', 'nao', 'não')
+
+
+def _decimal(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValidationError({name: 'Informe um número.'})
+
+
+def _ids(params, name):
+    raw = params.get(name)
+    if not raw:
+        return None
+    try:
+        return [int(value) for value in raw.split(',') if value]
+    except ValueError:
+        raise ValidationError({name: 'Informe ids separados por vírgula.'})
+
+
+def search_products(queryset, term, rank=False):
+    if connection.vendor == 'postgresql':
+        vector = Product.search_vector()
+        query = SearchQuery(term, config=Product.SEARCH_CONFIG, search_type='websearch')
+        queryset = queryset.annotate(search=vector).filter(search=query)
+        if rank:
+            queryset = queryset.annotate(rank=SearchRank(vector, query)).order_by('-rank', 'id')
+        return queryset
+
+    for word in term.split():
+        queryset = queryset.filter(Q(name__icontains=word) | Q(description__icontains=word))
+    return queryset
+
+
+class ProductFilterBackend(BaseFilterBackend):
+    """?search=, ?category=1,2, ?min_price=, ?max_price=, ?in_stock=true"""
+
+    def filter_queryset(self, request, queryset, view, exclude=()):
+        params = request.query_params
+
+        term = params.get('search', '').strip()
+        if term:
+            # sem ?ordering explícito, os resultados vêm por relevância
+            queryset = search_products(queryset, term, rank='ordering' not in params)
+
+        categories = _ids(params, 'category')
+        if categories and 'category' not in exclude:
+            queryset = queryset.filter(category_id__in=categories)
+
+        min_price, max_price = _decimal(params, 'min_price'), _decimal(params, 'max_price')
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+
+        in_stock = params.get('in_stock', '').lower()
+        if in_stock in TRUE_VALUES:
+            queryset = queryset.filter(stock__gt=0)
+        elif in_stock in FALSE_VALUES:
+            queryset = queryset.filter(stock__lte=0)
+        elif in_stock:
+            raise ValidationError({'in_stock': 'Use true ou false.'})
+
+        return queryset
+
+    def get_schema_operation_parameters(self, view):
+        def param(name, description, schema):
+            return {'name': name, 'required': False, 'in': 'query', 'description': description, 'schema': schema}
+
+        return [
+            param('search', 'Busca textual em nome e descrição.', {'type': 'string'}),
+            param('category', 'Ids de categoria separados por vírgula.', {'type': 'string'}),
+            param('min_price', 'Preço mínimo.', {'type': 'number'}),
+            param('max_price', 'Preço máximo.', {'type': 'number'}),
+            param('in_stock', 'Somente produtos com (true) ou sem (false) estoque.', {'type': 'boolean'}),
+        ]
+
+
+def category_facets(queryset):
+    # contagem por categoria em uma única query agregada
+    return [
+        {'id': row['category_id'], 'name': row['category__name'], 'count': row['count']}
+        for row in queryset.order_by().values('category_id', 'category__name')
+        .annotate(count=Count('id')).order_by('-count', 'category__name')
+    ]
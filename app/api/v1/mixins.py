@@ -0,0 +1,101 @@
+import csv
+
+from django.http import StreamingHttpResponse
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema
+from rest_framework.decorators import action
+from rest_framework.exceptions import UnsupportedMediaType, ValidationError
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+from app.catalog_io import CONTENT_TYPES, CSV, FORMATS, read_rows
+from app.models import Cart, Cliente
+
+# Mixins compartilhados pelas viewsets da v1
+
+
+def _token_cart_id(request):
+    token = getattr(request, 'auth', None)
+    if token is not None and hasattr(token, 'get'):
+        return token.get('cart_id')
+    return None
+
+
+def resolve_cart_id(request):
+    # 1) claim 'cart_id' do JWT (emitido no login): nenhuma query
+    cart_id = _token_cart_id(request)
+    if cart_id:
+        return cart_id
+
+    # 2) tokens antigos / outras autenticações: uma query só de id
+    user = request.user
+    cart_id = Cart.objects.filter(cliente__user_id=user.pk).values_list('id', flat=True).first()
+    if cart_id is not None:
+        return cart_id
+
+    # 3) usuários anteriores à criação do carrinho no cadastro
+    cliente, _ = Cliente.objects.get_or_create(user=user)
+    cart, _ = Cart.objects.get_or_create(cliente=cliente)
+    return cart.id
+
+
+async def aresolve_cart_id(request):
+    # mesma ordem do resolve_cart_id, pelo ORM assíncrono
+    cart_id = _token_cart_id(request)
+    if cart_id:
+        return cart_id
+
+    user = request.user
+    cart_id = await Cart.objects.filter(cliente__user_id=user.pk).values_list('id', flat=True).afirst()
+    if cart_id is not None:
+        return cart_id
+
+    cliente, _ = await Cliente.objects.aget_or_create(user=user)
+    cart, _ = await Cart.objects.aget_or_create(cliente=cliente)
+    return cart.id
+
+
+class CurrentCartMixin:
+    # Resolve o carrinho do usuário uma única vez por request e reaproveita
+
+    def get_cart_id(self):
+        request = self.request._request
+        if not hasattr(request, 'cart_id'):
+            request.cart_id = resolve_cart_id(self.request)
+        return request.cart_id
+
+
+class CatalogTransferMixin:
+    # Importação (POST com o arquivo no corpo, text/csv ou application/x-ndjson)
+    # e exportação em streaming; as funções ficam em app/catalog_io.py
+    catalog_importer = None
+    catalog_exporter = None
+
+    @extend_schema(request={media: {'type': 'string', 'format': 'binary'} for media in CONTENT_TYPES.values()},
+                   responses={200: OpenApiTypes.OBJECT})
+    @action(detail=False, methods=['post'], url_path='import', permission_classes=[IsAdminUser])
+    def import_file(self, request):
+        content_type = request.content_type.split(';')[0].strip()
+        formats = {media: fmt for fmt, media in CONTENT_TYPES.items()}
+        formats['application/jsonl'] = formats['application/x-ndjson']
+        if content_type not in formats:
+            raise UnsupportedMediaType(content_type)
+        # lê o corpo linha a linha direto do stream, sem passar pelos parsers
+        rows = read_rows(request._request, formats[content_type])
+        try:
+            result = self.catalog_importer(rows)
+        except (ValueError, csv.Error) as exc:
+            # os lotes anteriores ao erro já foram gravados
+            raise ValidationError({'detail': f'Arquivo inválido: {exc}'})
+        return Response(result.as_dict())
+
+    @extend_schema(parameters=[OpenApiParameter('type', enum=FORMATS, default=CSV)],
+                   responses={200: {'type': 'string', 'format': 'binary'}})
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        fmt = request.query_params.get('type', CSV)
+        if fmt not in FORMATS:
+            raise ValidationError({'type': f'Use um de: {", ".join(FORMATS)}.'})
+        response = StreamingHttpResponse(self.catalog_exporter(fmt), content_type=CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="{self.basename}.{fmt}"'
+        return response
@@ -0,0 +1,203 @@
+from base64 import b64decode, b64encode
+from datetime import datetime
+
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Paginação: por padrão continua por número de página (com count), mas o cliente
+# pode optar pelo modo keyset com ?pagination=cursor (ou mandando um ?cursor=...).
+# No modo keyset não há COUNT(*) nem OFFSET: cada página é um
+# WHERE (created_at, id) > (último visto) ORDER BY created_at, id LIMIT n,
+# que usa o índice parcial (created_at, id) WHERE is_deleted = false e custa o mesmo em qualquer profundidade.
+# O cursor só conhece essa ordem: ?ordering= e ?search= (ordenado por relevância)
+# junto com o modo keyset dão 400, em vez de serem ignorados em silêncio.
+
+
+class AsyncPaginationMixin:
+    """apaginate_queryset(): a mesma paginação por número de página, mas com o
+    COUNT e a página buscados pelo ORM assíncrono (views de app/api/v1/async_views.py).
+    """
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        paginator = self.django_paginator_class(queryset, page_size)
+        # count é cached_property: preenchido aqui, o Paginator não consulta o banco de novo
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        self.page.object_list = [row async for row in self.page.object_list]
+
+        if paginator.num_pages > 1 and self.template is not None:
+            self.display_page_controls = True
+        return list(self.page)
+
+
+class KnownCountMixin:
+    """Usa o COUNT que a view já tenha feito na request (view.known_count, preenchido
+    pelos validadores do GET condicional) em vez de contar de novo."""
+    known_count = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.known_count = getattr(view, 'known_count', None)
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, queryset, page_size):
+        paginator = Paginator(queryset, page_size)
+        if self.known_count is not None:
+            paginator.count = self.known_count
+        return paginator
+
+
+class CountedPageNumberPagination(KnownCountMixin, PageNumberPagination):
+    pass
+
+
+class AsyncPageNumberPagination(AsyncPaginationMixin, PageNumberPagination):
+    pass
+
+
+class KeysetPagination(KnownCountMixin, AsyncPaginationMixin, PageNumberPagination):
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    ordering = ('created_at', 'id')
+    # parâmetros que mudam a ordem da listagem
+    unordered_params = ('ordering', 'search')
+    invalid_cursor_message = 'Cursor inválido.'
+    unordered_message = 'Não pode ser usado com a paginação por cursor (ordem fixa por created_at, id).'
+
+    def is_keyset(self, request):
+        params = request.query_params
+        keyset = self.cursor_query_param in params or params.get(self.mode_query_param) == 'cursor'
+        conflicts = [name for name in self.unordered_params if keyset and params.get(name)]
+        if conflicts:
+            raise ValidationError({name: self.unordered_message for name in conflicts})
+        return keyset
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.keyset = self.is_keyset(request)
+        if not self.keyset:
+            if not queryset.ordered:
+                queryset = queryset.order_by(*self.ordering)
+            return super().paginate_queryset(queryset, request, view)
+        return self.paginate_keyset(queryset, request)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.keyset = self.is_keyset(request)
+        if not self.keyset:
+            if not queryset.ordered:
+                queryset = queryset.order_by(*self.ordering)
+            return await super().apaginate_queryset(queryset, request, view)
+        queryset, page_size, reverse, position = self.keyset_queryset(queryset, request)
+        rows = [row async for row in queryset[:page_size + 1]]
+        return self.keyset_page(rows, page_size, reverse, position)
+
+    def paginate_keyset(self, queryset, request):
+        queryset, page_size, reverse, position = self.keyset_queryset(queryset, request)
+        return self.keyset_page(list(queryset[:page_size + 1]), page_size, reverse, position)
+
+    def keyset_queryset(self, queryset, request):
+        page_size = self.get_page_size(request)
+        reverse, position = self.decode_cursor(request)
+        field, pk = self.ordering
+
+        if reverse:
+            queryset = queryset.order_by(f'-{field}', f'-{pk}')
+            lookup = 'lt'
+        else:
+            queryset = queryset.order_by(field, pk)
+            lookup = 'gt'
+
+        if position is not None:
+            value, last_pk = position
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}': value})
+                | Q(**{field: value, f'{pk}__{lookup}': last_pk}))
+        return queryset, page_size, reverse, position
+
+    def keyset_page(self, rows, page_size, reverse, position):
+        # rows traz uma linha a mais que a página, para saber se há próxima
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.page_rows = rows
+        return rows
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return False, None
+        try:
+            direction, value, pk = b64decode(token.encode('ascii')).decode('utf-8').split('|')
+            return direction == 'r', (datetime.fromisoformat(value), int(pk))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse):
+        field, pk = self.ordering
+        # as linhas podem ser instâncias ou dicts (leitura via .values())
+        value, row_pk = (row[field], row[pk]) if isinstance(row, dict) else (getattr(row, field), getattr(row, pk))
+        raw = f"{'r' if reverse else 'f'}|{value.isoformat()}|{row_pk}"
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        url = remove_query_param(url, self.mode_query_param)
+        return replace_query_param(url, self.cursor_query_param, b64encode(raw.encode('utf-8')).decode('ascii'))
+
+    def get_next_link(self):
+        if not self.keyset:
+            return super().get_next_link()
+        if not self.has_next or not self.page_rows:
+            return None
+        return self.encode_cursor(self.page_rows[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.keyset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page_rows:
+            return None
+        return self.encode_cursor(self.page_rows[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if not self.keyset:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor da paginação keyset (dispensa o parâmetro page).',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Use "cursor" para a primeira página no modo keyset.',
+                'schema': {'type': 'string', 'enum': ['page', 'cursor']},
+            },
+        ]
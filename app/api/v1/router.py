@@ -1,7 +1,8 @@
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .viewsets import CategoryViewSet, ProductViewSet, CartViewSet, CartItemViewSet, ClienteViewSet, UserCreateAPIView, PaymentViewSet
+from .viewsets import CategoryViewSet, ProductViewSet, CartViewSet, CartItemViewSet, ClienteViewSet, UserCreateAPIView, PaymentViewSet, AuthStatsAPIView, DatabaseStatsAPIView, SalesReportAPIView
 from rest_framework.urlpatterns import format_suffix_patterns
+from .async_views import CategoryListView, CurrentCartView, ProductDetailView, ProductListView
 from .viewsets import CategoryViewSet, ProductViewSet, CartViewSet, CartItemViewSet
 
 # Router: Gera as URLs para as viewsets automaticamente.
@@ -15,8 +16,21 @@ routerv1.register(r'cart-items', CartItemViewSet)
 routerv1.register(r'payments', PaymentViewSet)
 routerv1.register(r'clientes', ClienteViewSet)
 
-urlpatterns = routerv1.urls + [path('register/', UserCreateAPIView.as_view(), name='user-register'),]
+urlpatterns = routerv1.urls + [
+    path('register/', UserCreateAPIView.as_view(), name='user-register'),
+    path('auth/stats/', AuthStatsAPIView.as_view(), name='auth-stats'),
+    path('db/stats/', DatabaseStatsAPIView.as_view(), name='db-stats'),
+    path('reports/sales/', SalesReportAPIView.as_view(), name='sales-report'),
+]
 
 
 #aplica os sufixos de formato (json, xml, yaml etc)
 api_urls = format_suffix_patterns(urlpatterns)
+
+# leituras assíncronas (só JSON, sem sufixo de formato), ver async_views.py
+urlpatterns += [
+    path('async/products/', ProductListView.as_view(), name='async-product-list'),
+    path('async/products/<str:pk>/', ProductDetailView.as_view(), name='async-product-detail'),
+    path('async/categories/', CategoryListView.as_view(), name='async-category-list'),
+    path('async/carts/current/', CurrentCartView.as_view(), name='async-cart-current'),
+]
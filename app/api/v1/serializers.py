@@ -1,19 +1,30 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from app.models import Category, Product, Cart, CartItem, Payment, Cliente
+from app.cart import OPERATIONS, SET, REMOVE
+from app.checkout import snapshot_payment_items
+from app.reports import GROUP_BY
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from app.core.authentication import TOKEN_VERSION_CLAIM, token_version
+from app.core.sparse import SparseFieldsMixin
 
 # Serializer: Traduz dados do modelo para um formato web (ex: JSON) e vice-versa, além de validar os dados de entrada
+# Os serializers dos recursos aceitam ?fields= e ?expand= (app/core/sparse.py): as
+# relações aninhadas saem como id até serem expandidas.
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = '__all__'
 
 
-class CategorySerializer(serializers.ModelSerializer):
-    # para mostrar todos os produtos da categoria fazemos isso:
+class CategorySerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # produtos da categoria (ids; objetos com ?expand=products)
     products = ProductSerializer(many=True, read_only=True)
 
     class Meta:
@@ -21,8 +32,8 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class CartItemSerializer(serializers.ModelSerializer):
-    # para pegar o produto daquele cart, fazemos:
+class CartItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # produto do item (id; objeto com ?expand=product)
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(), source='product', write_only=True
@@ -33,16 +44,44 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'product', 'quantity', 'product_id']
 
 
-class CartSerializer(serializers.ModelSerializer):
-    # para pegar todos os itens daquele cart, fazemos:
+class CartItemChangeSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(default=1)
+    op = serializers.ChoiceField(choices=OPERATIONS, default=SET)
+
+    def validate(self, attrs):
+        if attrs['op'] == SET and attrs['quantity'] < 0:
+            raise serializers.ValidationError({'quantity': 'A quantidade não pode ser negativa.'})
+        return attrs
+
+
+class CartItemBulkSerializer(serializers.Serializer):
+    items = CartItemChangeSerializer(many=True, allow_empty=False, max_length=500)
+
+    def validate_items(self, items):
+        product_ids = [item['product_id'] for item in items]
+        if len(set(product_ids)) != len(product_ids):
+            raise serializers.ValidationError('Cada produto deve aparecer uma única vez.')
+        # uma única query para validar todos os produtos (remoções não precisam existir)
+        wanted = {item['product_id'] for item in items if item['op'] != REMOVE}
+        existing = set(Product.objects.filter(pk__in=wanted).values_list('pk', flat=True))
+        missing = sorted(wanted - existing)
+        if missing:
+            raise serializers.ValidationError(f'Produtos inexistentes: {missing}')
+        return items
+
+
+class CartSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # itens do carrinho (ids; objetos com ?expand=items ou ?expand=items.product)
     items = CartItemSerializer(many=True, read_only=True)
 
     class Meta:
         model = Cart
-        fields = ['id', 'cliente', 'items']
+        # subtotal e item_count são mantidos no próprio carrinho: nenhum cálculo por item
+        fields = ['id', 'cliente', 'subtotal', 'item_count', 'items']
 
 
-class ClienteSerializer(serializers.ModelSerializer):
+class ClienteSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Cliente
         fields = ['cpf', 'telefone', 'data_nascimento']
@@ -65,11 +104,14 @@ class UserCreateSerializer(serializers.ModelSerializer):
         fields = ['username', 'password', 'email', 'first_name', 'last_name']
 
     def create(self, validated_data):
-        user = User.objects.create_user(**validated_data)
+        # User, Cliente e Cart (criados pelo signal) na mesma transação, um INSERT cada
+        with transaction.atomic():
+            user = User.objects.create_user(**validated_data)
         return user
 
 
-class PaymentSerializer(serializers.ModelSerializer):
+class PaymentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    # carrinho do pagamento (id; objeto com ?expand=cart, itens com ?expand=cart.items.product)
     cart = CartSerializer(read_only=True)
     cart_id = serializers.PrimaryKeyRelatedField(
         queryset=Cart.objects.all(), source='cart', write_only=True
@@ -79,9 +121,54 @@ class PaymentSerializer(serializers.ModelSerializer):
         model = Payment
         fields = ['id', 'payment_method', 'amount',
                   'status', 'paid_at', 'cart', 'cart_id']
+        extra_kwargs = {'amount': {'required': False}}
+
+    # pagamento, itens e evento do outbox (signal) na mesma transação
+    def create(self, validated_data):
+        # sem valor informado, cobra o subtotal mantido no carrinho
+        cart = validated_data['cart']
+        validated_data.setdefault('amount', cart.subtotal)
+        with transaction.atomic():
+            payment = super().create(validated_data)
+            # itens e preços de agora: o carrinho pode mudar depois
+            items = CartItem.objects.filter(cart=cart).values_list('product_id', 'quantity')
+            snapshot_payment_items(payment, dict(items))
+            return payment
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            return super().update(instance, validated_data)
+
+
+class CheckoutSerializer(serializers.Serializer):
+    payment_method = serializers.ChoiceField(choices=Payment.PAYMENT_METHODS)
+
+
+class SalesReportQuerySerializer(serializers.Serializer):
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    group_by = serializers.ChoiceField(choices=GROUP_BY, default='day')
+
+    def validate(self, attrs):
+        # padrão: os últimos 30 dias
+        attrs.setdefault('end', timezone.localdate())
+        attrs.setdefault('start', attrs['end'] - timedelta(days=29))
+        if attrs['start'] > attrs['end']:
+            raise serializers.ValidationError({'start': 'O início deve ser anterior ao fim.'})
+        return attrs
 
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[TOKEN_VERSION_CLAIM] = token_version(user)
+        # o id do carrinho vai no token para as rotas de carrinho não precisarem buscá-lo
+        cart = Cart.objects.filter(cliente__user=user).only('id').first()
+        if cart is not None:
+            token['cart_id'] = cart.id
+        return token
+
     def validate(self, attrs):
         data = super().validate(attrs)
 
@@ -1,60 +1,126 @@
-from rest_framework import viewsets, generics
+from rest_framework import viewsets, generics, status
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter
+from rest_framework.response import Response
 from django.contrib.auth.models import User
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from rest_framework.views import APIView
 from app.models import Category, Product, Cart, CartItem, Payment, Cliente
-from .serializers import CategorySerializer, ProductSerializer, CartSerializer, CartItemSerializer, PaymentSerializer, ClienteSerializer, UserCreateSerializer, MyTokenObtainPairSerializer
-from drf_spectacular.utils import extend_schema
+from .serializers import CategorySerializer, ProductSerializer, CartSerializer, CartItemSerializer, PaymentSerializer, ClienteSerializer, UserCreateSerializer, MyTokenObtainPairSerializer, CheckoutSerializer, CartItemBulkSerializer, SalesReportQuerySerializer
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import OpenApiParameter, extend_schema, extend_schema_view
 from rest_framework_simplejwt.views import TokenObtainPairView
+from app.cart import apply_cart_changes
+from app.catalog_io import export_categories, export_products, import_categories, import_products
+from app.checkout import checkout_cart
+from app.core.authentication import auth_stats
+from app.reports import sales_report
+from app.core.cache import CatalogCacheMixin
+from app.core.conditional import ConditionalGetMixin
+from app.core.db import db_stats
+from app.core.eager import EagerLoadingMixin, eager_load
+from app.core.fastread import FastReadMixin
+from app.core.metrics import TimedReadMixin
+from .mixins import CatalogTransferMixin, CurrentCartMixin
+from .filters import ProductFilterBackend, category_facets
+from .pagination import KeysetPagination
 
 # ViewSet: Agrupa views relacionadas em uma única classe para CRUD (Criar, Ler, Atualizar, Deletar)
 
+# ?fields= e ?expand= nas leituras (app/core/sparse.py)
+SPARSE_PARAMETERS = [
+    OpenApiParameter('fields', str, description='Campos da resposta, separados por vírgula ("." para os aninhados).'),
+    OpenApiParameter('expand', str, description='Relações a expandir (por padrão saem só os ids), ex.: cart.items.product.'),
+]
+sparse_schema = extend_schema_view(list=extend_schema(parameters=SPARSE_PARAMETERS),
+                                   retrieve=extend_schema(parameters=SPARSE_PARAMETERS))
+
 
 @extend_schema(tags=['Category'])
-class CategoryViewSet(viewsets.ModelViewSet):
+@sparse_schema
+class CategoryViewSet(ConditionalGetMixin, CatalogTransferMixin, CatalogCacheMixin, FastReadMixin, EagerLoadingMixin, TimedReadMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
+    conditional_per_user = False
+    catalog_importer = staticmethod(import_categories)
+    catalog_exporter = staticmethod(export_categories)
 
 
 @extend_schema(tags=['Product'])
-class ProductViewSet(viewsets.ModelViewSet):
+@sparse_schema
+class ProductViewSet(ConditionalGetMixin, CatalogTransferMixin, CatalogCacheMixin, FastReadMixin, EagerLoadingMixin, TimedReadMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     permission_classes = [IsAuthenticated]
+    conditional_per_user = False
+    pagination_class = KeysetPagination
+    catalog_importer = staticmethod(import_products)
+    catalog_exporter = staticmethod(export_products)
+    filter_backends = [ProductFilterBackend, OrderingFilter]
+    ordering_fields = ['price', 'name', 'created_at', 'stock']
+
+    # Contagem de produtos por categoria para os mesmos filtros da listagem
+    # (exceto o de categoria, para o cliente poder trocar de faceta)
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        return self.cached_response(request, self.build_facets)
+
+    def build_facets(self, request):
+        queryset = ProductFilterBackend().filter_queryset(
+            request, Product.objects.all(), self, exclude=('category',))
+        return Response({'categories': category_facets(queryset)})
 
 
 @extend_schema(tags=['Cart'])
-class CartViewSet(viewsets.ModelViewSet):
+@sparse_schema
+class CartViewSet(ConditionalGetMixin, CurrentCartMixin, FastReadMixin, EagerLoadingMixin, TimedReadMixin, viewsets.ModelViewSet):
     queryset = Cart.objects.all()
     serializer_class = CartSerializer
     permission_classes = [IsAuthenticated]
 
+    # Finaliza o carrinho do usuário: total calculado no servidor e baixa de estoque atômica
+    @extend_schema(request=CheckoutSerializer, responses={201: PaymentSerializer})
+    @action(detail=False, methods=['post'], serializer_class=CheckoutSerializer)
+    def checkout(self, request):
+        serializer = CheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        payment = checkout_cart(self.get_cart_id(), serializer.validated_data['payment_method'])
+        return Response(PaymentSerializer(payment).data, status=status.HTTP_201_CREATED)
+
 
 @extend_schema(tags=['Cart item'])
-class CartItemViewSet(viewsets.ModelViewSet):
+@sparse_schema
+class CartItemViewSet(ConditionalGetMixin, CurrentCartMixin, EagerLoadingMixin, TimedReadMixin, viewsets.ModelViewSet):
     queryset = CartItem.objects.all()
     serializer_class = CartItemSerializer
     permission_classes = [IsAuthenticated]
 
+    # O carrinho é criado no cadastro; aqui só resolvemos o id (uma vez por request)
     def get_queryset(self):
-        user = self.request.user
-        # Garante que o cliente e o carrinho existam para o usuário
-        cliente, _ = Cliente.objects.get_or_create(user=user)
-        cart, _ = Cart.objects.get_or_create(cliente=cliente)
-        return CartItem.objects.filter(cart=cart)
+        return super().get_queryset().filter(cart_id=self.get_cart_id())
 
-    # 2. Associa o novo item ao carrinho do usuário automaticamente
+    # Associa o novo item ao carrinho do usuário automaticamente
     def perform_create(self, serializer):
-        user = self.request.user
-        # Busca ou cria o cliente e o carrinho para o usuário logado
-        cliente, _ = Cliente.objects.get_or_create(user=user)
-        cart, _ = Cart.objects.get_or_create(cliente=cliente)
-        # Salva o novo item, associando o carrinho encontrado
-        serializer.save(cart=cart)
+        serializer.save(cart_id=self.get_cart_id())
+
+    # Define, incrementa ou remove vários itens de uma vez e devolve o carrinho atualizado
+    @extend_schema(request=CartItemBulkSerializer, responses={200: CartSerializer})
+    @action(detail=False, methods=['post'], serializer_class=CartItemBulkSerializer)
+    def bulk(self, request):
+        serializer = CartItemBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        cart_id = self.get_cart_id()
+        apply_cart_changes(cart_id, serializer.validated_data['items'])
+        # o mesmo ?expand= no plano de carga e na resposta
+        context = self.get_serializer_context()
+        cart = eager_load(Cart.objects.filter(pk=cart_id), CartSerializer(context=context)).get()
+        return Response(CartSerializer(cart, context=context).data)
 
 
 @extend_schema(tags=['Client'])
-class ClienteViewSet(viewsets.ModelViewSet):
+@sparse_schema
+class ClienteViewSet(ConditionalGetMixin, TimedReadMixin, viewsets.ModelViewSet):
     queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
     permission_classes = [IsAuthenticated]
@@ -65,11 +131,43 @@ class UserCreateAPIView(generics.CreateAPIView):
     serializer_class = UserCreateSerializer
     permission_classes = [AllowAny]
 
+@extend_schema(tags=['Auth'])
+class AuthStatsAPIView(APIView):
+    # quantas autenticações foram resolvidas pelo cache (sem ir ao banco) neste worker
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    def get(self, request):
+        return Response(auth_stats())
+
+@extend_schema(tags=['Ops'])
+class DatabaseStatsAPIView(APIView):
+    # conexões com o banco neste worker: abertas, e no modo pool em uso/ociosas/espera/timeouts
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(responses={200: OpenApiTypes.OBJECT})
+    def get(self, request):
+        return Response(db_stats())
+
+@extend_schema(tags=['Report'])
+class SalesReportAPIView(APIView):
+    # vendas por dia, produto, categoria ou forma de pagamento, só a partir dos rollups
+    # (atualizados pelo comando refresh_sales_rollups)
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(parameters=[SalesReportQuerySerializer], responses={200: OpenApiTypes.OBJECT})
+    def get(self, request):
+        query = SalesReportQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(sales_report(**query.validated_data))
+
 @extend_schema(tags=['Payment'])
-class PaymentViewSet(viewsets.ModelViewSet):
+@sparse_schema
+class PaymentViewSet(ConditionalGetMixin, EagerLoadingMixin, TimedReadMixin, viewsets.ModelViewSet):
     queryset = Payment.objects.all()
     serializer_class = PaymentSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
 
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
\ No newline at end of file
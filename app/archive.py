@@ -0,0 +1,80 @@
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import ArchivedRecord, Cart, CartItem, Category, Payment, PaymentItem, Product
+
+# Arquivamento de linhas com soft delete antigas.
+# Filhos antes dos pais: quando chega a vez do Product, os CartItems apagados
+# que apontavam para ele já saíram. Linhas ainda referenciadas por qualquer outra
+# (viva ou não) ficam para depois, então o DELETE nunca cascateia.
+# Filhos sem vida própria (os itens do pagamento) saem junto com o pai e vão
+# dentro do registro arquivado dele.
+
+ARCHIVE_ORDER = (CartItem, Payment, Product, Cart, Category)
+# pai -> (filho, FK do filho para o pai)
+OWNED = {Payment: (PaymentItem, 'payment')}
+
+
+def _unreferenced(model, queryset):
+    owned = OWNED.get(model, (None, None))[0]
+    for relation in model._meta.related_objects:
+        related = relation.related_model
+        if related is owned:
+            continue
+        manager = getattr(related, 'all_objects', related._base_manager)
+        queryset = queryset.filter(
+            ~Exists(manager.filter(**{relation.field.name: OuterRef('pk')})))
+    return queryset
+
+
+def archivable(model, cutoff):
+    queryset = model.all_objects.filter(is_deleted=True, updated_at__lt=cutoff)
+    return _unreferenced(model, queryset)
+
+
+def _take_owned(model, ids, rows):
+    # os filhos vão no registro do pai (chave = related_name) e saem antes dele
+    child, field = OWNED[model]
+    children = child.objects.filter(**{f'{field}__in': ids})
+    grouped = defaultdict(list)
+    for row in children.values():
+        grouped[row[f'{field}_id']].append(row)
+    key = child._meta.get_field(field).remote_field.related_name
+    for row in rows:
+        row[key] = grouped[row['id']]
+    children._raw_delete(children.db)
+
+
+def archive_model(model, cutoff, batch_size=500, purge=False, pause=0):
+    """Arquiva (ou só apaga, com purge=True) em lotes curtos; retorna o total."""
+    label = model._meta.label
+    total = 0
+    while True:
+        with transaction.atomic():
+            ids = list(archivable(model, cutoff).order_by('pk').values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return total
+            rows = list(model.all_objects.select_for_update().filter(pk__in=ids).values())
+            if model in OWNED:
+                _take_owned(model, ids, rows)
+            if not purge:
+                ArchivedRecord.objects.bulk_create([
+                    ArchivedRecord(model=label, object_id=row['id'], data=row, deleted_at=row['updated_at'])
+                    for row in rows
+                ])
+            # sem referências garantidas acima: DELETE direto, sem o Collector
+            # (nem sinais por instância, nem cascata)
+            model.all_objects.filter(pk__in=ids)._raw_delete(model.all_objects.db)
+        total += len(ids)
+        if pause:
+            time.sleep(pause)
+
+
+def archive_deleted(days=30, batch_size=500, purge=False, pause=0, models=ARCHIVE_ORDER):
+    cutoff = timezone.now() - timedelta(days=days)
+    return {model._meta.label: archive_model(model, cutoff, batch_size, purge, pause) for model in models}
@@ -0,0 +1,141 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Func, IntegerField, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
+
+from .models import Cart, CartItem, Product
+
+# Alterações em lote no carrinho: uma leitura dos itens atuais, um upsert
+# (INSERT ... ON CONFLICT (cart, product) DO UPDATE), um UPDATE para as remoções
+# e um UPDATE nos totais do carrinho.
+#
+# Totais (Cart.subtotal e Cart.item_count): soma de quantidade x preço atual dos
+# itens vivos. São ajustados por diferença com F() a cada mudança nos itens, sem
+# ler o carrinho; o preço entra por subquery, lido no próprio UPDATE. Mudança de
+# preço reajusta os carrinhos que têm o produto. Caminhos que não passam por aqui
+# (delete() de verdade, update() em lote de preço) ficam para o reconcile_cart_totals.
+
+SET, INCREMENT, REMOVE = 'set', 'increment', 'remove'
+OPERATIONS = (SET, INCREMENT, REMOVE)
+
+
+def apply_cart_changes(cart_id, changes):
+    """changes: lista de dicts com product_id, quantity e op (set/increment/remove)."""
+    with transaction.atomic():
+        product_ids = [change['product_id'] for change in changes]
+        current = dict(
+            CartItem.objects.select_for_update()
+            .filter(cart_id=cart_id, product_id__in=product_ids)
+            .values_list('product_id', 'quantity'))
+
+        final = {}
+        for change in changes:
+            product_id, quantity = change['product_id'], change.get('quantity', 1)
+            if change.get('op', SET) == REMOVE:
+                final[product_id] = 0
+            elif change.get('op', SET) == INCREMENT:
+                final[product_id] = current.get(product_id, 0) + quantity
+            else:
+                final[product_id] = quantity
+
+        upserts = [
+            CartItem(cart_id=cart_id, product_id=product_id, quantity=quantity)
+            for product_id, quantity in final.items() if quantity > 0
+        ]
+        removed = [product_id for product_id, quantity in final.items() if quantity <= 0]
+
+        if upserts:
+            # o unique_together (cart, product) vale também para itens com soft delete,
+            # por isso o upsert também os "revive"
+            CartItem.all_objects.bulk_create(
+                upserts,
+                update_conflicts=True,
+                unique_fields=['cart', 'product'],
+                update_fields=['quantity', 'is_deleted', 'updated_at'],
+            )
+        if removed:
+            CartItem.objects.filter(cart_id=cart_id, product_id__in=removed).soft_delete()
+        adjust_cart_totals(cart_id, {
+            product_id: max(quantity, 0) - current.get(product_id, 0) for product_id, quantity in final.items()
+        })
+
+
+def _sum(expression, output_field):
+    # SUM sem GROUP BY: a subquery devolve uma linha só (NULL se não houver linhas)
+    return Func(expression, function='SUM', output_field=output_field)
+
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+ZERO = Value(Decimal('0'), output_field=MONEY)
+
+
+def adjust_cart_totals(cart_id, deltas):
+    """deltas: {product_id: variação da quantidade}. Um UPDATE, nenhuma leitura."""
+    deltas = {product_id: delta for product_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    weight = Case(*[When(pk=product_id, then=Value(delta)) for product_id, delta in deltas.items()],
+                  output_field=IntegerField())
+    amount = (Product.all_objects.filter(pk__in=deltas).order_by()
+              .annotate(amount=_sum(F('price') * weight, MONEY)).values('amount'))
+    Cart.all_objects.filter(pk=cart_id).update(
+        subtotal=F('subtotal') + Coalesce(Subquery(amount), ZERO),
+        item_count=F('item_count') + sum(deltas.values()),
+        updated_at=timezone.now(),
+    )
+
+
+def item_deltas(item):
+    """Variações por carrinho causadas pelo save() de um CartItem: {cart_id: {product_id: delta}}."""
+    deltas = defaultdict(lambda: defaultdict(int))
+    loaded = item.loaded_values()
+    if loaded is not None and not loaded.get('is_deleted', item.is_deleted):
+        cart_id = loaded.get('cart_id', item.cart_id)
+        deltas[cart_id][loaded.get('product_id', item.product_id)] -= loaded.get('quantity', item.quantity)
+    if not item.is_deleted:
+        deltas[item.cart_id][item.product_id] += item.quantity
+    return deltas
+
+
+def reprice_cart_totals(product_id, old_price, new_price):
+    """Nova diferença de preço vezes a quantidade do produto em cada carrinho, num UPDATE só."""
+    if old_price == new_price:
+        return 0
+    items = CartItem.objects.filter(cart_id=OuterRef('pk'), product_id=product_id)
+    return Cart.all_objects.filter(items__product_id=product_id, items__is_deleted=False).update(
+        subtotal=F('subtotal') + Subquery(items.values('quantity')[:1]) * Value(new_price - old_price, MONEY),
+        updated_at=timezone.now(),
+    )
+
+
+def computed_totals():
+    """Subqueries com os totais calculados do zero (agregados), relativas a OuterRef('pk')."""
+    items = CartItem.objects.filter(cart_id=OuterRef('pk')).order_by()
+    return {
+        'subtotal': Coalesce(Subquery(items.annotate(
+            total=_sum(F('quantity') * F('product__price'), MONEY)).values('total')), ZERO),
+        'item_count': Coalesce(Subquery(items.annotate(
+            total=_sum(F('quantity'), IntegerField())).values('total')), 0),
+    }
+
+
+def recalculate_cart_totals(carts):
+    """Recalcula do zero os totais dos carrinhos do queryset (um UPDATE)."""
+    return carts.update(**computed_totals(), updated_at=timezone.now())
+
+
+def reconcile_cart_totals(fix=True):
+    """Compara os totais gravados com os agregados; devolve os carrinhos divergentes."""
+    expected = computed_totals()
+    # arredondado nos dois lados: no SQLite os decimais viram REAL
+    drifted = list(
+        Cart.all_objects.annotate(expected_subtotal=Round(expected['subtotal'], 2),
+                                  expected_item_count=expected['item_count'])
+        .exclude(expected_subtotal=Round('subtotal', 2), item_count=F('expected_item_count'))
+        .order_by('pk').values('pk', 'subtotal', 'expected_subtotal', 'item_count', 'expected_item_count'))
+    if fix and drifted:
+        recalculate_cart_totals(Cart.all_objects.filter(pk__in=[row['pk'] for row in drifted]))
+    return drifted
@@ -0,0 +1,217 @@
+import csv
+import io
+import json
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from .cart import recalculate_cart_totals
+from .core.batching import batches
+from .models import Cart, CartItem, Category, Product
+
+# Importação/exportação do catálogo em streaming (CSV ou JSONL).
+# A entrada é lida linha a linha e gravada em lotes (bulk_create/bulk_update),
+# com o produto identificado pelo sku e a categoria pelo nome; a saída é gerada
+# com .iterator(), então nem a entrada nem a saída ficam inteiras na memória.
+
+CSV, JSONL = 'csv', 'jsonl'
+FORMATS = (CSV, JSONL)
+CONTENT_TYPES = {CSV: 'text/csv', JSONL: 'application/x-ndjson'}
+
+PRODUCT_COLUMNS = ('sku', 'name', 'description', 'price', 'stock', 'category')
+CATEGORY_COLUMNS = ('name', 'description')
+MAX_REPORTED_ERRORS = 100
+
+
+def _text_lines(lines):
+    for line in lines:
+        yield line.decode('utf-8') if isinstance(line, bytes) else line
+
+
+def read_rows(lines, fmt):
+    """Gera dicts a partir de um iterável de linhas (str ou bytes)."""
+    lines = _text_lines(lines)
+    if fmt == CSV:
+        yield from csv.DictReader(lines)
+    elif fmt == JSONL:
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+    else:
+        raise ValueError(f'Formato não suportado: {fmt}')
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def error(self, line, message):
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def as_dict(self):
+        return {'created': self.created, 'updated': self.updated, 'errors': self.errors}
+
+
+def check_row(row):
+    # no JSONL cada linha pode ser qualquer valor JSON; só objetos viram registros
+    if not isinstance(row, dict):
+        raise ValueError(f'a linha deve ser um objeto, não {type(row).__name__}')
+    return row
+
+
+def text_value(row, column):
+    """Valor da coluna como texto sem espaços nas pontas ('' se ausente); o JSONL pode trazer números."""
+    value = row.get(column)
+    return '' if value is None else str(value).strip()
+
+
+def _clean_product(row):
+    check_row(row)
+    sku = text_value(row, 'sku')
+    if not sku:
+        raise ValueError('sku obrigatório')
+    category = text_value(row, 'category')
+    if not category:
+        raise ValueError('categoria obrigatória')
+    try:
+        price = Decimal(str(row.get('price')))
+    except InvalidOperation:
+        raise ValueError(f"preço inválido: {row.get('price')!r}")
+    return {
+        'sku': sku,
+        'name': text_value(row, 'name'),
+        'description': text_value(row, 'description'),
+        'price': price,
+        'stock': int(row.get('stock') or 0),
+        'category': category,
+    }
+
+
+def import_products(rows, batch_size=1000):
+    result = ImportResult()
+    # mapa nome -> id carregado uma vez; categorias novas entram conforme aparecem
+    categories = dict(Category.objects.order_by('-id').values_list('name', 'id'))
+    product_fields = ['name', 'description', 'price', 'stock', 'category', 'is_deleted', 'updated_at']
+
+    line = 0
+    for batch in batches(rows, batch_size):
+        cleaned = {}
+        for row in batch:
+            line += 1
+            try:
+                data = _clean_product(row)
+            except (TypeError, ValueError) as exc:
+                result.error(line, str(exc))
+                continue
+            cleaned[data['sku']] = data
+
+        new_categories = {data['category'] for data in cleaned.values()} - set(categories)
+
+        with transaction.atomic():
+            if new_categories:
+                for category in Category.objects.bulk_create(
+                        [Category(name=name) for name in sorted(new_categories)]):
+                    categories[category.name] = category.id
+
+            existing = {
+                product.sku: product for product in
+                Product.all_objects.filter(sku__in=cleaned).only('id', 'sku', 'price')
+            }
+            to_create, to_update, repriced = [], [], []
+            now = timezone.now()
+            for sku, data in cleaned.items():
+                data['category_id'] = categories[data.pop('category')]
+                product = existing.get(sku)
+                if product is None:
+                    to_create.append(Product(**data))
+                else:
+                    if product.price != data['price']:
+                        repriced.append(product.pk)
+                    for field, value in data.items():
+                        setattr(product, field, value)
+                    product.is_deleted = False
+                    product.updated_at = now
+                    to_update.append(product)
+
+            Product.objects.bulk_create(to_create)
+            Product.all_objects.bulk_update(to_update, product_fields)
+            if repriced:
+                # o bulk_update não passa pelo save(): totais dos carrinhos afetados do zero
+                recalculate_cart_totals(Cart.all_objects.filter(
+                    pk__in=CartItem.all_objects.filter(product_id__in=repriced).values('cart_id')))
+
+        result.created += len(to_create)
+        result.updated += len(to_update)
+    return result
+
+
+def import_categories(rows, batch_size=1000):
+    result = ImportResult()
+    categories = dict(Category.objects.order_by('-id').values_list('name', 'id'))
+
+    line = 0
+    for batch in batches(rows, batch_size):
+        to_create, to_update = [], []
+        now = timezone.now()
+        for row in batch:
+            line += 1
+            try:
+                name = text_value(check_row(row), 'name')
+            except ValueError as exc:
+                result.error(line, str(exc))
+                continue
+            if not name:
+                result.error(line, 'nome obrigatório')
+                continue
+            category = Category(name=name, description=text_value(row, 'description') or None)
+            if name in categories:
+                category.id = categories[name]
+                category.updated_at = now
+                to_update.append(category)
+            else:
+                to_create.append(category)
+
+        with transaction.atomic():
+            for category in Category.objects.bulk_create(to_create):
+                categories[category.name] = category.id
+            Category.objects.bulk_update(to_update, ['description', 'updated_at'])
+        result.created += len(to_create)
+        result.updated += len(to_update)
+    return result
+
+
+def _format_rows(rows, columns, fmt):
+    if fmt == JSONL:
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), default=str, ensure_ascii=False) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        # esvazia o buffer a cada linha: só uma linha em memória por vez
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_products(fmt=CSV, chunk_size=2000):
+    rows = (
+        Product.objects.order_by('id')
+        .values_list('sku', 'name', 'description', 'price', 'stock', 'category__name')
+        .iterator(chunk_size=chunk_size)
+    )
+    return _format_rows(rows, PRODUCT_COLUMNS, fmt)
+
+
+def export_categories(fmt=CSV, chunk_size=2000):
+    rows = Category.objects.order_by('id').values_list('name', 'description').iterator(chunk_size=chunk_size)
+    return _format_rows(rows, CATEGORY_COLUMNS, fmt)
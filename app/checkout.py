@@ -0,0 +1,127 @@
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import Case, F, IntegerField, Q, When
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .cart import adjust_cart_totals
+from .models import CartItem, Payment, PaymentItem, Product
+
+# Checkout: fecha o carrinho em uma única transação.
+# - o total é calculado no servidor (CartItem.quantity x Product.price)
+# - os produtos são travados sempre na mesma ordem (id), então dois checkouts
+#   concorrentes nunca se travam mutuamente (sem deadlock)
+# - o estoque é baixado com um único UPDATE condicional (stock >= quantidade);
+#   se algum item não tiver estoque a transação inteira é desfeita
+# - os itens cobrados saem do carrinho na mesma transação (soft delete), então
+#   repetir o checkout (clique duplo, retentativa do cliente) encontra o carrinho
+#   vazio em vez de cobrar e baixar o estoque de novo
+# - os itens cobrados ficam gravados no pagamento (PaymentItem, com o preço
+#   travado), base dos relatórios de vendas
+# - em contenção o lock_timeout faz a requisição falhar rápido com 409; outros
+#   erros do banco sobem como erro mesmo
+
+# lock_not_available: estourou o lock_timeout
+LOCK_NOT_AVAILABLE = '55P03'
+SQLITE_LOCKED = ('database is locked', 'database table is locked')
+
+
+class CheckoutConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Não foi possível finalizar a compra.'
+    default_code = 'checkout_conflict'
+
+
+def _set_lock_timeout():
+    timeout = getattr(settings, 'CHECKOUT_LOCK_TIMEOUT_MS', None)
+    if timeout and connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL lock_timeout = %s", [f'{int(timeout)}ms'])
+
+
+def _is_lock_timeout(exc):
+    # lock_timeout no Postgres (psycopg 3: sqlstate, psycopg2: pgcode) / banco ou tabela travados no SQLite
+    cause = exc.__cause__
+    if (getattr(cause, 'sqlstate', None) or getattr(cause, 'pgcode', None)) == LOCK_NOT_AVAILABLE:
+        return True
+    return connection.vendor == 'sqlite' and str(exc).startswith(SQLITE_LOCKED)
+
+
+def checkout_cart(cart_id, payment_method):
+    try:
+        with transaction.atomic():
+            _set_lock_timeout()
+            return _reserve_and_charge(cart_id, payment_method)
+    except OperationalError as exc:
+        if not _is_lock_timeout(exc):
+            raise
+        raise CheckoutConflict('Muitas compras simultâneas; tente novamente.') from exc
+
+
+def _reserve_and_charge(cart_id, payment_method):
+    # trava os itens: um segundo checkout do mesmo carrinho espera este terminar
+    # e depois já não os encontra (saíram do carrinho)
+    quantities = dict(
+        CartItem.objects.select_for_update().filter(cart_id=cart_id)
+        .order_by('product_id').values_list('product_id', 'quantity'))
+    if not quantities:
+        raise ValidationError({'cart': 'O carrinho está vazio.'})
+    if any(quantity <= 0 for quantity in quantities.values()):
+        raise ValidationError({'cart': 'Há itens com quantidade inválida.'})
+
+    locked = {
+        pk: (price, stock) for pk, price, stock in
+        Product.objects.select_for_update()
+        .filter(pk__in=quantities).order_by('pk').values_list('pk', 'price', 'stock')
+    }
+    unavailable = sorted(set(quantities) - set(locked))
+    if unavailable:
+        raise CheckoutConflict({'detail': 'Produtos indisponíveis.', 'products': unavailable})
+    short = sorted(pk for pk, (_, stock) in locked.items() if stock < quantities[pk])
+    if short:
+        raise CheckoutConflict({'detail': 'Estoque insuficiente.', 'products': short})
+
+    # o WHERE stock >= quantidade garante a baixa mesmo onde não há row lock (SQLite)
+    in_stock = Q()
+    for product_id, quantity in quantities.items():
+        in_stock |= Q(pk=product_id, stock__gte=quantity)
+    reserved = Product.objects.filter(in_stock).update(
+        stock=Case(
+            *[When(pk=product_id, then=F('stock') - quantity) for product_id, quantity in quantities.items()],
+            output_field=IntegerField(),
+        ),
+        updated_at=timezone.now(),
+    )
+    if reserved != len(quantities):
+        # a exceção desfaz a transação, inclusive as baixas parciais do UPDATE acima
+        raise CheckoutConflict('Estoque alterado durante a compra; tente novamente.')
+
+    # esvazia o carrinho; o WHERE com as quantidades lidas cobre o SQLite (sem row lock),
+    # onde outro checkout ou uma alteração do item pode ter passado na frente
+    charged = Q()
+    for product_id, quantity in quantities.items():
+        charged |= Q(product_id=product_id, quantity=quantity)
+    if CartItem.objects.filter(charged, cart_id=cart_id).soft_delete() != len(quantities):
+        raise CheckoutConflict('O carrinho foi alterado durante a compra; tente novamente.')
+    adjust_cart_totals(cart_id, {product_id: -quantity for product_id, quantity in quantities.items()})
+
+    amount = sum(locked[pk][0] * quantity for pk, quantity in quantities.items())
+    payment = Payment.objects.create(cart_id=cart_id, payment_method=payment_method, amount=amount)
+    snapshot_payment_items(payment, quantities, {pk: price for pk, (price, _) in locked.items()})
+    return payment
+
+
+def snapshot_payment_items(payment, quantities, prices=None):
+    """Grava os itens do pagamento ({product_id: quantidade}) com nome, categoria e preço.
+
+    Sem prices, usa o preço atual dos produtos.
+    """
+    products = (Product.all_objects.filter(pk__in=quantities)
+                .values_list('pk', 'name', 'price', 'category_id', 'category__name'))
+    return PaymentItem.objects.bulk_create([
+        PaymentItem(payment=payment, product_id=pk, name=name, category_id=category_id,
+                    category_name=category_name, quantity=quantities[pk],
+                    unit_price=prices[pk] if prices else price)
+        for pk, name, price, category_id, category_name in products
+    ])
@@ -0,0 +1,37 @@
+import json
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+# Admin para tabelas grandes: sem o COUNT(*) da tabela inteira a cada página e,
+# no Postgres, com a contagem estimada pelo planner quando o resultado é grande.
+
+
+def estimated_count(queryset, threshold=None):
+    """Estimativa do EXPLAIN (Postgres) acima do limite; abaixo dele, o COUNT(*) exato."""
+    if threshold is None:
+        threshold = getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 10000)
+    if connections[queryset.db].vendor == 'postgresql':
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        estimate = int(plan[0]['Plan']['Plan Rows'])
+        if estimate >= threshold:
+            return estimate
+    return queryset.count()
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list)
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist sem contagem total e com contagem estimada; defina list_select_related
+    para tudo que o list_display mostra e autocomplete_fields/raw_id_fields nas FKs."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+    ordering = ('-pk',)
@@ -0,0 +1,182 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import router, transaction
+from django.utils.crypto import salted_hmac
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .cache import is_shared_alias
+
+# Autenticação JWT sem ir ao banco a cada request.
+# O usuário é montado a partir de um snapshot em cache (TTL curto), carregado do
+# banco só no miss. Cada token carrega a claim 'tv' (versão do token), derivada
+# do hash da senha e de is_active: trocar a senha ou desativar o usuário muda a
+# versão, o snapshot é descartado na hora e regravado no commit (app/signals.py)
+# e os tokens antigos passam a ser recusados imediatamente.
+# Para isso valer em todos os workers o snapshot fica num cache compartilhado
+# (AUTH_USER_CACHE_ALIAS, Redis/Memcached); com um backend local (LocMem) cada
+# worker teria o seu e só o que gravou veria a mudança, então nesse caso o
+# usuário vem do banco a cada request (exceto com AUTH_USER_CACHE_SINGLE_PROCESS).
+# queryset.update() não dispara o post_save: atualize usuários em lote com
+# update_users(), que descarta os snapshots.
+
+TOKEN_VERSION_CLAIM = 'tv'
+SNAPSHOT_FIELDS = ('id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser')
+
+_lock = threading.Lock()
+_stats = {'cache_hits': 0, 'db_loads': 0, 'revoked': 0}
+
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+
+def auth_stats():
+    with _lock:
+        stats = dict(_stats)
+    lookups = stats['cache_hits'] + stats['db_loads']
+    stats['db_avoided_ratio'] = stats['cache_hits'] / lookups if lookups else 0.0
+    return stats
+
+
+def token_version(user):
+    return salted_hmac('app.token_version', f'{user.password}|{user.is_active}').hexdigest()[:16]
+
+
+def _cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def _snapshot(user):
+    snapshot = {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+    snapshot[TOKEN_VERSION_CLAIM] = token_version(user)
+    return snapshot
+
+
+def _ttl():
+    return getattr(settings, 'AUTH_USER_CACHE_TTL', 60)
+
+
+def snapshot_cache():
+    """Cache dos snapshots; None se ele não for visto por todos os workers."""
+    alias = getattr(settings, 'AUTH_USER_CACHE_ALIAS', 'default')
+    if not alias:
+        return None
+    if is_shared_alias(alias) or getattr(settings, 'AUTH_USER_CACHE_SINGLE_PROCESS', False):
+        return caches[alias]
+    return None
+
+
+def _store(user_id, snapshot):
+    cache = snapshot_cache()
+    if cache is not None:
+        cache.set(_cache_key(user_id), snapshot, _ttl())
+    return snapshot
+
+
+def cache_user_snapshot(user):
+    return _store(user.pk, _snapshot(user))
+
+
+def replace_user_snapshot(user):
+    """Depois de gravar o usuário: descarta o snapshot agora e grava o novo após o commit."""
+    user_id, snapshot = user.pk, _snapshot(user)
+    forget_user_snapshots([user_id])
+    # um request no meio da transação pode regravar o snapshot com a linha antiga;
+    # num rollback o callback não roda e o próximo request lê o banco
+    transaction.on_commit(lambda: _store(user_id, snapshot))
+
+
+def forget_user_snapshots(user_ids):
+    cache = snapshot_cache()
+    if cache is not None:
+        cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def forget_user_snapshot(user_id):
+    forget_user_snapshots([user_id])
+    transaction.on_commit(lambda: forget_user_snapshots([user_id]))
+
+
+def update_users(queryset, **fields):
+    """queryset.update() de usuários que também descarta os snapshots (agora e após o commit)."""
+    user_ids = list(queryset.values_list('pk', flat=True))
+    rows = queryset.model._default_manager.filter(pk__in=user_ids).update(**fields)
+    forget_user_snapshots(user_ids)
+    # um request no meio da transação pode ter regravado o snapshot com os dados antigos
+    transaction.on_commit(lambda: forget_user_snapshots(user_ids))
+    return rows
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        cache = snapshot_cache()
+        snapshot = cache.get(_cache_key(user_id)) if cache is not None else None
+        if snapshot is None:
+            _count('db_loads')
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+            snapshot = cache_user_snapshot(user)
+        else:
+            _count('cache_hits')
+        return self._user_from_snapshot(validated_token, snapshot)
+
+    # Versões assíncronas para as views async (app/api/v1/async_views.py):
+    # validar o token é só CPU; cache e banco passam pelas APIs a* do Django.
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self._user_id(validated_token)
+        cache = snapshot_cache()
+        snapshot = await cache.aget(_cache_key(user_id)) if cache is not None else None
+        if snapshot is None:
+            _count('db_loads')
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist:
+                raise AuthenticationFailed('User not found', code='user_not_found')
+            snapshot = _snapshot(user)
+            if cache is not None:
+                await cache.aset(_cache_key(user.pk), snapshot, _ttl())
+        else:
+            _count('cache_hits')
+        return self._user_from_snapshot(validated_token, snapshot)
+
+    @staticmethod
+    def _user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken('Token contained no recognizable user identification')
+
+    def _user_from_snapshot(self, validated_token, snapshot):
+        if not snapshot['is_active']:
+            raise AuthenticationFailed('User is inactive', code='user_inactive')
+
+        # tokens emitidos antes da claim existir não têm 'tv' e seguem válidos até expirar
+        version = validated_token.get(TOKEN_VERSION_CLAIM)
+        if version is not None and version != snapshot[TOKEN_VERSION_CLAIM]:
+            _count('revoked')
+            raise AuthenticationFailed('Token revogado.', code='token_revoked')
+
+        # instância "carregada" só com os campos do snapshot: os demais (password,
+        # last_login...) ficam deferred e um eventual save() não os sobrescreve
+        return self.user_model.from_db(
+            router.db_for_read(self.user_model), list(SNAPSHOT_FIELDS),
+            [snapshot[field] for field in SNAPSHOT_FIELDS])
@@ -0,0 +1,11 @@
+from itertools import islice
+
+# Processamento em lotes: importações, geração de dados e rollups leem e gravam
+# de N em N linhas em vez de materializar tudo de uma vez.
+
+
+def batches(iterable, size):
+    """Listas de até `size` itens, na ordem do iterável (o último lote pode ser menor)."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
@@ -0,0 +1,24 @@
+import statistics
+
+# Utilitários comuns dos comandos de benchmark (bench_servers, bench_api)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def latency_summary(timings, elapsed):
+    """p50/p95/p99/média em ms e vazão (req/s), a partir dos tempos em segundos."""
+    timings = sorted(timings)
+    ms = [value * 1000 for value in timings]
+    return {
+        'requests': len(timings),
+        'seconds': elapsed,
+        'rps': len(timings) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(ms, 0.50),
+        'p95_ms': percentile(ms, 0.95),
+        'p99_ms': percentile(ms, 0.99),
+        'mean_ms': statistics.fmean(ms) if ms else None,
+    }
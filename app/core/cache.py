@@ -0,0 +1,247 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import transaction
+from rest_framework.response import Response
+
+# Cache de leitura com invalidação por versão.
+# As chaves carregam a versão atual; qualquer escrita só incrementa a versão e as
+# entradas antigas deixam de ser encontradas (e expiram sozinhas).
+# Dois níveis: um LRU limitado no próprio processo e, opcionalmente, um cache
+# compartilhado do Django (Redis/Memcached em produção, LocMem localmente).
+# A versão só invalida os outros workers se ficar num backend compartilhado de
+# verdade: com LocMem (ou sem alias) cada processo tem a sua, e uma escrita num
+# worker deixaria os demais servindo o catálogo (e os validadores) antigos. Nesse
+# caso o cache do catálogo fica desligado, a não ser em modo de processo único
+# (CATALOG_CACHE['SINGLE_PROCESS']: runserver, testes).
+
+_MISSING = object()
+
+# backends que guardam os dados dentro do processo
+LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_shared_alias(alias):
+    """True se o alias de CACHES aponta para um backend visto por todos os processos."""
+    return bool(alias) and settings.CACHES.get(alias, {}).get('BACKEND') not in LOCAL_BACKENDS
+
+
+def _detach(data):
+    # ReturnDict/ReturnList guardam referência ao serializer; no cache fica só o dado
+    if isinstance(data, dict):
+        return {key: _detach(value) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_detach(value) for value in data]
+    return data
+
+
+class LRUCache:
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+                return self._data[key]
+            except KeyError:
+                return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class VersionedCache:
+    def __init__(self, namespace, max_entries=1024, shared_alias=None, timeout=300):
+        self.namespace = namespace
+        self.local = LRUCache(max_entries)
+        self.shared_alias = shared_alias
+        self.timeout = timeout
+        self._version = 1
+        self._lock = threading.Lock()
+        self._counters = {'local_hits': 0, 'shared_hits': 0, 'misses': 0, 'bumps': 0}
+
+    @classmethod
+    def from_settings(cls, namespace, options):
+        return cls(
+            namespace,
+            max_entries=options.get('LOCAL_MAX_ENTRIES', 1024),
+            shared_alias=options.get('SHARED_ALIAS'),
+            timeout=options.get('TIMEOUT', 300),
+        )
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias] if self.shared_alias else None
+
+    @property
+    def cross_process(self):
+        # a versão (e com ela a invalidação) vale entre workers
+        return is_shared_alias(self.shared_alias)
+
+    @property
+    def version_key(self):
+        return f'{self.namespace}:version'
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def version(self):
+        # com cache compartilhado a versão fica nele, para valer entre workers
+        shared = self.shared
+        if shared is None:
+            return self._version
+        version = shared.get(self.version_key)
+        if version is None:
+            shared.add(self.version_key, 1, timeout=None)
+            version = shared.get(self.version_key, 1)
+        return version
+
+    def bump(self):
+        self._count('bumps')
+        self.local.clear()
+        shared = self.shared
+        if shared is None:
+            with self._lock:
+                self._version += 1
+            return
+        try:
+            shared.incr(self.version_key)
+        except ValueError:
+            shared.set(self.version_key, 2, timeout=None)
+
+    def bump_on_commit(self):
+        # invalida já (ninguém mais lê a versão antiga) e de novo após o commit,
+        # descartando o que tenha sido cacheado enquanto a transação estava aberta
+        self.bump()
+        transaction.on_commit(self.bump)
+
+    def make_key(self, *parts):
+        digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+        return f'{self.namespace}:{self.version()}:{digest}'
+
+    def get(self, key, default=None):
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            self._count('local_hits')
+            return value
+        shared = self.shared
+        if shared is not None:
+            value = shared.get(key, _MISSING)
+            if value is not _MISSING:
+                self._count('shared_hits')
+                self.local.set(key, value)
+                return value
+        self._count('misses')
+        return default
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        shared = self.shared
+        if shared is not None:
+            shared.set(key, value, timeout=self.timeout)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats['local_hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_ratio'] = (lookups - stats['misses']) / lookups if lookups else 0.0
+        stats['local_entries'] = len(self.local)
+        stats['version'] = self.version()
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            for name in self._counters:
+                self._counters[name] = 0
+
+
+catalog_cache = VersionedCache.from_settings('catalog', getattr(settings, 'CATALOG_CACHE', {}))
+
+
+def catalog_cache_enabled():
+    options = getattr(settings, 'CATALOG_CACHE', {})
+    if not options.get('ENABLED', True):
+        return False
+    return catalog_cache.cross_process or options.get('SINGLE_PROCESS', False)
+
+
+@checks.register(checks.Tags.caches)
+def check_catalog_cache(app_configs, **kwargs):
+    options = getattr(settings, 'CATALOG_CACHE', {})
+    if not options.get('ENABLED', True) or catalog_cache_enabled():
+        return []
+    return [checks.Warning(
+        'O cache do catálogo está desligado: a versão precisa de um cache compartilhado.',
+        hint="Aponte CATALOG_CACHE['SHARED_ALIAS'] para um alias Redis/Memcached em CACHES "
+             "(ou use CATALOG_CACHE_SINGLE_PROCESS=True se só houver um processo).",
+        id='app.W001',
+    )]
+
+
+class CatalogCacheMixin:
+    # Mixin para viewsets de catálogo: list/retrieve passam pelo catalog_cache.
+    # A resposta não depende do usuário, então a chave é só rota + query params.
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+    def cache_enabled(self):
+        return catalog_cache_enabled()
+
+    def cache_key(self, request, name, kwargs):
+        return catalog_cache.make_key(
+            self.basename, name, request.get_host(),
+            sorted(kwargs.items()), sorted(request.query_params.lists()))
+
+    def cached_value(self, request, name, compute, **kwargs):
+        # valores derivados da mesma rota (ex.: validadores do GET condicional)
+        if not self.cache_enabled():
+            return compute()
+        key = self.cache_key(request, name, kwargs)
+        value = catalog_cache.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            catalog_cache.set(key, value)
+        return value
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        if not self.cache_enabled():
+            return handler(request, *args, **kwargs)
+
+        key = self.cache_key(request, self.action, kwargs)
+        data = catalog_cache.get(key, _MISSING)
+        if data is not _MISSING:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            catalog_cache.set(key, _detach(response.data))
+        response['X-Cache'] = 'MISS'
+        return response
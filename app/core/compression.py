@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+
+# Compressão das respostas: gzip negociado pelo Accept-Encoding (com o Vary e o
+# tamanho aleatório do GZipMiddleware contra o BREACH), só para corpos grandes, que
+# é onde compensa: respostas pequenas vão como estão. Exportações em streaming são
+# comprimidas em pedaços. A ETag forte vira fraca (W/"...") na resposta comprimida;
+# o If-Match aceita as duas formas (ver conditional.py).
+
+
+class CompressionMiddleware(GZipMiddleware):
+    def process_response(self, request, response):
+        min_length = getattr(settings, 'COMPRESSION_MIN_LENGTH', 1024)
+        if not response.streaming and len(response.content) < min_length:
+            return response
+        return super().process_response(request, response)
@@ -0,0 +1,186 @@
+import hashlib
+from datetime import datetime
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_etags, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .eager import relation_paths
+
+# GET condicional (ETag/Last-Modified) e If-Match nas escritas.
+# Os validadores saem de um único aggregate no queryset já filtrado, sem
+# serializar nada: COUNT e MAX(updated_at) das linhas e de cada relação aninhada
+# do serializer (o carrinho muda quando um item ou o produto de um item muda).
+# Escritas sempre mexem no updated_at (auto_now, soft delete, bulk com
+# updated_at) e remoções mudam a contagem, então o par muda junto com o corpo.
+# A ETag é forte: entra também tudo o que muda a representação (rota, ação,
+# formato negociado, query params e, nas rotas por usuário, o usuário).
+# Ela tem duas partes, "<versão da linha>.<representação>": o If-Match e o
+# If-Unmodified-Since das escritas comparam só a versão (COUNT e MAX(updated_at)
+# das próprias linhas), então a ETag de um GET com ?expand=/?fields=/?format=
+# também vale para o PUT/PATCH do mesmo recurso.
+# Last-Modified só no detalhe: na listagem um soft delete tira a linha do
+# MAX(updated_at) e a data voltaria para trás (If-Modified-Since daria 304 com a
+# lista mudada); lá vale só a ETag, que inclui a contagem.
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'O recurso foi alterado desde a versão informada.'
+    default_code = 'precondition_failed'
+
+
+def _serialize(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def queryset_validators(queryset, serializer):
+    """Aggregate (count, MAX(updated_at)) do queryset e das relações aninhadas do serializer."""
+    aggregates = {'count': Count('pk', distinct=True), 'modified': Max('updated_at')}
+    for index, (path, related_model) in enumerate(relation_paths(serializer)):
+        try:
+            related_model._meta.get_field('updated_at')
+        except FieldDoesNotExist:
+            continue
+        aggregates[f'modified_{index}'] = Max(f'{path}__updated_at')
+        aggregates[f'count_{index}'] = Count(path, distinct=True)
+    values = queryset.order_by().aggregate(**aggregates)
+    modified = [value for name, value in values.items() if name.startswith('modified') and value is not None]
+    return {
+        'count': values['count'],
+        'last_modified': int(max(modified).timestamp()) if modified else None,
+        # só as linhas do queryset, sem as relações: o que as escritas comparam
+        'version': (values['count'], _serialize(values['modified'])),
+        'row_modified': int(values['modified'].timestamp()) if values['modified'] else None,
+        'state': tuple(sorted((name, _serialize(value)) for name, value in values.items())),
+    }
+
+
+class ConditionalGetMixin:
+    # Mixin para viewsets (o primeiro da lista, para o 304 sair antes do cache e da leitura):
+    # list/retrieve respondem 304 a If-None-Match/If-Modified-Since e
+    # PUT/PATCH respondem 412 se o If-Match/If-Unmodified-Since não bater.
+    conditional_per_user = True
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(request, super().retrieve, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        meta = request.META
+        if 'HTTP_IF_MATCH' not in meta and 'HTTP_IF_UNMODIFIED_SINCE' not in meta:
+            response = super().update(request, *args, **kwargs)
+        else:
+            with transaction.atomic():
+                # trava a linha: ninguém grava entre a comparação e a nossa escrita
+                queryset = self.conditional_queryset(kwargs)
+                if queryset is not None and queryset.prefetch_related(None).select_for_update().values_list('pk', flat=True):
+                    self.check_write_preconditions(request, self.compute_validators(queryset), kwargs)
+                response = super().update(request, *args, **kwargs)
+        if response.status_code == 200:
+            self.set_validator_headers(response, self.compute_validators(self.conditional_queryset(kwargs)), kwargs)
+        return response
+
+    def conditional_queryset(self, kwargs):
+        """Queryset filtrado da listagem ou do detalhe; None se o lookup for inválido (o handler dá 404)."""
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg not in kwargs:
+            return queryset
+        try:
+            return queryset.filter(**{self.lookup_field: kwargs[lookup_url_kwarg]})
+        except (TypeError, ValueError, ValidationError):
+            return None
+
+    def compute_validators(self, queryset):
+        if queryset is None:
+            return None
+        # com o contexto da request: só as relações que a resposta mostra (?fields=/?expand=)
+        return queryset_validators(queryset, self.get_serializer_class()(context=self.get_serializer_context()))
+
+    def get_validators(self, request, kwargs):
+        def compute():
+            return self.compute_validators(self.conditional_queryset(kwargs))
+
+        cached_value = getattr(self, 'cached_value', None)
+        if cached_value is None:
+            return compute()
+        # viewsets de catálogo: os validadores ficam no catalog_cache (invalidados nas escritas)
+        return cached_value(request, 'validators', compute, **kwargs)
+
+    def row_version(self, validators, kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        parts = (self.basename, kwargs.get(lookup_url_kwarg), validators['version'])
+        return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:16]
+
+    def make_etag(self, validators, kwargs):
+        request = self.request
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        # detalhe/listagem (e não a ação nem o partial=True do PATCH): o If-Match usa a ETag do GET
+        parts = (self.basename, self.detail, request.get_host(), request.accepted_media_type,
+                 kwargs.get(lookup_url_kwarg), sorted(request.query_params.lists()), validators['state'])
+        if self.conditional_per_user:
+            parts += (request.user.pk,)
+        representation = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+        return quote_etag(f'{self.row_version(validators, kwargs)}.{representation}')
+
+    def last_modified(self, validators):
+        return validators['last_modified'] if self.detail else None
+
+    def check_preconditions(self, request, validators, kwargs):
+        etag = self.make_etag(validators, kwargs)
+        if_match = parse_etags(request.META.get('HTTP_IF_MATCH', ''))
+        if if_match:
+            # a resposta comprimida leva a ETag como W/"..." (mesmo conteúdo): vale a forma forte
+            if if_match != ['*'] and etag not in {tag.removeprefix('W/') for tag in if_match}:
+                raise PreconditionFailed()
+            return None
+        response = get_conditional_response(request._request, etag=etag, last_modified=self.last_modified(validators))
+        if response is not None and response.status_code == status.HTTP_412_PRECONDITION_FAILED:
+            raise PreconditionFailed()
+        return response
+
+    def check_write_preconditions(self, request, validators, kwargs):
+        # só a versão da linha: qualquer representação lida (?expand=, ?fields=, formato) serve
+        if_match = parse_etags(request.META.get('HTTP_IF_MATCH', ''))
+        if if_match:
+            version = self.row_version(validators, kwargs)
+            # W/"..." da resposta comprimida também vale
+            versions = {tag.removeprefix('W/').strip('"').split('.', 1)[0] for tag in if_match}
+            if if_match != ['*'] and version not in versions:
+                raise PreconditionFailed()
+            return
+        response = get_conditional_response(request._request, last_modified=validators['row_modified'])
+        if response is not None and response.status_code == status.HTTP_412_PRECONDITION_FAILED:
+            raise PreconditionFailed()
+
+    def set_validator_headers(self, response, validators, kwargs):
+        if not validators or (self.detail and not validators['count']):
+            return response
+        response['ETag'] = self.make_etag(validators, kwargs)
+        last_modified = self.last_modified(validators)
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def conditional_response(self, request, handler, *args, **kwargs):
+        validators = self.get_validators(request, kwargs)
+        if validators is None or (self.detail and not validators['count']):
+            # detalhe inexistente: o handler responde o 404
+            return handler(request, *args, **kwargs)
+        not_modified = self.check_preconditions(request, validators, kwargs)
+        if not_modified is not None:
+            return self.set_validator_headers(not_modified, validators, kwargs)
+        if not self.detail:
+            # o paginador reaproveita o COUNT dos validadores
+            self.known_count = validators['count']
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            self.set_validator_headers(response, validators, kwargs)
+        return response
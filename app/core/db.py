@@ -0,0 +1,60 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections
+
+# Estatísticas de conexão com o banco, por processo (worker).
+# No modo 'pool' vêm do próprio pool do psycopg (em uso, ociosas, espera, timeouts);
+# nos outros modos contamos as conexões abertas (signal connection_created), que
+# mostra o quanto o CONN_MAX_AGE está evitando reconexões.
+
+_lock = threading.Lock()
+_opened = {}
+
+
+def count_connection(alias):
+    with _lock:
+        opened = _opened.setdefault(alias, {'connections_opened': 0, 'last_opened_at': None})
+        opened['connections_opened'] += 1
+        opened['last_opened_at'] = time.time()
+
+
+def _pool_stats(pool):
+    raw = pool.get_stats()
+    queued = raw.get('requests_queued', 0)
+    wait_ms = raw.get('requests_wait_ms', 0)
+    return {
+        'in_use': raw.get('pool_size', 0) - raw.get('pool_available', 0),
+        'idle': raw.get('pool_available', 0),
+        'size': raw.get('pool_size', 0),
+        'min_size': raw.get('pool_min', 0),
+        'max_size': raw.get('pool_max', 0),
+        'waiting': raw.get('requests_waiting', 0),
+        'requests': raw.get('requests_num', 0),
+        'wait_ms_total': wait_ms,
+        'wait_ms_avg': wait_ms / queued if queued else 0.0,
+        # pedidos que falharam esperando (timeout ou fila cheia)
+        'timeouts': raw.get('requests_errors', 0),
+        'raw': raw,
+    }
+
+
+def db_stats():
+    stats = {}
+    for alias in connections:
+        wrapper = connections[alias]
+        pool = getattr(wrapper, 'pool', None) if wrapper.vendor == 'postgresql' else None
+        with _lock:
+            opened = dict(_opened.get(alias, {'connections_opened': 0, 'last_opened_at': None}))
+        entry = {
+            'mode': getattr(settings, 'DB_POOL_MODE', 'none'),
+            'vendor': wrapper.vendor,
+            'conn_max_age': wrapper.settings_dict.get('CONN_MAX_AGE'),
+            'health_checks': wrapper.settings_dict.get('CONN_HEALTH_CHECKS'),
+            **opened,
+        }
+        if pool is not None:
+            entry['pool'] = _pool_stats(pool)
+        stats[alias] = entry
+    return stats
@@ -0,0 +1,124 @@
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+# Planejamento de consultas: lê a árvore de campos aninhados de um serializer e
+# monta os select_related/prefetch_related equivalentes, evitando o N+1 nas listagens.
+
+
+def _nested_serializer(field):
+    # devolve o serializer aninhado (ou o child de um many=True), se houver
+    if field.write_only:
+        return None
+    if isinstance(field, serializers.ListSerializer):
+        field = field.child
+    if isinstance(field, serializers.ModelSerializer):
+        return field
+    return None
+
+
+def _pk_list(field, model):
+    # relação reversa colapsada em lista de pks (ver core/sparse.py): o campo do modelo, se houver
+    if field.write_only or not isinstance(field, serializers.ManyRelatedField):
+        return None
+    if not field.source or '.' in field.source:
+        return None
+    try:
+        model_field = model._meta.get_field(field.source)
+    except Exception:
+        return None
+    return model_field if model_field.one_to_many else None
+
+
+def plan_serializer(serializer, prefix=''):
+    """Retorna (select_related, prefetch_related) necessários para o serializer."""
+    model = serializer.Meta.model
+    select, prefetch = [], []
+
+    for field in serializer.fields.values():
+        reverse = _pk_list(field, model)
+        if reverse is not None:
+            # só as pks dos filhos: a coluna da FK e a pk, nada mais
+            queryset = reverse.related_model._default_manager.only(reverse.field.name)
+            if not queryset.ordered:
+                queryset = queryset.order_by('pk')
+            prefetch.append(Prefetch(prefix + field.source, queryset=queryset))
+            continue
+        nested = _nested_serializer(field)
+        if nested is None or not field.source or '.' in field.source:
+            continue
+
+        try:
+            model_field = model._meta.get_field(field.source)
+        except Exception:
+            continue
+        if not model_field.is_relation:
+            continue
+
+        lookup = prefix + field.source
+        if model_field.many_to_one or model_field.one_to_one:
+            # FK/OneToOne: um JOIN resolve, e os aninhados continuam a partir dele
+            select.append(lookup)
+            sub_select, sub_prefetch = plan_serializer(nested, lookup + '__')
+            select += sub_select
+            prefetch += sub_prefetch
+        else:
+            # relações reversas/M2M: uma consulta extra, usando o manager padrão
+            # do modelo relacionado (SoftDeleteManager -> já filtra is_deleted)
+            sub_select, sub_prefetch = plan_serializer(nested)
+            related_model = model_field.related_model
+            queryset = related_model._default_manager.all()
+            if not queryset.ordered:
+                # ordem estável dos filhos (a mesma usada pela leitura via .values())
+                queryset = queryset.order_by('pk')
+            if sub_select:
+                queryset = queryset.select_related(*sub_select)
+            if sub_prefetch:
+                queryset = queryset.prefetch_related(*sub_prefetch)
+            prefetch.append(Prefetch(lookup, queryset=queryset))
+
+    return select, prefetch
+
+
+def relation_paths(serializer, prefix=''):
+    """Lookups de todas as relações aninhadas do serializer (FK e reversas), em profundidade."""
+    model = serializer.Meta.model
+    paths = []
+    for field in serializer.fields.values():
+        reverse = _pk_list(field, model)
+        if reverse is not None:
+            paths.append((prefix + field.source, reverse.related_model))
+            continue
+        nested = _nested_serializer(field)
+        if nested is None or not field.source or '.' in field.source:
+            continue
+        try:
+            model_field = model._meta.get_field(field.source)
+        except Exception:
+            continue
+        if not model_field.is_relation:
+            continue
+        lookup = prefix + field.source
+        paths.append((lookup, model_field.related_model))
+        paths += relation_paths(nested, lookup + '__')
+    return paths
+
+
+def eager_load(queryset, serializer):
+    if not isinstance(serializer, serializers.ModelSerializer):
+        return queryset
+    select, prefetch = plan_serializer(serializer)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset
+
+
+class EagerLoadingMixin:
+    # Mixin para viewsets: aplica o plano do serializer ao queryset automaticamente
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer = self.get_serializer_class()(context={'request': self.request})
+        return eager_load(queryset, serializer)
+
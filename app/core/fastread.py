@@ -0,0 +1,238 @@
+from collections import defaultdict
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.http import Http404
+from rest_framework import serializers
+from rest_framework.permissions import BasePermission
+from rest_framework.relations import PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+from .metrics import timed
+from .sparse import SparseFieldsMixin, requested_paths
+
+# Leitura rápida para list/retrieve: em vez de instanciar o modelo e passar cada
+# linha pelo serializer, busca as colunas com .values() e monta dicts direto,
+# usando os próprios campos declarados no serializer (mesma saída, byte a byte).
+# Relações aninhadas custam uma query cada (FK pelo id, reversas agrupadas pelo
+# id do pai). Serializers com campos que não dá para mapear numa coluna
+# (SerializerMethodField, source='*', source com '.', ...) caem no caminho normal.
+# Escritas continuam usando os serializers de sempre. Views com permissões por
+# objeto (has_object_permission) também: elas precisam da instância do modelo.
+
+
+class Unsupported(Exception):
+    pass
+
+
+VALUE, PK, ONE, MANY = 'value', 'pk', 'one', 'many'
+
+
+class PkReader:
+    # filhos de uma relação reversa colapsada (ver sparse.py): só a pk de cada um
+    def __init__(self, model):
+        self.model = model
+        self.pk = model._meta.pk.attname
+
+    def values(self, queryset, extra=()):
+        return queryset.values(*dict.fromkeys((self.pk,) + tuple(extra)))
+
+    def fetch(self, queryset, extra=()):
+        rows = list(self.values(queryset, extra))
+        return rows, [row[self.pk] for row in rows]
+
+    async def afetch(self, queryset, extra=()):
+        rows = [row async for row in self.values(queryset, extra)]
+        return rows, [row[self.pk] for row in rows]
+
+
+class ValuesReader:
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.pk = self.model._meta.pk.attname
+        self.plan = []
+        columns = [self.pk]
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            source = field.source
+            if not source or source == '*' or '.' in source:
+                raise Unsupported(name)
+            try:
+                model_field = self.model._meta.get_field(source)
+            except Exception:
+                raise Unsupported(name)
+
+            if isinstance(field, serializers.ListSerializer):
+                if not (model_field.one_to_many and isinstance(field.child, serializers.ModelSerializer)):
+                    raise Unsupported(name)
+                # relação reversa: filhos pelo manager padrão (sem os apagados), agrupados pelo pai
+                remote = model_field.field
+                self.plan.append((name, MANY, remote.attname, (ValuesReader(field.child), remote.attname)))
+            elif isinstance(field, serializers.ManyRelatedField) and isinstance(field.child_relation, PrimaryKeyRelatedField):
+                if not model_field.one_to_many or field.child_relation.pk_field is not None:
+                    raise Unsupported(name)
+                remote = model_field.field
+                self.plan.append((name, MANY, remote.attname, (PkReader(model_field.related_model), remote.attname)))
+            elif isinstance(field, serializers.ModelSerializer):
+                if not (model_field.many_to_one or model_field.one_to_one) or not model_field.concrete:
+                    raise Unsupported(name)
+                self.plan.append((name, ONE, model_field.attname, ValuesReader(field)))
+                columns.append(model_field.attname)
+            elif isinstance(field, PrimaryKeyRelatedField):
+                if field.pk_field is not None or not model_field.concrete:
+                    raise Unsupported(name)
+                self.plan.append((name, PK, model_field.attname, None))
+                columns.append(model_field.attname)
+            elif isinstance(field, (serializers.RelatedField, serializers.ManyRelatedField,
+                                    serializers.SerializerMethodField, serializers.BaseSerializer)):
+                raise Unsupported(name)
+            else:
+                if model_field.is_relation or not model_field.concrete:
+                    raise Unsupported(name)
+                self.plan.append((name, VALUE, model_field.attname, field.to_representation))
+                columns.append(model_field.attname)
+
+        self.columns = tuple(dict.fromkeys(columns))
+
+    @classmethod
+    def for_serializer(cls, serializer_class, request=None):
+        # um reader por combinação de ?fields=/?expand= (a forma canônica é a chave)
+        if issubclass(serializer_class, SparseFieldsMixin):
+            return _reader_for(serializer_class, requested_paths(request))
+        return _reader_for(serializer_class)
+
+    def values(self, queryset, extra=()):
+        columns = tuple(dict.fromkeys(self.columns + tuple(extra)))
+        return queryset.select_related(None).prefetch_related(None).values(*columns)
+
+    def fetch(self, queryset, extra=()):
+        rows = list(self.values(queryset, extra))
+        return rows, self.build(rows)
+
+    async def afetch(self, queryset, extra=()):
+        rows = [row async for row in self.values(queryset, extra)]
+        return rows, await self.abuild(rows)
+
+    def build(self, rows):
+        nested = {}
+        for name, kind, reader, queryset, key in self._related(rows):
+            related = reader.fetch(queryset, extra=(key,)) if queryset is not None else ((), ())
+            nested[name] = self._group(kind, key, *related)
+        return self._assemble(rows, nested)
+
+    async def abuild(self, rows):
+        # mesma montagem do build(), com as queries das relações pelo ORM assíncrono
+        nested = {}
+        for name, kind, reader, queryset, key in self._related(rows):
+            related = await reader.afetch(queryset, extra=(key,)) if queryset is not None else ((), ())
+            nested[name] = self._group(kind, key, *related)
+        return self._assemble(rows, nested)
+
+    def _related(self, rows):
+        # (nome, tipo, reader, queryset ou None, coluna de agrupamento) de cada relação aninhada
+        for name, kind, column, extra in self.plan:
+            if kind == ONE:
+                ids = {row[column] for row in rows if row[column] is not None}
+                # mesmo comportamento do acesso instance.fk: _base_manager (inclui apagados)
+                queryset = extra.model._base_manager.filter(pk__in=ids) if ids else None
+                yield name, kind, extra, queryset, extra.pk
+            elif kind == MANY:
+                reader, remote = extra
+                parent_ids = [row[self.pk] for row in rows]
+                queryset = None
+                if parent_ids:
+                    queryset = reader.model._default_manager.filter(**{f'{remote}__in': parent_ids})
+                    if not queryset.ordered:
+                        queryset = queryset.order_by('pk')
+                yield name, kind, reader, queryset, remote
+
+    @staticmethod
+    def _group(kind, key, rows, data):
+        if kind == ONE:
+            return {row[key]: item for row, item in zip(rows, data)}
+        groups = defaultdict(list)
+        for row, item in zip(rows, data):
+            groups[row[key]].append(item)
+        return groups
+
+    def _assemble(self, rows, nested):
+        output = []
+        for row in rows:
+            item = {}
+            for name, kind, column, extra in self.plan:
+                if kind == VALUE:
+                    value = row[column]
+                    item[name] = None if value is None else extra(value)
+                elif kind == PK:
+                    item[name] = row[column]
+                elif kind == ONE:
+                    item[name] = None if row[column] is None else nested[name].get(row[column])
+                else:
+                    item[name] = nested[name].get(row[self.pk], [])
+            output.append(item)
+        return output
+
+
+@lru_cache(maxsize=512)
+def _reader_for(serializer_class, paths=None):
+    try:
+        if paths is None:
+            return ValuesReader(serializer_class())
+        fields, expand = paths
+        return ValuesReader(serializer_class(fields=fields, expand=expand))
+    except Unsupported:
+        return None
+
+
+class FastReadMixin:
+    # Mixin para viewsets: list/retrieve via ValuesReader quando o serializer permite
+
+    def get_values_reader(self):
+        if not getattr(settings, 'FAST_READ_ENABLED', True):
+            return None
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, serializers.ModelSerializer):
+            return None
+        return ValuesReader.for_serializer(serializer_class, self.request)
+
+    def has_object_permissions(self):
+        # permissões compostas (A & B) também contam: podem olhar o objeto
+        return any(type(permission).has_object_permission is not BasePermission.has_object_permission
+                   for permission in self.get_permissions())
+
+    def list(self, request, *args, **kwargs):
+        reader = self.get_values_reader()
+        if reader is None:
+            return super().list(request, *args, **kwargs)
+
+        # as colunas de ordenação da paginação keyset também precisam vir no .values()
+        extra = getattr(self.paginator, 'ordering', ()) if self.paginator is not None else ()
+        queryset = reader.values(self.filter_queryset(self.get_queryset()), extra)
+        page = self.paginate_queryset(queryset)
+        rows = list(page) if page is not None else list(queryset)
+        with timed('serialize'):
+            data = reader.build(rows)
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        reader = self.get_values_reader()
+        if reader is None or self.has_object_permissions():
+            return super().retrieve(request, *args, **kwargs)
+
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            rows = list(reader.values(queryset)[:1])
+        except (TypeError, ValueError, ValidationError):
+            raise Http404
+        if not rows:
+            raise Http404
+        with timed('serialize'):
+            data = reader.build(rows)[0]
+        return Response(data)
@@ -0,0 +1,324 @@
+import hmac
+import logging
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from rest_framework.response import Response
+
+# Métricas por view (viewset.action): queries SQL, tempo de banco, de serialização,
+# de render e total. Tudo fica num coletor por request (contextvar, funciona em
+# WSGI e ASGI) e é agregado em histogramas por processo, expostos em texto do
+# Prometheus em /metrics.
+# Contagem e tempo de SQL e o tempo total valem para todos os requests; o
+# detalhamento (serialização, render e histogramas por fase) só para a fração
+# amostrada (METRICS['SAMPLE_RATE']). O header Server-Timing expõe esses tempos a
+# qualquer cliente, por isso só sai com METRICS['SERVER_TIMING'] ligado.
+# A serialização é medida por quem a faz: TimedReadMixin (list/retrieve pelo
+# serializer), FastReadMixin e as views async.
+# As fases se sobrepõem: queries disparadas durante a serialização contam em
+# 'db' e em 'serialize'.
+# /metrics exige o METRICS['TOKEN'] (Bearer) ou um usuário staff logado; sem token
+# configurado, só staff.
+
+logger = logging.getLogger(__name__)
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+PHASES = ('db', 'serialize', 'render')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+def metrics_settings():
+    return {
+        'ENABLED': True, 'SAMPLE_RATE': 1.0, 'SERVER_TIMING': False, 'QUERY_BUDGET': None, 'TOKEN': '',
+        **getattr(settings, 'METRICS', {}),
+    }
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_labels(labels, le=bound)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(labels)} {total}')
+            lines.append(f'{self.name}_count{_labels(labels)} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.series = {}
+
+    def inc(self, labels):
+        self.series[labels] = self.series.get(labels, 0) + 1
+
+    def expose(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        lines += [f'{self.name}{_labels(labels)} {value}' for labels, value in sorted(self.series.items())]
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = Counter('api_requests_total', 'Requests por view e status.')
+            self.over_budget = Counter('api_requests_over_query_budget_total',
+                                       'Requests acima do orçamento de queries.')
+            self.duration = Histogram('api_request_duration_seconds', 'Tempo total do request.',
+                                      DURATION_BUCKETS)
+            self.queries = Histogram('api_request_queries', 'Queries SQL por request.', QUERY_BUCKETS)
+            self.phases = Histogram('api_request_phase_seconds',
+                                    'Tempo por fase (db, serialize, render), requests amostrados.',
+                                    DURATION_BUCKETS)
+
+    def record(self, metrics, status):
+        view = (('view', metrics.view),)
+        with self.lock:
+            self.requests.inc(view + (('status', status),))
+            self.duration.observe(view, metrics.total)
+            self.queries.observe(view, metrics.queries)
+            if metrics.over_budget:
+                self.over_budget.inc(view)
+            if metrics.sampled:
+                for phase in PHASES:
+                    self.phases.observe(view + (('phase', phase),), getattr(metrics, phase))
+
+    def expose(self):
+        with self.lock:
+            lines = []
+            for metric in (self.requests, self.over_budget, self.duration, self.queries, self.phases):
+                lines += metric.expose()
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestMetrics:
+    __slots__ = ('view', 'sampled', 'start', 'total', 'queries', 'db', 'serialize', 'render', 'over_budget')
+
+    def __init__(self, sampled):
+        self.view = 'unmatched'
+        self.sampled = sampled
+        self.start = time.perf_counter()
+        self.total = self.db = self.serialize = self.render = 0.0
+        self.queries = 0
+        self.over_budget = False
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries"',
+            f'serialize;dur={self.serialize * 1000:.2f}',
+            f'render;dur={self.render * 1000:.2f}',
+            f'total;dur={self.total * 1000:.2f}',
+        ])
+
+
+@contextmanager
+def timed(phase):
+    """Soma o tempo do bloco na fase do request atual (só em requests amostrados)."""
+    metrics = _current.get()
+    if metrics is None or not metrics.sampled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(metrics, phase, getattr(metrics, phase) + time.perf_counter() - start)
+
+
+def _query_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db += time.perf_counter() - start
+        metrics.queries += 1
+
+
+def _attach_query_wrapper(sender, connection, **kwargs):
+    # no início da lista: execute_wrapper() do Django remove com pop() o último da lista
+    if _query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _query_wrapper)
+
+
+def _attach_to_open_connections(sender, **kwargs):
+    # conexões abertas antes do install() (o request_started roda na mesma thread
+    # que o ORM usa: a do request no WSGI, a thread_sensitive no ASGI)
+    for connection in connections.all(initialized_only=True):
+        _attach_query_wrapper(None, connection)
+
+
+class TimedReadMixin:
+    # Mixin para viewsets: list/retrieve do DRF com o .data do serializer medido na
+    # fase 'serialize' (fica logo antes do ModelViewSet, abaixo dos mixins de leitura)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(queryset if page is None else page, many=True)
+        with timed('serialize'):
+            data = serializer.data
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object())
+        with timed('serialize'):
+            data = serializer.data
+        return Response(data)
+
+
+_installed = False
+
+
+def install():
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_attach_query_wrapper, dispatch_uid='app.core.metrics')
+    request_started.connect(_attach_to_open_connections, dispatch_uid='app.core.metrics')
+
+
+def view_label(view_func, request):
+    cls = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if cls is None:
+        return getattr(view_func, '__name__', 'unknown')
+    actions = getattr(view_func, 'actions', None)
+    action = actions.get(request.method.lower()) if actions else request.method.lower()
+    return f'{cls.__name__}.{action}'
+
+
+class MetricsMiddleware:
+    """Coloque no topo do MIDDLEWARE para medir o request inteiro."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install()
+
+    def start(self, request):
+        config = metrics_settings()
+        if not config['ENABLED']:
+            return None, None, config
+        metrics = RequestMetrics(sampled=random.random() < config['SAMPLE_RATE'])
+        request._metrics = metrics
+        return metrics, _current.set(metrics), config
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics, token, config = self.start(request)
+        if metrics is None:
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(response, metrics, config)
+
+    async def __acall__(self, request):
+        metrics, token, config = self.start(request)
+        if metrics is None:
+            return await self.get_response(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(response, metrics, config)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = getattr(request, '_metrics', None)
+        if metrics is not None:
+            metrics.view = view_label(view_func, request)
+
+    def process_template_response(self, request, response):
+        # chamado logo antes do render da Response do DRF; o callback marca o fim
+        metrics = getattr(request, '_metrics', None)
+        if metrics is not None and metrics.sampled:
+            start = time.perf_counter()
+
+            def rendered(response):
+                metrics.render += time.perf_counter() - start
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, response, metrics, config):
+        metrics.total = time.perf_counter() - metrics.start
+        budget = config['QUERY_BUDGET']
+        if budget is not None and metrics.queries > budget:
+            metrics.over_budget = True
+            response['X-Query-Budget'] = f'exceeded; queries={metrics.queries}; budget={budget}'
+            logger.warning('%s: %d queries (orçamento %d)', metrics.view, metrics.queries, budget)
+        if metrics.sampled and config['SERVER_TIMING']:
+            response['Server-Timing'] = metrics.server_timing()
+        registry.record(metrics, response.status_code)
+        return response
+
+
+def _authorized(request, token):
+    if token and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return True
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_authenticated and user.is_staff)
+
+
+def metrics_view(request):
+    token = metrics_settings()['TOKEN']
+    if not _authorized(request, token):
+        # sem token configurado o endpoint não fica público: só staff
+        return HttpResponse(status=401 if token else 403)
+    return HttpResponse(registry.expose(), content_type='text/plain; version=0.0.4; charset=utf-8')
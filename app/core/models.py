@@ -1,19 +1,82 @@
 from django.db import models
+from django.dispatch import Signal
+from django.utils import timezone
 
-class SoftDeleteManager(models.Manager):
+# condição dos índices parciais: só as linhas vivas entram no índice
+LIVE = models.Q(is_deleted=False)
+
+# enviado quando linhas mudam em lote, sem passar por save() (update, bulk_update, bulk_create)
+bulk_changed = Signal()
+
+
+class SoftDeleteQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # como o auto_now do save(): toda escrita mexe no updated_at (ETag/Last-Modified dependem dele)
+        kwargs.setdefault('updated_at', timezone.now())
+        rows = super().update(**kwargs)
+        if rows:
+            bulk_changed.send(sender=self.model, fields=tuple(kwargs))
+        return rows
+
+    def soft_delete(self):
+        # soft delete em lote: um único UPDATE em vez de um save() por instância
+        return self.update(is_deleted=True, updated_at=timezone.now())
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        if objs:
+            bulk_changed.send(sender=self.model, fields=None)
+        return objs
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
     def get_queryset(self):
         return super().get_queryset().filter(is_deleted=False)
 
+
+class DirtyFieldsMixin:
+    # guarda os valores carregados do banco para saber quais campos mudaram
+    ignored_dirty_fields = ('updated_at',)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = instance._current_values()
+        return instance
+
+    def _current_values(self):
+        return {
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__ and field.attname not in self.ignored_dirty_fields
+        }
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_values = self._current_values()
+
+    def loaded_values(self):
+        # valores como vieram do banco (None para instâncias que não vieram do banco)
+        return getattr(self, '_loaded_values', None)
+
+    def changed_fields(self):
+        loaded = getattr(self, '_loaded_values', None)
+        current = self._current_values()
+        if loaded is None:
+            return list(current)
+        return [name for name, value in current.items() if loaded.get(name, value) != value]
+
+
 class BaseModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
 
     objects = SoftDeleteManager()
-    all_objects = models.Manager()
+    all_objects = models.Manager.from_queryset(SoftDeleteQuerySet)()
     def delete(self, *args, **kwargs):
         self.is_deleted = True
-        self.save()
+        self.save(update_fields=['is_deleted', 'updated_at'])
 
     class Meta:
-        abstract = True
\ No newline at end of file
+        abstract = True
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+import yaml
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import quote_etag
+from django.views import View
+from drf_spectacular.renderers import OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+# Schema OpenAPI pré-gerado: o `manage.py build_schema` gera o schema.yml no build
+# (versionado no git junto com o código) e as rotas /api/schema/ servem esse
+# arquivo da memória, com ETag, em vez de introspectar todas as viewsets e
+# serializers a cada request. `build_schema --check` falha se o arquivo não
+# bate com o código (rode no CI). A introspecção em tempo real fica só em DEBUG.
+
+YAML = 'application/vnd.oai.openapi'
+JSON = 'application/vnd.oai.openapi+json'
+
+
+def schema_path():
+    return Path(getattr(settings, 'OPENAPI_SCHEMA_FILE', Path(settings.BASE_DIR) / 'schema.yml'))
+
+
+def generate_schema():
+    """O mesmo YAML do `manage.py spectacular` (bytes)."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS(urlconf=None, api_version=None)
+    schema = generator.get_schema(request=None, public=True)
+    return OpenApiYamlRenderer().render(schema, renderer_context={})
+
+
+class SchemaArtifact:
+    # o arquivo lido uma vez por processo; o JSON é montado na primeira vez que for pedido
+    def __init__(self, content):
+        self.content = content
+        self.digest = hashlib.sha256(content).hexdigest()
+        self._json = None
+        self._lock = threading.Lock()
+
+    def render(self, media_type):
+        if media_type == YAML:
+            return self.content
+        with self._lock:
+            if self._json is None:
+                self._json = json.dumps(yaml.safe_load(self.content), ensure_ascii=False).encode('utf-8')
+        return self._json
+
+    def etag(self, media_type):
+        return quote_etag(f'{self.digest[:32]}-{"yaml" if media_type == YAML else "json"}')
+
+
+_artifact = None
+_artifact_lock = threading.Lock()
+
+
+def load_artifact(reload=False):
+    global _artifact
+    with _artifact_lock:
+        if _artifact is None or reload:
+            path = schema_path()
+            _artifact = SchemaArtifact(path.read_bytes()) if path.exists() else None
+        return _artifact
+
+
+class SchemaView(View):
+    # YAML por padrão; JSON com ?format=json ou Accept: application/json / +json
+    http_method_names = ['get', 'head', 'options']
+
+    def get(self, request, *args, **kwargs):
+        artifact = load_artifact()
+        if artifact is None:
+            return HttpResponse('Schema não gerado: rode `python manage.py build_schema`.',
+                                status=503, content_type='text/plain; charset=utf-8')
+        media_type = self.negotiate(request)
+        etag = artifact.etag(media_type)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = HttpResponse(artifact.render(media_type), content_type=f'{media_type}; charset=utf-8')
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, no_cache=True)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+    @staticmethod
+    def negotiate(request):
+        fmt = request.GET.get('format', '')
+        if fmt in ('json', 'openapi-json'):
+            return JSON
+        if fmt in ('yaml', 'openapi'):
+            return YAML
+        return JSON if 'json' in request.headers.get('Accept', '') else YAML
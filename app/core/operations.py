@@ -0,0 +1,19 @@
+from django.db.migrations.operations import AddIndex
+
+# Operações de migração usadas pelo app
+
+
+class AddPostgresIndex(AddIndex):
+    """AddIndex que só cria o índice no Postgres (GIN, tsvector...).
+
+    O estado da migração sempre inclui o índice; em outros bancos (SQLite nos
+    testes) a criação é simplesmente ignorada.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
@@ -0,0 +1,45 @@
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+try:
+    import orjson
+except ImportError:  # dependência opcional: sem ela fica o JSONParser padrão
+    orjson = None
+
+# Parsers da API: JSON com orjson e XML/YAML importados só quando usados
+
+
+class FastJSONParser(JSONParser):
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', 'utf-8')
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read() if stream is not None else b'')
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
+
+
+class LazyParser(BaseParser):
+    parser_path = None
+    _parser = None
+
+    @classmethod
+    def get_parser(cls):
+        if cls._parser is None:
+            cls._parser = import_string(cls.parser_path)()
+        return cls._parser
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return self.get_parser().parse(stream, media_type, parser_context)
+
+
+class LazyXMLParser(LazyParser):
+    media_type = 'application/xml'
+    parser_path = 'rest_framework_xml.parsers.XMLParser'
+
+
+class LazyYAMLParser(LazyParser):
+    media_type = 'application/yaml'
+    parser_path = 'rest_framework_yaml.parsers.YAMLParser'
@@ -0,0 +1,70 @@
+from django.utils.module_loading import import_string
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # dependência opcional: sem ela fica o JSONRenderer padrão
+    orjson = None
+
+# Renderers da API.
+# FastJSONRenderer usa orjson (bem mais rápido que o json da stdlib) e gera a mesma
+# saída do JSONRenderer: tipos que o orjson não trata igual ao DRF (Decimal, datetime,
+# lazy strings...) passam pelo encoder do DRF. XML e YAML só são importados quando
+# algum cliente realmente pede esses formatos.
+
+_drf_encoder = encoders.JSONEncoder()
+
+
+def _default(obj):
+    return _drf_encoder.default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME) if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (orjson is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=self.options)
+        except orjson.JSONEncodeError:
+            # inteiros gigantes, tipos desconhecidos...: o caminho padrão decide
+            return super().render(data, accepted_media_type, renderer_context)
+        # mesmo escape do JSONRenderer para U+2028/U+2029
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class LazyRenderer(BaseRenderer):
+    # media_type/format ficam na classe (a negociação só precisa deles);
+    # o renderer de verdade é importado no primeiro render
+    renderer_path = None
+    _renderer = None
+
+    @classmethod
+    def get_renderer(cls):
+        if cls._renderer is None:
+            cls._renderer = import_string(cls.renderer_path)()
+        return cls._renderer
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return self.get_renderer().render(data, accepted_media_type, renderer_context)
+
+
+class LazyXMLRenderer(LazyRenderer):
+    media_type = 'application/xml'
+    format = 'xml'
+    charset = 'utf-8'
+    renderer_path = 'rest_framework_xml.renderers.XMLRenderer'
+
+
+class LazyYAMLRenderer(LazyRenderer):
+    media_type = 'application/yaml'
+    format = 'yaml'
+    charset = 'utf-8'
+    renderer_path = 'rest_framework_yaml.renderers.YAMLRenderer'
@@ -0,0 +1,8 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+
+# Extensões do drf-spectacular (registradas ao importar, ver AppConfig.ready)
+
+
+class CachedJWTScheme(SimpleJWTScheme):
+    # mesmo esquema 'jwtAuth' do JWTAuthentication padrão
+    target_class = 'app.core.authentication.CachedJWTAuthentication'
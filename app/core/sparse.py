@@ -0,0 +1,93 @@
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+# Sparse fieldsets e expansão sob demanda nos serializers.
+# ?fields=id,name,cart.id escolhe os campos da resposta ("." desce nos aninhados)
+# e ?expand=cart.items.product troca o id de uma relação pelo objeto ("." expande
+# dentro dele; os pais entram junto). Sem expand, toda relação aninhada sai só
+# como pk (ou lista de pks): o plano de eager loading (eager.py) e o ValuesReader
+# (fastread.py) leem os campos já reduzidos, então o que não foi pedido não é
+# buscado nem pré-carregado. O fields só vale em leituras (GET/HEAD): numa escrita
+# os campos de entrada não podem sumir.
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_paths(value):
+    """'a,b.c' -> {'a': {}, 'b': {'c': {}}}; uma árvore já montada passa direto."""
+    if isinstance(value, dict):
+        return value
+    tree = {}
+    for path in (value or '').split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if not name:
+                break
+            node = node.setdefault(name, {})
+    return tree
+
+
+def _flatten(tree, prefix=''):
+    for name, subtree in tree.items():
+        path = prefix + name
+        if subtree:
+            yield from _flatten(subtree, path + '.')
+        else:
+            yield path
+
+
+def canonical_paths(value):
+    # forma única da lista de caminhos (chave de cache): ordenada e sem repetição
+    return ','.join(sorted(_flatten(parse_paths(value))))
+
+
+def requested_paths(request):
+    """(fields, expand) da query string, já na forma canônica ('' quando ausentes)."""
+    if request is None:
+        return '', ''
+    params = getattr(request, 'query_params', request.GET)
+    fields = params.get(FIELDS_PARAM, '') if request.method in SAFE_METHODS else ''
+    return canonical_paths(fields), canonical_paths(params.get(EXPAND_PARAM, ''))
+
+
+def collapse(field):
+    # relação aninhada não expandida: só a pk (ou a lista de pks), sem buscar o objeto
+    kwargs = {'read_only': True}
+    if field.source:
+        kwargs['source'] = field.source
+    return serializers.PrimaryKeyRelatedField(many=isinstance(field, serializers.ListSerializer), **kwargs)
+
+
+class SparseFieldsMixin:
+    """ModelSerializer com ?fields= e ?expand=; também aceita fields=/expand= no construtor."""
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sparse = None
+        if fields is not None or expand is not None:
+            self._sparse = (parse_paths(fields), parse_paths(expand))
+
+    def get_sparse_paths(self):
+        # os aninhados recebem a sua parte do pai; só a raiz lê a query string
+        if self._sparse is None:
+            self._sparse = tuple(map(parse_paths, requested_paths(self.context.get('request'))))
+        return self._sparse
+
+    def get_fields(self):
+        fields = super().get_fields()
+        wanted, expand = self.get_sparse_paths()
+        for name, field in list(fields.items()):
+            if field.write_only:
+                continue
+            if wanted and name not in wanted:
+                del fields[name]
+                continue
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if not isinstance(nested, SparseFieldsMixin):
+                continue
+            if name in expand:
+                nested._sparse = (wanted.get(name, {}), expand[name])
+            else:
+                fields[name] = collapse(field)
+        return fields
@@ -0,0 +1,102 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+# Perfil do cold start de um worker (comando profile_startup).
+# Roda num interpretador novo (python -X importtime), porque o processo do
+# comando já importou tudo: o filho mede as etapas do boot e dos primeiros
+# requests e o -X importtime dá o custo de import de cada módulo. Os headers
+# (com o JWT) vão pelo stdin: a linha de comando fica visível para todos no ps.
+# Só stdlib no topo: este módulo é importado no filho antes do django.setup().
+
+IMPORTTIME = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def parse_importtime(stderr):
+    """[(módulo, self_us, cumulative_us, profundidade)] das linhas do -X importtime."""
+    modules = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return modules
+
+
+def by_package(modules):
+    # soma do tempo próprio por pacote de topo (django, rest_framework, app...)
+    totals = defaultdict(int)
+    for name, self_us, _, _ in modules:
+        totals[name.split('.')[0]] += self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def _get(handler, url, host, headers):
+    # GET direto no handler WSGI (o mesmo de um worker), sem o django.test
+    from io import BytesIO
+    from urllib.parse import urlsplit
+
+    parts = urlsplit(url)
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': parts.path, 'QUERY_STRING': parts.query,
+        'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host, 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+    }
+    environ.update({'HTTP_' + name.upper().replace('-', '_'): value for name, value in headers.items()})
+    status = []
+    body = handler(environ, lambda line, response_headers, exc_info=None: status.append(int(line.split()[0])))
+    try:
+        b''.join(body)
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return status[0]
+
+
+def run_child(urls, warm, headers=None):
+    # etapas do boot na ordem em que um worker passa por elas
+    stages = []
+
+    def stage(name, fn):
+        start = time.perf_counter()
+        result = fn()
+        stages.append({'stage': name, 'ms': (time.perf_counter() - start) * 1000,
+                       'status': result if isinstance(result, int) else None})
+        return result
+
+    import django
+    stage('django.setup (settings, apps, models)', django.setup)
+
+    from django.conf import settings
+    from importlib import import_module
+    stage(f'urlconf ({settings.ROOT_URLCONF})', lambda: import_module(settings.ROOT_URLCONF))
+
+    from django.core.handlers.wsgi import WSGIHandler
+    handler = stage('handler (middlewares)', WSGIHandler)
+
+    if warm:
+        from app.core.warmup import warm_up
+        stage('warm_up', warm_up)
+
+    host = next((host for host in settings.ALLOWED_HOSTS if '*' not in host), 'localhost')
+    for attempt in ('1º', '2º'):
+        for url in urls:
+            stage(f'{attempt} GET {url}', lambda: _get(handler, url, host, headers or {}))
+    print(json.dumps(stages))
+
+
+def profile(urls, warm, headers=None, cwd=None):
+    """Roda o filho com -X importtime; devolve (etapas, módulos)."""
+    code = ('import json, sys; from app.core.startup import run_child; '
+            f'run_child({urls!r}, {warm!r}, json.load(sys.stdin))')
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code], input=json.dumps(headers or {}),
+        capture_output=True, text=True, env=dict(os.environ), cwd=cwd, check=False)
+    if process.returncode != 0:
+        raise RuntimeError(process.stderr.strip().splitlines()[-1] if process.stderr.strip() else 'falhou')
+    stages = json.loads(process.stdout.strip().splitlines()[-1])
+    return stages, parse_importtime(process.stderr)
@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+# Helpers para os testes da API
+
+
+class QueryCountTestMixin:
+    """Para TestCases com self.client: garante nº de queries fixo por endpoint."""
+
+    def count_queries(self, url, **extra):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx)
+
+    def assertConstantQueries(self, url, grow, expected=None, rounds=2, **extra):
+        # faz o GET, chama grow() para criar mais linhas e repete: a contagem não pode mudar
+        counts = []
+        for _ in range(rounds + 1):
+            counts.append(self.count_queries(url, **extra))
+            grow()
+        self.assertEqual(
+            len(set(counts)), 1,
+            f"{url}: nº de queries cresce com o nº de linhas ({counts})")
+        if expected is not None:
+            self.assertEqual(counts[0], expected, f"{url}: esperado {expected}, obtido {counts[0]}")
+        return counts[0]
+
+
+def run_concurrently(fn, calls, workers=8):
+    """Executa fn(*args) para cada args em calls, em paralelo (uma conexão por thread).
+
+    Retorna a lista de (resultado, exceção) na ordem de calls. Use com TransactionTestCase,
+    senão as threads não enxergam os dados do teste.
+    """
+    def run(args):
+        try:
+            return fn(*args), None
+        except Exception as exc:
+            return None, exc
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run, calls))
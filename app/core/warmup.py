@@ -0,0 +1,132 @@
+import gc
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.urls import URLPattern, URLResolver, get_resolver
+from rest_framework import serializers
+from rest_framework.settings import api_settings
+
+from .eager import plan_serializer, relation_paths
+from .fastread import ValuesReader
+from .openapi import JSON, load_artifact
+
+# Pré-aquecimento do worker: faz antes do primeiro request o trabalho que ele
+# pagaria sozinho (popular os resolvers de URL, montar os campos dos serializers
+# e os planos de leitura, carregar o schema, importar os renderers/parsers
+# preguiçosos). Chamado no boot (config/wsgi.py e config/asgi.py); com um
+# servidor que carrega a aplicação antes do fork (gunicorn --preload) tudo isso
+# fica numa cópia só, compartilhada copy-on-write entre os workers, e o
+# gc.freeze() evita que o coletor toque (e copie) essas páginas depois do fork.
+# O freeze só vale a pena (e só acontece, por padrão) quando há fork: com
+# WARM_UP_GC_FREEZE = 'fork' ele roda logo antes do primeiro fork do processo que
+# aqueceu; sem preload (runserver, gunicorn sem --preload, uvicorn) não há fork
+# e nada fica congelado. 'always' congela no boot; 'never' desliga.
+# Não abre conexão com o banco: conexões não podem atravessar o fork.
+
+logger = logging.getLogger(__name__)
+
+FREEZE_ON_FORK, FREEZE_ALWAYS, FREEZE_NEVER = 'fork', 'always', 'never'
+
+# processo que aqueceu e ainda não fez fork (o freeze roda uma vez, só nele)
+_freeze_pid = None
+
+
+@contextmanager
+def _stage(timings, name):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        # aquecer é opcional: o que falhar aqui é feito (e falha) no primeiro request
+        logger.warning('Pré-aquecimento: etapa %s falhou', name, exc_info=True)
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000
+
+
+def _walk(resolver):
+    # popula os dicionários de reverse de cada nível (o include é preguiçoso)
+    resolver.reverse_dict
+    resolver.namespace_dict
+    for pattern in resolver.url_patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern)
+        elif isinstance(pattern, URLPattern):
+            yield pattern
+
+
+def view_classes(patterns):
+    seen = {}
+    for pattern in patterns:
+        cls = getattr(pattern.callback, 'cls', None) or getattr(pattern.callback, 'view_class', None)
+        if cls is not None:
+            seen.setdefault(cls, None)
+    return list(seen)
+
+
+def warm_serializer(serializer_class):
+    serializer = serializer_class()
+    serializer.fields  # cached_property: monta os campos (e a introspecção do modelo)
+    if isinstance(serializer, serializers.ModelSerializer):
+        plan_serializer(serializer)
+        relation_paths(serializer)
+        # o mesmo reader que um GET sem ?fields=/?expand= usa
+        ValuesReader.for_serializer(serializer_class)
+
+
+def warm_up(freeze=False):
+    """Aquece rotas, serializers, schema e renderers; devolve {etapa: ms}."""
+    timings = {}
+    patterns = []
+    with _stage(timings, 'urls'):
+        patterns = list(_walk(get_resolver()))
+    with _stage(timings, 'serializers'):
+        classes = {getattr(view, 'serializer_class', None) for view in view_classes(patterns)}
+        for serializer_class in classes - {None}:
+            try:
+                warm_serializer(serializer_class)
+            except Exception:
+                logger.warning('Pré-aquecimento: %s falhou', serializer_class.__name__, exc_info=True)
+    with _stage(timings, 'schema'):
+        artifact = load_artifact()
+        if artifact is not None:
+            artifact.render(JSON)
+    with _stage(timings, 'renderers'):
+        for cls in (*api_settings.DEFAULT_RENDERER_CLASSES, *api_settings.DEFAULT_PARSER_CLASSES):
+            for loader in ('get_renderer', 'get_parser'):
+                if hasattr(cls, loader):
+                    getattr(cls, loader)()
+    # nada de conexão aberta herdada pelos workers
+    connections.close_all()
+    if freeze:
+        gc.freeze()
+    return timings
+
+
+def _freeze_before_fork():
+    global _freeze_pid
+    if _freeze_pid == os.getpid():
+        _freeze_pid = None
+        gc.freeze()
+
+
+def freeze_at_fork():
+    """Congela o heap logo antes do primeiro fork deste processo (os filhos herdam congelado)."""
+    global _freeze_pid
+    _freeze_pid = os.getpid()
+    # um subprocess (o autoreload do runserver, por exemplo) não chama os hooks de fork
+    os.register_at_fork(before=_freeze_before_fork)
+
+
+def warm_up_on_boot():
+    if not getattr(settings, 'WARM_UP_ON_BOOT', True):
+        return None
+    mode = getattr(settings, 'WARM_UP_GC_FREEZE', FREEZE_ON_FORK)
+    timings = warm_up(freeze=mode == FREEZE_ALWAYS)
+    if mode == FREEZE_ON_FORK:
+        freeze_at_fork()
+    logger.info('Pré-aquecimento: %s', ', '.join(f'{name} {ms:.0f} ms' for name, ms in timings.items()))
+    return timings
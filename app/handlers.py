@@ -0,0 +1,21 @@
+import logging
+
+from .outbox import claimed_at, handler
+from .reports import refresh_sales_rollups
+
+# Handlers dos eventos do outbox (app/outbox.py), rodam no worker (run_outbox_worker),
+# fora do request. Precisam ser idempotentes: um evento pode ser entregue de novo.
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_STATUS_CHANGED = 'payment.status_changed'
+
+
+@handler(PAYMENT_STATUS_CHANGED)
+def payment_status_changed(payload):
+    # rollups de vendas: incremental, recalcula só os dias alterados. Uma vez por
+    # lote: os demais eventos pegos junto já foram vistos pela primeira atualização
+    refresh_sales_rollups(unless_started_after=claimed_at())
+    if payload['status'] == 'approved':
+        # ponto de extensão para notificações (e-mail, webhook...)
+        logger.info('Pagamento %s aprovado (carrinho %s)', payload['payment_id'], payload['cart_id'])
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from app.archive import ARCHIVE_ORDER, archivable, archive_deleted
+
+
+class Command(BaseCommand):
+    help = 'Move para ArchivedRecord (ou apaga, com --purge) as linhas com soft delete antigas, em lotes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30,
+                            help='Idade mínima (desde o soft delete) para arquivar.')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--pause', type=float, default=0,
+                            help='Segundos de pausa entre lotes, para aliviar o banco.')
+        parser.add_argument('--purge', action='store_true', help='Apaga sem arquivar.')
+        parser.add_argument('--dry-run', action='store_true', help='Só conta as linhas elegíveis.')
+
+    def handle(self, days, batch_size, pause, purge, dry_run, **options):
+        if dry_run:
+            cutoff = timezone.now() - timedelta(days=days)
+            for model in ARCHIVE_ORDER:
+                self.stdout.write(f'{model._meta.label}: {archivable(model, cutoff).count()}')
+            return
+
+        totals = archive_deleted(days=days, batch_size=batch_size, purge=purge, pause=pause)
+        action = 'apagadas' if purge else 'arquivadas'
+        for label, total in totals.items():
+            self.stdout.write(f'{label}: {total} linhas {action}')
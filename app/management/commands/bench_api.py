@@ -0,0 +1,221 @@
+import json
+import time
+from itertools import count
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+
+from app.api.v1.router import routerv1
+from app.api.v1.serializers import MyTokenObtainPairSerializer
+from app.core.benchmark import latency_summary
+from app.models import Cart, CartItem, Category, Payment, Product
+from app.seed import DEFAULT_PASSWORD
+
+# Benchmark de todas as rotas da v1, em processo (test Client) contra o banco configurado.
+# As rotas GET saem do próprio router (list, detail e actions extras) mais as rotas
+# avulsas; as de escrita rodam dentro de uma transação desfeita no fim de cada
+# request, então o banco não muda. A importação do catálogo fica de fora.
+# Gere os dados antes com `manage.py seed_data`.
+
+_unique = count()
+
+
+class Route:
+    def __init__(self, name, path, method='get', payload=None, write=False, detail_of=None, queryset=None):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.payload = payload
+        self.write = write
+        self.detail_of = detail_of
+        self.queryset = queryset
+
+
+def discover_routes(product_ids, password, username):
+    routes = []
+    for prefix, viewset, basename in routerv1.registry:
+        base = f'/api/v1/{prefix}/'
+        routes.append(Route(f'{basename}-list', base))
+        routes.append(Route(f'{basename}-detail', base + '{pk}/', detail_of=base, queryset=viewset.queryset))
+        for action in viewset.get_extra_actions():
+            if not action.detail and 'get' in action.mapping:
+                routes.append(Route(f'{basename}-{action.url_name}', f'{base}{action.url_path}/'))
+
+    first = product_ids[0] if product_ids else 0
+    routes += [
+        Route('auth-stats', '/api/v1/auth/stats/'),
+        Route('db-stats', '/api/v1/db/stats/'),
+        Route('async-product-list', '/api/v1/async/products/'),
+        Route('async-product-detail', f'/api/v1/async/products/{first}/'),
+        Route('async-category-list', '/api/v1/async/categories/'),
+        Route('async-cart-current', '/api/v1/async/carts/current/'),
+        Route('cartitem-create', '/api/v1/cart-items/', 'post',
+              lambda: {'product_id': first, 'quantity': 1}, write=True),
+        Route('cartitem-bulk', '/api/v1/cart-items/bulk/', 'post',
+              lambda: {'items': [{'product_id': pk, 'quantity': 2} for pk in product_ids[:5]]}, write=True),
+        Route('cart-checkout', '/api/v1/carts/checkout/', 'post',
+              lambda: {'payment_method': 'pix'}, write=True),
+        Route('user-register', '/api/v1/register/', 'post',
+              lambda: {'username': f'bench_{time.time_ns()}_{next(_unique)}', 'password': DEFAULT_PASSWORD},
+              write=True),
+        Route('token-obtain', '/api/token/', 'post',
+              lambda: {'username': username, 'password': password}, write=True),
+    ]
+    return routes
+
+
+class Command(BaseCommand):
+    help = ('Mede p50/p95/p99, vazão e queries por request de todas as rotas da v1 e grava em JSON '
+            '(opcionalmente comparando com um resultado anterior).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', default='seed_user000000', help='Usuário autenticado nas rotas.')
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help='Senha do usuário (rota de token).')
+        parser.add_argument('--requests', type=int, default=200, help='Requests medidos por rota.')
+        parser.add_argument('--query-sample', type=int, default=3,
+                            help='Requests por rota usados só para contar queries.')
+        parser.add_argument('--route', nargs='*', help='Só as rotas com esses nomes.')
+        parser.add_argument('--with-cache', action='store_true', help='Mantém o cache do catálogo ligado.')
+        parser.add_argument('--output', help='Arquivo JSON de saída (padrão: stdout).')
+        parser.add_argument('--baseline', help='JSON de uma execução anterior para comparar.')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='Piora relativa do p95 considerada regressão (0.25 = 25%%).')
+        parser.add_argument('--fail-on-regression', action='store_true')
+
+    def handle(self, username, password, requests, query_sample, **options):
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'Usuário não encontrado: {username} (rode seed_data antes).')
+
+        token = MyTokenObtainPairSerializer.get_token(user).access_token
+        headers = {'Authorization': f'Bearer {token}'}
+        product_ids = list(Product.objects.order_by('id').values_list('id', flat=True)[:5])
+        routes = discover_routes(product_ids, password, username)
+        if options['route']:
+            routes = [route for route in routes if route.name in options['route']]
+
+        client = Client()
+        results = []
+        # o benchmark roda num processo só: a versão local basta
+        catalog_cache = {**settings.CATALOG_CACHE, 'ENABLED': options['with_cache'], 'SINGLE_PROCESS': True}
+        with override_settings(CATALOG_CACHE=catalog_cache, ALLOWED_HOSTS=['*']):
+            for route in routes:
+                results.append(self.measure(client, route, headers, requests, query_sample))
+
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'requests_per_route': requests,
+                'catalog_cache': options['with_cache'],
+                'dataset': {model.__name__.lower(): model.objects.count()
+                            for model in (Category, Product, User, Cart, CartItem, Payment)},
+            },
+            'routes': results,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                stream.write(output)
+            self.print_table(results)
+        else:
+            self.stdout.write(output)
+
+        if options['baseline']:
+            regressions = self.compare(results, options['baseline'], options['threshold'])
+            if regressions and options['fail_on_regression']:
+                raise CommandError(f'{len(regressions)} regressões.')
+
+    def request(self, client, route, url, headers):
+        method = getattr(client, route.method)
+        kwargs = {'headers': headers}
+        if route.payload is not None:
+            kwargs.update(data=route.payload(), content_type='application/json')
+        if not route.write:
+            response = method(url, **kwargs)
+        else:
+            # escritas: a transação é desfeita, o banco fica como estava
+            with transaction.atomic():
+                response = method(url, **kwargs)
+                transaction.set_rollback(True)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def resolve_url(self, client, route, headers):
+        if route.detail_of is None:
+            return route.path
+        data = client.get(route.detail_of, headers=headers).json()
+        rows = data.get('results', []) if isinstance(data, dict) else data
+        if not rows:
+            return None
+        # serializers sem 'id' na saída: o primeiro pk do queryset da viewset
+        pk = rows[0].get('id') or route.queryset.values_list('pk', flat=True).first()
+        return route.path.format(pk=pk)
+
+    def measure(self, client, route, headers, requests, query_sample):
+        url = self.resolve_url(client, route, headers)
+        result = {'name': route.name, 'method': route.method.upper(), 'path': url}
+        if url is None:
+            return {**result, 'skipped': 'sem registros para o detalhe'}
+
+        statuses = {}
+        queries = []
+        for _ in range(max(query_sample, 1)):
+            with CaptureQueriesContext(connection) as context:
+                response = self.request(client, route, url, headers)
+            queries.append(len(context.captured_queries))
+
+        timings = []
+        start = time.perf_counter()
+        for _ in range(requests):
+            begin = time.perf_counter()
+            response = self.request(client, route, url, headers)
+            timings.append(time.perf_counter() - begin)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        elapsed = time.perf_counter() - start
+
+        return {
+            **result,
+            'status': {str(code): total for code, total in sorted(statuses.items())},
+            'queries': sum(queries) / len(queries),
+            **latency_summary(timings, elapsed),
+        }
+
+    def print_table(self, results):
+        self.stdout.write(f"{'rota':<28}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>9}  status")
+        for row in results:
+            if 'skipped' in row:
+                self.stdout.write(f"{row['name']:<28}  ({row['skipped']})")
+                continue
+            self.stdout.write(
+                f"{row['name']:<28}{row['rps']:>10.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}"
+                f"{row['p99_ms']:>10.2f}{row['queries']:>9.1f}  {row['status']}")
+
+    def compare(self, results, baseline_path, threshold):
+        with open(baseline_path, encoding='utf-8') as stream:
+            baseline = {row['name']: row for row in json.load(stream)['routes'] if 'skipped' not in row}
+
+        regressions = []
+        for row in results:
+            before = baseline.get(row['name'])
+            if before is None or 'skipped' in row:
+                continue
+            if row['p95_ms'] > before['p95_ms'] * (1 + threshold):
+                regressions.append(f"{row['name']}: p95 {before['p95_ms']:.2f} -> {row['p95_ms']:.2f} ms")
+            if row['queries'] > before['queries']:
+                regressions.append(f"{row['name']}: queries {before['queries']:.1f} -> {row['queries']:.1f}")
+
+        for line in regressions:
+            self.stderr.write(f'REGRESSÃO {line}')
+        if not regressions:
+            self.stderr.write('Sem regressões em relação ao baseline.')
+        return regressions
@@ -0,0 +1,84 @@
+import json
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from app.api.v1.serializers import ProductSerializer
+from app.core.renderers import FastJSONRenderer, LazyXMLRenderer, LazyYAMLRenderer
+from app.models import Product
+
+RENDERERS = {
+    'json (stdlib)': JSONRenderer,
+    'json (orjson)': FastJSONRenderer,
+    'xml': LazyXMLRenderer,
+    'yaml': LazyYAMLRenderer,
+}
+
+
+def build_payload(size):
+    # mesma forma de uma página de /products/, gerada pelo serializer real (sem banco)
+    now = timezone.now()
+    products = [
+        Product(
+            id=i, sku=f'SKU-{i:06d}', name=f'Produto {i} — edição ção/ñ', description='Descrição ' * 8,
+            price=Decimal('19.90') + i, stock=i % 50, category_id=i % 20 + 1,
+            created_at=now - timedelta(minutes=i), updated_at=now,
+        )
+        for i in range(size)
+    ]
+    results = ProductSerializer(products, many=True).data
+    return {'count': size, 'next': None, 'previous': None, 'results': results}
+
+
+def measure(renderer, payload, repeat):
+    renderer.render(payload)  # aquecimento (e o import, nos renderers lazy)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = renderer.render(payload)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    renderer.render(payload)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'median_ms': statistics.median(timings) * 1000,
+        'min_ms': min(timings) * 1000,
+        'peak_alloc_kb': peak / 1024,
+        'bytes': len(body),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compara tempo de render e alocações entre os formatos da API (JSON stdlib/orjson, XML, YAML).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, nargs='+', default=[10, 100, 1000],
+                            help='Quantidade de produtos por payload.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--json', action='store_true', help='Saída em JSON.')
+
+    def handle(self, size, repeat, **options):
+        results = []
+        for rows in size:
+            payload = build_payload(rows)
+            for name, renderer_class in RENDERERS.items():
+                results.append({'format': name, 'rows': rows, **measure(renderer_class(), payload, repeat)})
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'formato':<15}{'linhas':>8}{'mediana ms':>12}{'min ms':>10}{'pico KiB':>10}{'bytes':>10}")
+        for row in results:
+            self.stdout.write(
+                f"{row['format']:<15}{row['rows']:>8}{row['median_ms']:>12.2f}{row['min_ms']:>10.2f}"
+                f"{row['peak_alloc_kb']:>10.0f}{row['bytes']:>10}")
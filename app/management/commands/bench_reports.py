@@ -0,0 +1,86 @@
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, Max, Sum
+from django.utils import timezone
+
+from app.core.benchmark import latency_summary
+from app.models import Cart, Payment
+from app.reports import APPROVED, GROUP_BY, sold_items, payment_day, refresh_sales_rollups, sales_report
+from app.seed import add_payments
+
+# Latência do relatório de vendas com o histórico de pagamentos crescendo:
+# a cada passo entram mais pagamentos nos carrinhos do dataset do seed_data, os
+# rollups são atualizados (incremental) e o mesmo relatório é medido lendo os
+# rollups e varrendo Payment/PaymentItem direto. O primeiro deve ficar
+# estável; o segundo cresce com a tabela. Medido em processo, sem HTTP.
+
+
+def scan_report(start, end, group_by):
+    """O mesmo relatório sem rollups (o que a rota faria sem eles)."""
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    if group_by in ('day', 'payment_method'):
+        payments = Payment.objects.filter(status=APPROVED).annotate(day=payment_day()).filter(day__in=days)
+        return list(payments.values(group_by).annotate(payments=Count('id'), revenue=Sum('amount'))
+                    .order_by(group_by))
+    key = 'product_id' if group_by == 'product' else 'category_id'
+    name = 'name' if group_by == 'product' else 'category_name'
+    return list(sold_items(days).values(key).annotate(
+        name=Max(name), units=Sum('quantity'), revenue=Sum(F('quantity') * F('unit_price'))).order_by(key))
+
+
+class Command(BaseCommand):
+    help = 'Mede o relatório de vendas (rollups x varredura) enquanto o histórico de pagamentos cresce.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefix', default='seed', help='Prefixo do dataset gerado pelo seed_data.')
+        parser.add_argument('--steps', type=int, nargs='+', default=[1000, 5000, 20000],
+                            help='Pagamentos acrescentados a cada passo (acumulando).')
+        parser.add_argument('--requests', type=int, default=20, help='Execuções medidas por relatório.')
+        parser.add_argument('--days', type=int, default=30, help='Período do relatório (dias até hoje).')
+        parser.add_argument('--group-by', choices=GROUP_BY, nargs='+', default=list(GROUP_BY))
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help='Saída em JSON.')
+
+    def handle(self, prefix, steps, requests, days, group_by, seed, **options):
+        if not Cart.objects.filter(cliente__user__username__startswith=f'{prefix}_').exists():
+            raise CommandError(f'Nenhum carrinho com o prefixo {prefix!r} (rode seed_data antes).')
+        end = timezone.localdate()
+        start = end - timedelta(days=days - 1)
+        refresh_sales_rollups()
+
+        results = []
+        for step, added in enumerate(steps):
+            add_payments(added, seed=seed + step + 1, prefix=prefix)
+            begin = time.perf_counter()
+            refresh_sales_rollups()
+            refresh_ms = (time.perf_counter() - begin) * 1000
+            total = Payment.objects.count()
+            for group in group_by:
+                results.append({
+                    'payments': total, 'group_by': group, 'refresh_ms': refresh_ms,
+                    'rollup': self.measure(lambda: sales_report(start, end, group), requests),
+                    'scan': self.measure(lambda: scan_report(start, end, group), requests),
+                })
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+        self.stdout.write(f"{'pagamentos':>11}  {'grupo':<16}{'refresh ms':>11}{'rollup p50':>12}"
+                          f"{'rollup p95':>12}{'scan p50':>10}{'scan p95':>10}")
+        for row in results:
+            rollup, scan = row['rollup'], row['scan']
+            self.stdout.write(
+                f"{row['payments']:>11}  {row['group_by']:<16}{row['refresh_ms']:>11.1f}"
+                f"{rollup['p50_ms']:>12.2f}{rollup['p95_ms']:>12.2f}{scan['p50_ms']:>10.2f}{scan['p95_ms']:>10.2f}")
+
+    def measure(self, run, requests):
+        timings = []
+        start = time.perf_counter()
+        for _ in range(requests):
+            begin = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - begin)
+        return latency_summary(timings, time.perf_counter() - start)
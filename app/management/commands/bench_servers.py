@@ -0,0 +1,131 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from app.api.v1.serializers import MyTokenObtainPairSerializer
+from app.core.benchmark import latency_summary
+from app.models import Product
+
+# Compara vazão e latência das leituras quentes servidas:
+#   wsgi        rota síncrona, N threads (como um gunicorn gthread com N threads)
+#   asgi-sync   rota síncrona sob ASGI (cada request pula para a thread do sync_to_async)
+#   asgi-async  rota de /api/v1/async/ sob ASGI, N requests concorrentes no event loop
+# Tudo em processo (test Client / AsyncClient, sem rede) contra o banco configurado,
+# então mede a pilha Django + banco; para medir com o servidor HTTP de verdade,
+# veja a seção ASGI do README.
+
+MODES = ('wsgi', 'asgi-sync', 'asgi-async')
+
+
+def summary(mode, route, concurrency, elapsed, timings, errors):
+    return {'mode': mode, 'route': route, 'concurrency': concurrency, 'errors': errors,
+            **latency_summary(timings, elapsed)}
+
+
+def run_threads(url, headers, total, concurrency):
+    def one(_):
+        client = Client()
+        start = time.perf_counter()
+        response = client.get(url, headers=headers)
+        return time.perf_counter() - start, response.status_code
+
+    barrier = threading.Barrier(concurrency)
+
+    def close(_):
+        # a barreira garante uma chamada em cada thread do pool
+        barrier.wait()
+        connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        start = time.perf_counter()
+        results = list(pool.map(one, range(total)))
+        elapsed = time.perf_counter() - start
+        # uma conexão por thread do pool: fecha todas antes de sair
+        list(pool.map(close, range(concurrency)))
+    return elapsed, results
+
+
+async def run_async(url, headers, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    client = AsyncClient()
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(url, headers=headers)
+            return time.perf_counter() - start, response.status_code
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(total)))
+    return time.perf_counter() - start, results
+
+
+class Command(BaseCommand):
+    help = 'Compara vazão WSGI x ASGI (rotas síncronas e assíncronas) nas leituras de produtos, categorias e carrinho.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--username', required=True, help='Usuário usado para autenticar (JWT).')
+        parser.add_argument('--route', choices=('products', 'product', 'categories', 'cart'),
+                            nargs='+', default=['products', 'product', 'categories', 'cart'])
+        parser.add_argument('--mode', choices=MODES, nargs='+', default=list(MODES))
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[16, 64])
+        parser.add_argument('--with-cache', action='store_true',
+                            help='Mantém o cache do catálogo (a rota async não usa cache).')
+        parser.add_argument('--json', action='store_true', help='Saída em JSON.')
+
+    def handle(self, username, route, mode, requests, concurrency, with_cache, **options):
+        try:
+            user = User.objects.get(username=username)
+        except User.DoesNotExist:
+            raise CommandError(f'Usuário não encontrado: {username}')
+        product_id = Product.objects.values_list('id', flat=True).first()
+        if product_id is None:
+            raise CommandError('Nenhum produto cadastrado (gere dados antes de medir).')
+
+        token = MyTokenObtainPairSerializer.get_token(user).access_token
+        headers = {'Authorization': f'Bearer {token}'}
+        cart_id = token.get('cart_id')
+        if cart_id is None:
+            raise CommandError(f'Usuário sem carrinho: {username}')
+        routes = {
+            'products': ('/api/v1/products/', '/api/v1/async/products/'),
+            'product': (f'/api/v1/products/{product_id}/', f'/api/v1/async/products/{product_id}/'),
+            'categories': ('/api/v1/categories/', '/api/v1/async/categories/'),
+            'cart': (f'/api/v1/carts/{cart_id}/', '/api/v1/async/carts/current/'),
+        }
+
+        # o benchmark roda num processo só: a versão local basta
+        catalog_cache = {**settings.CATALOG_CACHE, 'ENABLED': with_cache, 'SINGLE_PROCESS': True}
+        results = []
+        with override_settings(CATALOG_CACHE=catalog_cache, ALLOWED_HOSTS=['*']):
+            for name in route:
+                sync_url, async_url = routes[name]
+                for workers in concurrency:
+                    for current in mode:
+                        if current == 'wsgi':
+                            elapsed, rows = run_threads(sync_url, headers, requests, workers)
+                        else:
+                            url = async_url if current == 'asgi-async' else sync_url
+                            elapsed, rows = asyncio.run(run_async(url, headers, requests, workers))
+                        errors = sum(1 for _, status in rows if status != 200)
+                        results.append(summary(current, name, workers, elapsed, [t for t, _ in rows], errors))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'rota':<12}{'modo':<12}{'conc':>6}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erros':>7}")
+        for row in results:
+            self.stdout.write(
+                f"{row['route']:<12}{row['mode']:<12}{row['concurrency']:>6}{row['rps']:>10.1f}"
+                f"{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['errors']:>7}")
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.core.openapi import generate_schema, schema_path
+
+
+class Command(BaseCommand):
+    help = ('Gera o schema OpenAPI (schema.yml) servido em /api/schema/. '
+            'Com --check, só confere se o arquivo versionado está atualizado.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Sai com erro se o schema.yml não bater com o código (para o CI).')
+        parser.add_argument('--file', help='Caminho do arquivo (padrão: OPENAPI_SCHEMA_FILE).')
+
+    def handle(self, check, file, **options):
+        path = Path(file) if file else schema_path()
+        content = generate_schema()
+        current = path.read_bytes() if path.exists() else None
+        if check:
+            if current != content:
+                raise CommandError(f'{path} está desatualizado: rode `python manage.py build_schema`.')
+            self.stdout.write(f'{path} está atualizado.')
+            return
+        if current == content:
+            self.stdout.write(f'{path} já estava atualizado.')
+            return
+        path.write_bytes(content)
+        self.stdout.write(f'{path} gerado ({len(content)} bytes).')
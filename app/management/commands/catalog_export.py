@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from app.catalog_io import CSV, FORMATS, export_categories, export_products
+
+
+class Command(BaseCommand):
+    help = 'Exporta produtos ou categorias em CSV/JSONL, em streaming (stdout por padrão).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=('products', 'categories'), default='products')
+        parser.add_argument('--format', choices=FORMATS, dest='fmt', default=CSV)
+        parser.add_argument('--output', '-o', default='-')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, model, fmt, output, chunk_size, **options):
+        exporter = export_products if model == 'products' else export_categories
+        chunks = exporter(fmt, chunk_size=chunk_size)
+        if output == '-':
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(output, 'w', encoding='utf-8', newline='') as stream:
+            stream.writelines(chunks)
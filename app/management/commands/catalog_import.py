@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.catalog_io import FORMATS, import_categories, import_products, read_rows
+
+
+class Command(BaseCommand):
+    help = "Importa produtos ou categorias de um arquivo CSV/JSONL em lotes (use '-' para stdin)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--model', choices=('products', 'categories'), default='products')
+        parser.add_argument('--format', choices=FORMATS, dest='fmt',
+                            help='Padrão: deduzido da extensão do arquivo.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, path, model, fmt, batch_size, **options):
+        fmt = fmt or Path(path).suffix.lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError(f'Informe --format ({", ".join(FORMATS)}).')
+
+        importer = import_products if model == 'products' else import_categories
+        if path == '-':
+            result = importer(read_rows(sys.stdin, fmt), batch_size=batch_size)
+        else:
+            with open(path, encoding='utf-8', newline='') as stream:
+                result = importer(read_rows(stream, fmt), batch_size=batch_size)
+
+        for error in result.errors:
+            self.stderr.write(f"linha {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.created} criados, {result.updated} atualizados, {len(result.errors)} erros.'))
@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.catalog_io import FORMATS, read_rows
+from app.users_io import USER_COLUMNS, import_users
+
+
+class Command(BaseCommand):
+    help = ("Importa usuários (User + Cliente + Cart) de um arquivo CSV/JSONL em lotes "
+            f"(use '-' para stdin). Colunas: {', '.join(USER_COLUMNS)}.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=FORMATS, dest='fmt',
+                            help='Padrão: deduzido da extensão do arquivo.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--hash-plaintext', action='store_true',
+                            help='Aceita senhas em texto puro e gera o hash na importação (lento).')
+
+    def handle(self, path, fmt, batch_size, hash_plaintext, **options):
+        fmt = fmt or Path(path).suffix.lstrip('.').lower()
+        if fmt not in FORMATS:
+            raise CommandError(f'Informe --format ({", ".join(FORMATS)}).')
+
+        if path == '-':
+            result = import_users(read_rows(sys.stdin, fmt), batch_size, hash_plaintext)
+        else:
+            with open(path, encoding='utf-8', newline='') as stream:
+                result = import_users(read_rows(stream, fmt), batch_size, hash_plaintext)
+
+        for error in result.errors:
+            self.stderr.write(f"linha {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(f'{result.created} criados, {len(result.errors)} erros.'))
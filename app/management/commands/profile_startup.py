@@ -0,0 +1,68 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from app.api.v1.serializers import MyTokenObtainPairSerializer
+from app.core.startup import by_package, profile
+
+# Cold start de um worker novo, num interpretador limpo: custo de import por
+# pacote e por módulo (python -X importtime) e tempo de cada etapa do boot até o
+# segundo request. Por padrão roda duas vezes, sem e com o pré-aquecimento
+# (app/core/warmup.py), para mostrar quanto do primeiro request ele absorve.
+# Sem --username os requests não vão ao banco (o de produtos responde 401); com ele
+# vão autenticados (JWT), pagando também a conexão e as queries do primeiro request.
+
+DEFAULT_URLS = ['/api/schema/', '/api/v1/products/']
+
+
+class Command(BaseCommand):
+    help = 'Mede o custo de import e do primeiro request de um worker novo, por módulo e por etapa.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', action='append', dest='urls', help=f'Rota a pedir (padrão: {DEFAULT_URLS}).')
+        parser.add_argument('--username', help='Autentica os requests com um JWT deste usuário.')
+        parser.add_argument('--top', type=int, default=15, help='Quantos módulos/pacotes listar.')
+        parser.add_argument('--no-warm', action='store_true', help='Só o boot sem pré-aquecimento.')
+        parser.add_argument('--json', action='store_true', help='Saída em JSON.')
+
+    def handle(self, urls, username, top, no_warm, **options):
+        urls = urls or DEFAULT_URLS
+        headers = {}
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f'Usuário {username!r} não existe.')
+            headers['Authorization'] = f'Bearer {MyTokenObtainPairSerializer.get_token(user).access_token}'
+        runs = {}
+        for warm in (False,) if no_warm else (False, True):
+            try:
+                runs['warm' if warm else 'cold'] = profile(urls, warm, headers, cwd=settings.BASE_DIR)
+            except RuntimeError as exc:
+                raise CommandError(f'O processo de medição falhou: {exc}')
+
+        stages, modules = runs['cold']
+        report = {
+            'import_ms': sum(self_us for _, self_us, _, _ in modules) / 1000,
+            'packages': [{'package': name, 'ms': us / 1000} for name, us in by_package(modules)[:top]],
+            'modules': [{'module': name, 'self_ms': self_us / 1000, 'cumulative_ms': cumulative_us / 1000}
+                        for name, self_us, cumulative_us, _ in sorted(modules, key=lambda m: m[1], reverse=True)[:top]],
+            'stages': {name: run[0] for name, run in runs.items()},
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+            return
+
+        self.stdout.write(f"Imports: {report['import_ms']:.0f} ms no total")
+        self.stdout.write(f"{'pacote':<40}{'ms':>10}")
+        for row in report['packages']:
+            self.stdout.write(f"{row['package']:<40}{row['ms']:>10.1f}")
+        self.stdout.write(f"\n{'módulo':<60}{'próprio ms':>12}{'acumulado ms':>14}")
+        for row in report['modules']:
+            self.stdout.write(f"{row['module']:<60}{row['self_ms']:>12.1f}{row['cumulative_ms']:>14.1f}")
+        for name, stages in report['stages'].items():
+            self.stdout.write(f"\nEtapas ({name}):")
+            for row in stages:
+                status = f" [{row['status']}]" if row['status'] else ''
+                self.stdout.write(f"  {row['stage']:<56}{row['ms']:>10.1f} ms{status}")
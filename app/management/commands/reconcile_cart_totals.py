@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.cart import reconcile_cart_totals
+
+
+class Command(BaseCommand):
+    help = ('Recalcula com agregados o subtotal e o número de itens de cada carrinho e corrige '
+            'os que divergem dos totais mantidos incrementalmente.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Só lista as divergências.')
+        parser.add_argument('--fail-on-drift', action='store_true',
+                            help='Sai com erro se houver divergência (para rodar em CI/cron).')
+
+    def handle(self, dry_run, fail_on_drift, **options):
+        drifted = reconcile_cart_totals(fix=not dry_run)
+        for row in drifted:
+            self.stdout.write(
+                f"carrinho {row['pk']}: subtotal {row['subtotal']} -> {row['expected_subtotal']}, "
+                f"itens {row['item_count']} -> {row['expected_item_count']}")
+        action = 'encontrados' if dry_run else 'corrigidos'
+        self.stdout.write(f'{len(drifted)} carrinhos divergentes {action}.')
+        if drifted and fail_on_drift:
+            raise CommandError(f'{len(drifted)} carrinhos com totais divergentes.')
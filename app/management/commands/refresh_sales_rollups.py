@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from app.reports import refresh_sales_rollups
+
+
+class Command(BaseCommand):
+    help = ('Atualiza os rollups diários de vendas a partir dos pagamentos alterados desde a última '
+            'execução (rode periodicamente, ex.: cron a cada minuto).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Reconstrói todos os dias do zero.')
+
+    def handle(self, full, **options):
+        result = refresh_sales_rollups(full=full)
+        self.stdout.write(f"{result['days']} dias recalculados; marca d'água: {result['high_water']}")
@@ -0,0 +1,51 @@
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from app.outbox import MAX_ATTEMPTS, drain, purge_processed, run_batch
+
+PURGE_EVERY = 3600
+
+
+class Command(BaseCommand):
+    help = ('Processa os eventos do outbox (efeitos colaterais de pagamentos): pega lotes, roda os '
+            'handlers em paralelo e reagenda as falhas com backoff.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Threads rodando handlers em paralelo.')
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Segundos de espera quando não há eventos prontos.')
+        parser.add_argument('--keep-days', type=int, default=7,
+                            help='Eventos processados há mais tempo que isso são apagados.')
+        parser.add_argument('--once', action='store_true', help='Processa o que estiver pronto e sai.')
+
+    def handle(self, workers, batch_size, max_attempts, poll_interval, keep_days, once, **options):
+        if once:
+            self.report(drain(workers, batch_size, max_attempts))
+            return
+
+        stopping = []
+        last_purge = 0.0
+        # SIGTERM (deploy/orquestrador): termina o lote atual e sai
+        signal.signal(signal.SIGTERM, lambda *args: stopping.append(True))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            try:
+                while not stopping:
+                    totals = run_batch(pool if workers > 1 else None, batch_size, max_attempts)
+                    if totals:
+                        self.report(totals)
+                        continue
+                    if time.monotonic() - last_purge > PURGE_EVERY:
+                        purge_processed(timedelta(days=keep_days))
+                        last_purge = time.monotonic()
+                    time.sleep(poll_interval)
+            except KeyboardInterrupt:
+                pass
+
+    def report(self, totals):
+        self.stdout.write(', '.join(f'{status}: {total}' for status, total in sorted(totals.items())) or 'nada a processar')
@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.seed import DEFAULT_PASSWORD, scaled, delete_dataset, generate_dataset, seeded_querysets
+
+
+class Command(BaseCommand):
+    help = ('Gera um conjunto de dados sintético e determinístico (categorias, produtos, usuários com '
+            'cliente e carrinho, itens e pagamentos) com inserts em lote.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categories', type=int, default=20)
+        parser.add_argument('--products', type=int, default=1000)
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--items-per-cart', type=int, default=5, help='Máximo de itens por carrinho.')
+        parser.add_argument('--payments', type=int, default=200)
+        parser.add_argument('--scale', type=float, default=1.0,
+                            help='Multiplica todas as quantidades (exceto itens por carrinho).')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='seed',
+                            help='Prefixo dos registros gerados (sku, username, categoria).')
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help='Senha de todos os usuários gerados.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--reset', action='store_true', help='Apaga antes os dados gerados com o mesmo prefixo.')
+
+    def handle(self, scale, prefix, reset, **options):
+        if reset:
+            deleted = delete_dataset(prefix)
+            self.stdout.write(f'Apagados: {json.dumps(deleted)}')
+        elif any(queryset.exists() for queryset in seeded_querysets(prefix).values()):
+            raise CommandError(f'Já existem dados com o prefixo "{prefix}" (use --reset ou outro --prefix).')
+
+        counts = generate_dataset(
+            categories=scaled(options['categories'], scale), products=scaled(options['products'], scale),
+            users=scaled(options['users'], scale), items_per_cart=options['items_per_cart'],
+            payments=scaled(options['payments'], scale), seed=options['seed'], prefix=prefix,
+            password=options['password'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Gerados: {json.dumps(counts)}'))
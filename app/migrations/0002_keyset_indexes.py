@@ -0,0 +1,21 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['is_deleted', 'created_at', 'id'], name='payment_keyset_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['is_deleted', 'created_at', 'id'], name='product_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.db import migrations
+
+
+def create_missing_carts(apps, schema_editor):
+    # o carrinho passa a ser criado no cadastro; usuários antigos ganham o seu aqui
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Cliente = apps.get_model('app', 'Cliente')
+    Cart = apps.get_model('app', 'Cart')
+
+    Cliente.objects.bulk_create(
+        [Cliente(user_id=pk) for pk in User.objects.filter(cliente__isnull=True).values_list('pk', flat=True)],
+        batch_size=1000,
+    )
+    Cart.objects.bulk_create(
+        [Cart(cliente_id=pk) for pk in Cliente.objects.filter(cart__isnull=True).values_list('pk', flat=True)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_carts, migrations.RunPython.noop),
+    ]
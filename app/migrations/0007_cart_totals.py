@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:25
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import F, Func, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_cart_totals(apps, schema_editor):
+    # totais dos carrinhos existentes, calculados num UPDATE só
+    Cart = apps.get_model('app', 'Cart')
+    CartItem = apps.get_model('app', 'CartItem')
+    items = CartItem.objects.filter(cart_id=OuterRef('pk'), is_deleted=False).order_by()
+    money = models.DecimalField(max_digits=12, decimal_places=2)
+    subtotal = items.annotate(total=Func(F('quantity') * F('product__price'), function='SUM', output_field=money))
+    item_count = items.annotate(total=Func(F('quantity'), function='SUM', output_field=models.IntegerField()))
+    Cart.objects.update(
+        subtotal=Coalesce(Subquery(subtotal.values('total')), Value(Decimal('0'), output_field=money)),
+        item_count=Coalesce(Subquery(item_count.values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_partial_indexes_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='item_count',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='subtotal',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=12),
+        ),
+        migrations.RunPython(fill_cart_totals, migrations.RunPython.noop),
+    ]
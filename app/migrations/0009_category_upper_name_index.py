@@ -0,0 +1,22 @@
+# Generated by Django 5.1.7 on 2026-10-18 18:31
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations, models
+
+from app.core.operations import AddPostgresIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_sales_rollups'),
+    ]
+
+    operations = [
+        # opclass text_pattern_ops: só no Postgres
+        AddPostgresIndex(
+            model_name='category',
+            index=models.Index(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('name'), name='text_pattern_ops'), condition=models.Q(('is_deleted', False)), name='category_upper_name_idx'),
+        ),
+    ]
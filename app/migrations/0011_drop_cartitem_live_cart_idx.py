@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:10
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_outbox'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cartitem',
+            name='cartitem_live_cart_idx',
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:26
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, TruncDate
+
+
+def snapshot_existing_payments(apps, schema_editor):
+    # pagamentos de antes dos itens gravados: o que resta é o carrinho atual com o
+    # preço atual (o mesmo que os relatórios usavam até aqui)
+    Payment = apps.get_model('app', 'Payment')
+    CartItem = apps.get_model('app', 'CartItem')
+    PaymentItem = apps.get_model('app', 'PaymentItem')
+    RollupPaymentDay = apps.get_model('app', 'RollupPaymentDay')
+
+    items = defaultdict(list)
+    for row in CartItem.objects.filter(is_deleted=False).values_list(
+            'cart_id', 'product_id', 'product__name', 'product__category_id', 'product__category__name',
+            'quantity', 'product__price').iterator():
+        items[row[0]].append(row[1:])
+    PaymentItem.objects.bulk_create(
+        (PaymentItem(payment_id=payment_id, product_id=product_id, name=name, category_id=category_id,
+                     category_name=category_name, quantity=quantity, unit_price=price)
+         for payment_id, cart_id in Payment.objects.values_list('pk', 'cart_id').iterator()
+         for product_id, name, category_id, category_name, quantity, price in items[cart_id]),
+        batch_size=1000,
+    )
+    # dia em que cada pagamento aprovado já está contado nos rollups
+    RollupPaymentDay.objects.bulk_create(
+        (RollupPaymentDay(payment_id=pk, day=day) for pk, day in
+         Payment.objects.filter(status='approved', is_deleted=False)
+         .annotate(day=TruncDate(Coalesce('paid_at', 'created_at'))).values_list('pk', 'day').iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_drop_cartitem_live_cart_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupPaymentDay',
+            fields=[
+                ('payment', models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='app.payment')),
+                ('day', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PaymentItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('category_name', models.CharField(max_length=100)),
+                ('quantity', models.IntegerField()),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('category', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='app.category')),
+                ('payment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='app.payment')),
+                ('product', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='app.product')),
+            ],
+        ),
+        migrations.RunPython(snapshot_existing_payments, migrations.RunPython.noop),
+    ]
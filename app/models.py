@@ -1,8 +1,13 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from .core.models import BaseModel
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVector
+from django.db.models.functions import Upper
+from django.utils import timezone
+from .core.models import BaseModel, DirtyFieldsMixin, LIVE
 
-class Cliente(BaseModel):
+class Cliente(DirtyFieldsMixin, BaseModel):
     # ligação do user padrão com o novo modelo de cliente
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='cliente')
 
@@ -21,8 +26,18 @@ class Category(BaseModel):
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], condition=LIVE, name='category_live_name_idx'),
+            # busca por prefixo sem diferenciar maiúsculas (admin): UPPER(name) LIKE 'X%'
+            models.Index(OpClass(Upper('name'), name='text_pattern_ops'), condition=LIVE,
+                         name='category_upper_name_idx'),
+        ]
+
 
-class Product(BaseModel):
+class Product(DirtyFieldsMixin, BaseModel):
+    # chave natural usada na importação do catálogo
+    sku = models.CharField(max_length=64, unique=True, null=True, blank=True, verbose_name='SKU')
     name = models.CharField(max_length=200)
     description = models.TextField()
     price = models.DecimalField(max_digits=10, decimal_places=2)
@@ -30,18 +45,41 @@ class Product(BaseModel):
     category = models.ForeignKey(
         Category, on_delete=models.CASCADE, related_name='products')
 
+    SEARCH_CONFIG = 'portuguese'
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def search_vector(cls):
+        # a mesma expressão do índice GIN, para o Postgres usá-lo nas buscas
+        return SearchVector('name', 'description', config=cls.SEARCH_CONFIG)
+
+    class Meta:
+        indexes = [
+            # índices parciais (WHERE is_deleted = false): linhas com soft delete ficam de fora
+            # paginação keyset: ORDER BY created_at, id
+            models.Index(fields=['created_at', 'id'], condition=LIVE, name='product_live_keyset_idx'),
+            models.Index(fields=['category', 'price'], condition=LIVE, name='product_live_category_idx'),
+            models.Index(fields=['price'], condition=LIVE, name='product_live_price_idx'),
+            # busca textual (só no Postgres, ver app/core/operations.py)
+            GinIndex(SearchVector('name', 'description', config='portuguese'), name='product_search_idx'),
+        ]
+
 
 class Cart(BaseModel):
     cliente = models.OneToOneField(Cliente, on_delete=models.CASCADE, related_name='cart')
 
+    # totais desnormalizados dos itens vivos (quantidade x preço atual do produto),
+    # mantidos incrementalmente por app/cart.py; reconcile_cart_totals corrige desvios
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0, editable=False)
+    item_count = models.IntegerField(default=0, editable=False)
+
     def __str__(self):
         return f"Carrinho de {self.cliente.user.username}"
 
 
-class CartItem(BaseModel):
+class CartItem(DirtyFieldsMixin, BaseModel):
     cart = models.ForeignKey(
         Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
@@ -50,11 +88,24 @@ class CartItem(BaseModel):
     def __str__(self):
         return f"{self.quantity} de {self.product.name}"
 
+    def save(self, *args, **kwargs):
+        # os totais do carrinho são ajustados pela diferença (post_save, app/cart.py):
+        # ela parte da linha gravada, travada até o fim do save, e não do que foi
+        # carregado antes; dois PATCHes simultâneos no mesmo item não se perdem
+        with transaction.atomic():
+            if not self._state.adding and self.pk is not None:
+                stored = (CartItem.all_objects.select_for_update().filter(pk=self.pk)
+                          .values('cart_id', 'product_id', 'quantity', 'is_deleted').first())
+                if stored is not None:
+                    self._loaded_values = {**(self.loaded_values() or {}), **stored}
+            super().save(*args, **kwargs)
+
     class Meta:
+        # o índice do unique_together (cart, product) já atende as buscas por carrinho
         unique_together = ('cart', 'product')
 
 
-class Payment(BaseModel):
+class Payment(DirtyFieldsMixin, BaseModel):
     PAYMENT_METHODS = (
         ('credit_card', 'Cartão de Crédito'),
         ('pix', 'PIX'),
@@ -83,3 +134,133 @@ class Payment(BaseModel):
 
     def __str__(self):
         return f"Pagamento {self.id} - {self.get_payment_method_display()} - {self.status}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], condition=LIVE, name='payment_live_keyset_idx'),
+            models.Index(fields=['cart', 'status'], condition=LIVE, name='payment_live_cart_idx'),
+            # marca d'água dos rollups de vendas (inclui as linhas com soft delete)
+            models.Index(fields=['updated_at'], name='payment_updated_idx'),
+        ]
+
+
+class PaymentItem(models.Model):
+    # itens cobrados, copiados do carrinho no pagamento: o carrinho e os preços
+    # mudam depois, o histórico de vendas não. As FKs não têm constraint e o nome
+    # vai junto, como nos rollups
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    name = models.CharField(max_length=200)
+    category = models.ForeignKey(Category, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    category_name = models.CharField(max_length=100)
+    quantity = models.IntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.quantity}x {self.name} (pagamento {self.payment_id})"
+
+
+class OutboxEvent(models.Model):
+    # evento gravado na mesma transação da mudança que o gerou e processado
+    # depois pelo worker (app/outbox.py, comando run_outbox_worker)
+    PENDING, DONE, FAILED = 'pending', 'done', 'failed'
+    STATUS_CHOICES = ((PENDING, 'Pendente'), (DONE, 'Processado'), (FAILED, 'Falhou'))
+
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(encoder=DjangoJSONEncoder, default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    # próxima tentativa; enquanto um worker processa, é o fim do prazo dele
+    available_at = models.DateTimeField(default=timezone.now)
+    claimed_by = models.CharField(max_length=32, blank=True, default='')
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.topic} #{self.pk} ({self.status})"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['available_at', 'id'], condition=models.Q(status='pending'),
+                         name='outbox_pending_idx'),
+        ]
+
+
+class ArchivedRecord(models.Model):
+    # linhas com soft delete antigas, movidas para fora das tabelas principais
+    # pelo comando archive_deleted
+    model = models.CharField(max_length=100)
+    object_id = models.BigIntegerField()
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    deleted_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'object_id'], name='archive_model_object_idx'),
+        ]
+
+
+# Rollups diários de vendas (pagamentos aprovados), mantidos por app/reports.py.
+# Não são BaseModel: são derivados, apagados e regravados a cada atualização do dia.
+# As FKs não têm constraint (o histórico sobrevive ao arquivamento do produto) e o
+# nome vai junto, para o relatório ler só o rollup.
+
+class SalesRollup(models.Model):
+    day = models.DateField()
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        abstract = True
+
+
+class DailyProductSales(SalesRollup):
+    product = models.ForeignKey(Product, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    name = models.CharField(max_length=200)
+
+    class Meta:
+        unique_together = ('day', 'product')
+
+
+class DailyCategorySales(SalesRollup):
+    category = models.ForeignKey(Category, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        unique_together = ('day', 'category')
+
+
+class DailyPaymentMethodSales(SalesRollup):
+    payment_method = models.CharField(max_length=20, choices=Payment.PAYMENT_METHODS)
+    payments = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('day', 'payment_method')
+
+
+class RollupState(models.Model):
+    # até onde (Payment.updated_at) os rollups já foram atualizados e quando
+    # começou a última atualização
+    name = models.CharField(max_length=50, primary_key=True)
+    high_water = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} até {self.high_water}"
+
+
+class RollupPaymentDay(models.Model):
+    # dia em que cada pagamento aprovado está contado nos rollups: se paid_at mudar,
+    # o dia antigo também é recalculado. Tabela à parte, gravada só por app/reports.py
+    # (um save() do pagamento não a sobrescreve)
+    payment = models.OneToOneField(Payment, on_delete=models.DO_NOTHING, db_constraint=False,
+                                   primary_key=True, related_name='+')
+    day = models.DateField()
+
+    def __str__(self):
+        return f"Pagamento {self.payment_id} em {self.day}"
@@ -0,0 +1,159 @@
+import logging
+import random
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEvent
+
+# Outbox transacional: quem muda um Payment/Cart grava o evento na mesma
+# transação (publish), então o evento existe se e somente se a mudança foi
+# confirmada; o trabalho derivado (rollups, notificações...) roda depois, no
+# worker, fora do request.
+#
+# O worker pega lotes com SELECT ... FOR UPDATE SKIP LOCKED no Postgres (workers
+# em paralelo não disputam as mesmas linhas); nos outros bancos o lote é pego
+# com um único UPDATE condicional e os handlers rodam em sequência (o SQLite só
+# aceita um escritor por vez). Pegar um evento é marcá-lo com um token e
+# empurrar o available_at para o fim do prazo: se o worker morrer, o evento
+# volta sozinho quando o prazo acaba. Falhas voltam com backoff exponencial até
+# MAX_ATTEMPTS; depois ficam como 'failed' (também os que derrubaram o worker em
+# todas as tentativas: o prazo vence e o claim seguinte os marca). Os handlers
+# podem rodar mais de uma vez para o mesmo evento, então precisam ser idempotentes.
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+LEASE = timedelta(minutes=5)
+BACKOFF_BASE = 2
+BACKOFF_MAX = 3600
+
+_handlers = {}
+_claimed_at = ContextVar('outbox_claimed_at', default=None)
+
+
+class UnknownTopic(Exception):
+    pass
+
+
+def handler(topic):
+    """Registra a função que processa os eventos do tópico: fn(payload)."""
+    def register(fn):
+        _handlers[topic] = fn
+        return fn
+    return register
+
+
+def publish(topic, payload):
+    # use dentro da transação da mudança (transaction.atomic)
+    return OutboxEvent.objects.create(topic=topic, payload=payload)
+
+
+def claimed_at():
+    """Quando o evento em processamento foi pego (já confirmado, portanto).
+
+    Trabalho que começou depois disso já enxergou a mudança do evento: o handler
+    pode pular o que outra execução já fez (vários eventos no mesmo lote).
+    """
+    return _claimed_at.get()
+
+
+def backoff(attempts):
+    delay = min(BACKOFF_BASE ** attempts, BACKOFF_MAX)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def claim(batch_size, lease=LEASE, max_attempts=MAX_ATTEMPTS):
+    """Pega até batch_size eventos prontos; devolve (token, eventos)."""
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    due = OutboxEvent.objects.filter(status=OutboxEvent.PENDING, available_at__lte=now)
+    ready = due.filter(attempts__lt=max_attempts).order_by('available_at', 'id')
+    # a tentativa conta já aqui: um evento que derruba o worker também esgota as tentativas
+    changes = {'claimed_by': token, 'available_at': now + lease, 'attempts': F('attempts') + 1}
+    with transaction.atomic():
+        # prazo vencido sem tentativas sobrando: o worker caiu antes do process() registrar
+        due.filter(attempts__gte=max_attempts).update(
+            status=OutboxEvent.FAILED, claimed_by='',
+            last_error='Tentativas esgotadas: o worker parou durante o processamento.')
+        if parallel_supported():
+            ids = list(ready.select_for_update(skip_locked=True).values_list('pk', flat=True)[:batch_size])
+            OutboxEvent.objects.filter(pk__in=ids).update(**changes)
+        else:
+            # sem SKIP LOCKED (SQLite): um UPDATE só; o banco serializa as escritas
+            OutboxEvent.objects.filter(pk__in=ready.values('pk')[:batch_size]).filter(
+                status=OutboxEvent.PENDING, available_at__lte=now, attempts__lt=max_attempts).update(**changes)
+    events = list(OutboxEvent.objects.filter(claimed_by=token).order_by('available_at', 'id'))
+    for event in events:
+        event.claimed_at = now
+    return token, events
+
+
+def process(event, token, max_attempts=MAX_ATTEMPTS):
+    """Roda o handler do evento e registra o resultado; devolve o status final."""
+    mine = OutboxEvent.objects.filter(pk=event.pk, claimed_by=token)
+    attempts = event.attempts
+    try:
+        fn = _handlers.get(event.topic)
+        if fn is None:
+            raise UnknownTopic(f'Nenhum handler para {event.topic!r}')
+        claimed = _claimed_at.set(getattr(event, 'claimed_at', None))
+        try:
+            with transaction.atomic():
+                fn(event.payload)
+        finally:
+            _claimed_at.reset(claimed)
+    except Exception as exc:
+        logger.exception('Evento %s (%s) falhou na tentativa %d', event.pk, event.topic, attempts)
+        final = isinstance(exc, UnknownTopic) or attempts >= max_attempts
+        status = OutboxEvent.FAILED if final else OutboxEvent.PENDING
+        mine.update(status=status, last_error=repr(exc)[:2000], claimed_by='',
+                    available_at=timezone.now() + backoff(attempts))
+        return status
+    mine.update(status=OutboxEvent.DONE, processed_at=timezone.now(), claimed_by='')
+    return OutboxEvent.DONE
+
+
+def _run_in_thread(args):
+    try:
+        return process(*args)
+    finally:
+        # cada thread do pool tem a sua conexão; respeita o CONN_MAX_AGE como num request
+        close_old_connections()
+
+
+def parallel_supported():
+    return connection.features.has_select_for_update_skip_locked
+
+
+def run_batch(pool=None, batch_size=50, max_attempts=MAX_ATTEMPTS, lease=LEASE):
+    """Pega um lote e processa (em paralelo se houver pool); devolve {status: total}."""
+    if not parallel_supported():
+        pool = None
+    token, events = claim(batch_size, lease, max_attempts)
+    jobs = [(event, token, max_attempts) for event in events]
+    statuses = pool.map(_run_in_thread, jobs) if pool is not None else (process(*job) for job in jobs)
+    totals = {}
+    for status in statuses:
+        totals[status] = totals.get(status, 0) + 1
+    return totals
+
+
+def drain(workers=4, batch_size=50, max_attempts=MAX_ATTEMPTS):
+    """Processa até não sobrar evento pronto (testes, comando com --once)."""
+    totals = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while batch := run_batch(pool if workers > 1 else None, batch_size, max_attempts):
+            for status, total in batch.items():
+                totals[status] = totals.get(status, 0) + total
+    return totals
+
+
+def purge_processed(older_than=timedelta(days=7)):
+    return OutboxEvent.objects.filter(
+        status=OutboxEvent.DONE, processed_at__lt=timezone.now() - older_than).delete()[0]
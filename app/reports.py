@@ -0,0 +1,165 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, Max, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .core.batching import batches
+from .models import (
+    DailyCategorySales, DailyPaymentMethodSales, DailyProductSales, Payment, PaymentItem, RollupPaymentDay,
+    RollupState,
+)
+
+# Rollups diários de vendas a partir dos pagamentos aprovados.
+# Atualização incremental: os pagamentos com updated_at depois da marca d'água
+# (qualquer mudança, inclusive aprovado -> estornado) dizem quais dias mudaram, e
+# só esses dias são recalculados do zero (apaga e regrava). A janela de
+# sobreposição pega transações que gravaram um updated_at mais antigo que a
+# marca mas só confirmaram depois; recalcular um dia de novo não muda nada.
+# RollupPaymentDay guarda o dia em que cada pagamento foi contado: se paid_at
+# mudar, o dia antigo entra no recálculo junto com o novo.
+#
+# Dia da venda: data de paid_at (created_at se não houver). Receita por forma de
+# pagamento é a soma de Payment.amount; por produto e categoria, quantidade x preço
+# unitário dos itens gravados no pagamento (PaymentItem), que não mudam com o
+# carrinho nem com o preço atual do produto.
+
+SALES = 'sales'
+APPROVED = 'approved'
+ROLLUPS = (DailyProductSales, DailyCategorySales, DailyPaymentMethodSales)
+GROUP_BY = ('day', 'product', 'category', 'payment_method')
+DAYS_PER_BATCH = 31
+ROWS_PER_BATCH = 1000
+
+
+def _overlap():
+    return timedelta(seconds=getattr(settings, 'SALES_ROLLUP_OVERLAP_SECONDS', 300))
+
+
+def payment_day(prefix=''):
+    return TruncDate(Coalesce(f'{prefix}paid_at', f'{prefix}created_at'))
+
+
+def sold_items(days):
+    # itens dos pagamentos aprovados nos dias pedidos
+    return (PaymentItem.objects
+            .filter(payment__status=APPROVED, payment__is_deleted=False)
+            .annotate(day=payment_day('payment__'))
+            .filter(day__in=days).order_by())
+
+
+def _rebuild_days(days):
+    payments = Payment.objects.filter(status=APPROVED).annotate(day=payment_day()).filter(day__in=days).order_by()
+    items = sold_items(days)
+    line_total = Sum(F('quantity') * F('unit_price'))
+
+    units_by_method = {
+        (row['day'], row['method']): row['units']
+        for row in items.values('day', method=F('payment__payment_method')).annotate(units=Sum('quantity'))
+    }
+    by_method = [
+        DailyPaymentMethodSales(day=row['day'], payment_method=row['payment_method'], payments=row['payments'],
+                                revenue=row['revenue'],
+                                units=units_by_method.get((row['day'], row['payment_method']), 0))
+        for row in payments.values('day', 'payment_method').annotate(payments=Count('id'), revenue=Sum('amount'))
+    ]
+    by_product = [
+        DailyProductSales(day=row['day'], product_id=row['product_id'], name=row['name'],
+                          units=row['units'], revenue=row['revenue'])
+        for row in items.values('day', 'product_id').annotate(
+            name=Max('name'), units=Sum('quantity'), revenue=line_total)
+    ]
+    by_category = [
+        DailyCategorySales(day=row['day'], category_id=row['category_id'], name=row['name'],
+                           units=row['units'], revenue=row['revenue'])
+        for row in items.values('day', 'category_id').annotate(
+            name=Max('category_name'), units=Sum('quantity'), revenue=line_total)
+    ]
+
+    for model in ROLLUPS:
+        model.objects.filter(day__in=days).delete()
+    DailyPaymentMethodSales.objects.bulk_create(by_method)
+    DailyProductSales.objects.bulk_create(by_product)
+    DailyCategorySales.objects.bulk_create(by_category)
+
+
+def _record_counted_days(changed, counted):
+    counted.delete()
+    approved = (changed.filter(status=APPROVED, is_deleted=False).annotate(day=payment_day())
+                .order_by().values_list('pk', 'day'))
+    for batch in batches(approved.iterator(), ROWS_PER_BATCH):
+        RollupPaymentDay.objects.bulk_create([RollupPaymentDay(payment_id=pk, day=day) for pk, day in batch])
+
+
+def refresh_sales_rollups(full=False, unless_started_after=None):
+    """Recalcula os dias tocados desde a última execução (ou todos, com full=True).
+
+    Com unless_started_after, não faz nada se uma execução começada depois desse
+    instante já terminou: ela já viu tudo o que estava confirmado até ali.
+    """
+    # antes da transação: as leituras abaixo enxergam tudo o que foi confirmado até aqui
+    started = timezone.now()
+    with transaction.atomic():
+        # a trava na linha de estado serializa execuções concorrentes
+        state, _ = RollupState.objects.select_for_update().get_or_create(name=SALES)
+        if (unless_started_after is not None and not full and state.refreshed_at is not None
+                and state.refreshed_at >= unless_started_after):
+            return {'days': 0, 'high_water': state.high_water}
+        changed = Payment.all_objects.all()
+        if state.high_water is not None and not full:
+            changed = changed.filter(updated_at__gt=state.high_water - _overlap())
+        mark = changed.aggregate(mark=Max('updated_at'))['mark']
+        # dia atual e dia da última contagem (paid_at pode ter mudado)
+        counted = RollupPaymentDay.objects.all() if full else RollupPaymentDay.objects.filter(payment__in=changed)
+        days = sorted(
+            set(changed.annotate(day=payment_day()).order_by().values_list('day', flat=True).distinct())
+            | set(counted.order_by().values_list('day', flat=True).distinct()))
+
+        if full:
+            for model in ROLLUPS:
+                model.objects.all().delete()
+        for batch in batches(days, DAYS_PER_BATCH):
+            _rebuild_days(batch)
+        _record_counted_days(changed, counted)
+
+        if mark is not None and (state.high_water is None or mark > state.high_water):
+            state.high_water = mark
+        # início desta execução (a mais recente, se outra esperou a trava)
+        state.refreshed_at = max(started, state.refreshed_at or started)
+        state.save()
+    return {'days': len(days), 'high_water': state.high_water}
+
+
+def _grouped(queryset, group_by):
+    if group_by == 'day':
+        return queryset.values('day').order_by('day')
+    if group_by == 'payment_method':
+        return queryset.values('payment_method').order_by('payment_method')
+    key = f'{group_by}_id'
+    return queryset.values(key).annotate(name=Max('name')).order_by(key)
+
+
+def sales_report(start, end, group_by='day'):
+    """Vendas entre start e end (datas, inclusive), lendo só os rollups."""
+    if group_by not in GROUP_BY:
+        raise ValueError(f'Agrupamento inválido: {group_by}')
+    model = {'product': DailyProductSales, 'category': DailyCategorySales}.get(group_by, DailyPaymentMethodSales)
+    in_range = {'day__gte': start, 'day__lte': end}
+    extra = {'payments': Sum('payments')} if model is DailyPaymentMethodSales else {}
+
+    rows = list(_grouped(model.objects.filter(**in_range), group_by)
+                .annotate(units=Sum('units'), revenue=Sum('revenue'), **extra))
+    totals = DailyPaymentMethodSales.objects.filter(**in_range).aggregate(
+        payments=Coalesce(Sum('payments'), 0), units=Coalesce(Sum('units'), 0),
+        revenue=Coalesce(Sum('revenue'), Value(Decimal('0'), output_field=DecimalField())))
+    state = RollupState.objects.filter(name=SALES).first()
+    return {
+        'start': start, 'end': end, 'group_by': group_by,
+        'high_water': state.high_water if state else None,
+        'refreshed_at': state.refreshed_at if state else None,
+        'totals': totals,
+        'rows': rows,
+    }
@@ -0,0 +1,153 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .cart import recalculate_cart_totals
+from .core.batching import batches
+from .models import Cart, CartItem, Category, Payment, PaymentItem, Product
+from .users_io import import_users
+
+# Gerador de dados sintéticos para desenvolvimento e benchmarks.
+# Determinístico: a mesma semente gera os mesmos nomes, preços, estoques, carrinhos
+# e pagamentos. Tudo é gravado com bulk_create em lotes; os registros levam um
+# prefixo (sku, username, nome da categoria) para poderem ser apagados depois.
+
+ADJECTIVES = ('Clássico', 'Premium', 'Compacto', 'Eco', 'Ultra', 'Slim', 'Pro', 'Max', 'Mini', 'Smart')
+NOUNS = ('Camiseta', 'Tênis', 'Mochila', 'Fone', 'Relógio', 'Caneca', 'Luminária', 'Teclado',
+         'Garrafa', 'Jaqueta', 'Cadeira', 'Caderno', 'Mouse', 'Panela', 'Toalha')
+COLORS = ('preto', 'branco', 'azul', 'verde', 'vermelho', 'cinza', 'amarelo', 'rosa')
+DEFAULT_PASSWORD = 'senha-forte-123'
+
+
+def scaled(value, scale):
+    """Quantidade multiplicada pela escala (--scale do seed_data), arredondada e nunca negativa."""
+    return max(0, round(value * scale))
+
+
+def seeded_querysets(prefix):
+    return {
+        'payments': Payment.all_objects.filter(cart__cliente__user__username__startswith=f'{prefix}_'),
+        'cart_items': CartItem.all_objects.filter(cart__cliente__user__username__startswith=f'{prefix}_'),
+        'users': User.objects.filter(username__startswith=f'{prefix}_'),
+        'products': Product.all_objects.filter(sku__startswith=f'{prefix.upper()}-'),
+        'categories': Category.all_objects.filter(name__startswith=f'{prefix} '),
+    }
+
+
+def delete_dataset(prefix):
+    # apaga de verdade (não é soft delete); o delete() do queryset segue os CASCADE
+    with transaction.atomic():
+        return {name: queryset.delete()[0] for name, queryset in seeded_querysets(prefix).items()}
+
+
+def _create_payments(rng, carts, product_rows, total, now, batch_size):
+    # dois produtos quaisquer por pagamento, gravados como itens; aprovados espalhados nos últimos 90 dias
+    if not carts or len(product_rows) < 2:
+        return 0
+    products = {
+        pk: (name, category_id, category_name) for pk, name, category_id, category_name in
+        Product.all_objects.filter(pk__in=[pk for pk, _ in product_rows])
+        .values_list('pk', 'name', 'category_id', 'category__name')
+    }
+    statuses = [status for status, _ in Payment.STATUS_CHOICES]
+    methods = [method for method, _ in Payment.PAYMENT_METHODS]
+
+    def payment(_):
+        status = rng.choice(statuses)
+        lines = [(pk, price, rng.randint(1, 3)) for pk, price in rng.sample(product_rows, 2)]
+        amount = sum((price * quantity for _, price, quantity in lines), Decimal('0'))
+        paid_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 90)) if status == 'approved' else None
+        return Payment(cart_id=rng.choice(carts), payment_method=rng.choice(methods),
+                       amount=amount, status=status, paid_at=paid_at), lines
+
+    def items(created):
+        for payment, lines in created:
+            for pk, price, quantity in lines:
+                name, category_id, category_name = products[pk]
+                yield PaymentItem(payment=payment, product_id=pk, name=name, category_id=category_id,
+                                  category_name=category_name, quantity=quantity, unit_price=price)
+
+    created = 0
+    for batch in batches((payment(i) for i in range(total)), batch_size):
+        Payment.objects.bulk_create([payment for payment, _ in batch])
+        PaymentItem.objects.bulk_create(items(batch))
+        created += len(batch)
+    return created
+
+
+def add_payments(total, seed=42, prefix='seed', batch_size=1000):
+    """Mais pagamentos para os carrinhos de um dataset já gerado (histórico crescendo)."""
+    rng = random.Random(seed)
+    carts = list(Cart.objects.filter(cliente__user__username__startswith=f'{prefix}_')
+                 .order_by('pk').values_list('id', flat=True))
+    product_rows = list(Product.objects.filter(sku__startswith=f'{prefix.upper()}-')
+                        .order_by('sku').values_list('id', 'price'))
+    with transaction.atomic():
+        return _create_payments(rng, carts, product_rows, total, timezone.now(), batch_size)
+
+
+def generate_dataset(categories=20, products=1000, users=100, items_per_cart=5, payments=200,
+                     seed=42, prefix='seed', password=DEFAULT_PASSWORD, batch_size=1000):
+    rng = random.Random(seed)
+    now = timezone.now()
+    counts = {}
+
+    with transaction.atomic():
+        category_ids = [
+            category.pk for batch in batches(
+                (Category(name=f'{prefix} categoria {i:04d}', description=f'Categoria sintética {i}')
+                 for i in range(categories)), batch_size)
+            for category in Category.objects.bulk_create(batch)
+        ]
+        if None in category_ids:
+            category_ids = list(Category.objects.filter(name__startswith=f'{prefix} ').order_by('name')
+                                .values_list('id', flat=True))
+        counts['categories'] = len(category_ids)
+
+        def product(i):
+            name = f'{rng.choice(NOUNS)} {rng.choice(ADJECTIVES)} {rng.choice(COLORS)}'
+            return Product(
+                sku=f'{prefix.upper()}-{i:07d}', name=name,
+                description=f'{name}: produto sintético número {i}.',
+                price=Decimal(rng.randint(100, 99999)) / 100, stock=rng.randint(0, 500),
+                category_id=rng.choice(category_ids),
+            )
+
+        if category_ids:
+            for batch in batches((product(i) for i in range(products)), batch_size):
+                Product.objects.bulk_create(batch)
+        product_rows = list(Product.objects.filter(sku__startswith=f'{prefix.upper()}-')
+                            .order_by('sku').values_list('id', 'price'))
+        counts['products'] = len(product_rows)
+
+    # um hash só para todos os usuários (o hasher é o que custa caro)
+    hashed = make_password(password)
+    result = import_users(
+        ({'username': f'{prefix}_user{i:06d}', 'email': f'{prefix}_user{i:06d}@example.com',
+          'first_name': 'Usuário', 'last_name': f'{i:06d}', 'password': hashed}
+         for i in range(users)),
+        batch_size=batch_size)
+    counts['users'] = result.created
+
+    carts = list(Cart.objects.filter(cliente__user__username__startswith=f'{prefix}_')
+                 .order_by('cliente__user__username').values_list('id', flat=True))
+    with transaction.atomic():
+        def cart_items():
+            for cart_id in carts:
+                size = rng.randint(0, min(items_per_cart, len(product_rows)))
+                for product_id, _ in rng.sample(product_rows, size):
+                    yield CartItem(cart_id=cart_id, product_id=product_id, quantity=rng.randint(1, 5))
+
+        counts['cart_items'] = 0
+        for batch in batches(cart_items(), batch_size):
+            counts['cart_items'] += len(CartItem.objects.bulk_create(batch))
+        # bulk_create não passa pelo save(): totais calculados de uma vez no fim
+        recalculate_cart_totals(Cart.objects.filter(cliente__user__username__startswith=f'{prefix}_'))
+
+        counts['payments'] = _create_payments(rng, carts, product_rows, payments, now, batch_size)
+    return counts
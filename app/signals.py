@@ -1,13 +1,87 @@
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Cliente
+from decimal import Decimal
+
+from .cart import adjust_cart_totals, item_deltas, reprice_cart_totals
+from .handlers import PAYMENT_STATUS_CHANGED
+from .core.authentication import forget_user_snapshot, replace_user_snapshot
+from .core.cache import catalog_cache
+from .core.db import count_connection
+from .core.models import bulk_changed
+from .models import Cart, CartItem, Cliente, Category, Payment, Product
+from .outbox import publish
 
 @receiver(post_save, sender=User)
 def create_user_cliente(sender, instance, created,**kwargs):
     if created:
-        Cliente.objects.create(user=instance)
+        # ponto único de criação do cliente e do carrinho
+        cliente = Cliente.objects.create(user=instance)
+        Cart.objects.create(cliente=cliente)
+
+@receiver(post_save, sender=User)
+def save_user_cliente(sender, instance, created, **kwargs):
+    # só regrava o cliente se ele foi carregado junto com o user e algum campo mudou
+    # (nada de UPDATE extra no cadastro nem a cada last_login)
+    relation = User.cliente.related
+    if created or not relation.is_cached(instance):
+        return
+    cliente = relation.get_cached_value(instance)
+    changed = cliente.changed_fields() if cliente is not None else []
+    if changed:
+        cliente.save(update_fields=changed + ['updated_at'])
+
 
+# mantém o snapshot da autenticação em dia: senha trocada ou usuário desativado
+# revogam os tokens já emitidos na hora (snapshot descartado agora, regravado no commit)
 @receiver(post_save, sender=User)
-def save_user_cliente(sender, instance, **kwargs):
-    instance.cliente.save()
\ No newline at end of file
+def refresh_user_snapshot(sender, instance, **kwargs):
+    replace_user_snapshot(instance)
+
+
+@receiver(post_delete, sender=User)
+def drop_user_snapshot(sender, instance, **kwargs):
+    forget_user_snapshot(instance.pk)
+
+
+# qualquer escrita no catálogo (save, soft delete, delete, update em lote) muda a versão do cache
+@receiver([post_save, post_delete, bulk_changed], sender=Product)
+@receiver([post_save, post_delete, bulk_changed], sender=Category)
+def bump_catalog_version(sender, **kwargs):
+    catalog_cache.bump_on_commit()
+
+
+# totais do carrinho: cada save() de item (criação, quantidade, soft delete) ajusta
+# o carrinho pela diferença; mudança de preço reajusta os carrinhos com o produto
+@receiver(post_save, sender=CartItem)
+def update_cart_totals(sender, instance, **kwargs):
+    for cart_id, deltas in item_deltas(instance).items():
+        adjust_cart_totals(cart_id, deltas)
+
+
+@receiver(post_save, sender=Product)
+def reprice_carts(sender, instance, created, **kwargs):
+    loaded = instance.loaded_values()
+    if created or loaded is None or 'price' not in loaded:
+        return
+    reprice_cart_totals(instance.pk, Decimal(str(loaded['price'])), Decimal(str(instance.price)))
+
+
+# mudança de status do pagamento: só grava o evento (na transação do save); o
+# trabalho derivado roda no worker do outbox
+@receiver(post_save, sender=Payment)
+def publish_payment_status(sender, instance, created, **kwargs):
+    loaded = instance.loaded_values()
+    previous = None if created or loaded is None else loaded.get('status', instance.status)
+    if previous == instance.status:
+        return
+    publish(PAYMENT_STATUS_CHANGED, {
+        'payment_id': instance.pk, 'cart_id': instance.cart_id,
+        'status': instance.status, 'previous': previous,
+    })
+
+
+@receiver(connection_created)
+def track_db_connection(sender, connection, **kwargs):
+    count_connection(connection.alias)
@@ -1,3 +1,1396 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from itertools import count
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management import CommandError, call_command
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from app.api.v1.serializers import MyTokenObtainPairSerializer
+from app.core.authentication import update_users
+from app.core.cache import VersionedCache, catalog_cache, check_catalog_cache
+from app.core.fastread import _reader_for
+from app.core.metrics import registry
+from app.core.openapi import load_artifact
+from app.core.warmup import warm_up
+from app.core.renderers import FastJSONRenderer
+from app.archive import archive_deleted
+from app.cart import reconcile_cart_totals
+from app.catalog_io import import_products, read_rows
+from app.checkout import CheckoutConflict, checkout_cart, snapshot_payment_items
+from app.core.testing import QueryCountTestMixin, run_concurrently
+from app.models import (
+    ArchivedRecord, Category, Cliente, OutboxEvent, Product, Cart, CartItem, Payment, RollupState,
+    DailyPaymentMethodSales, DailyProductSales, PaymentItem,
+)
+from app.outbox import claim, drain, handler as outbox_handler, publish
+from app.reports import refresh_sales_rollups, sales_report
+from app.seed import generate_dataset
+from app.users_io import import_users
+
+_seq = count()
+
+
+def make_category():
+    return Category.objects.create(name=f"Categoria {next(_seq)}")
+
+
+def make_product(category, **kwargs):
+    kwargs.setdefault('price', Decimal('10.00'))
+    kwargs.setdefault('stock', 100)
+    return Product.objects.create(
+        name=f"Produto {next(_seq)}", description="desc", category=category, **kwargs)
+
+
+# os testes rodam num processo só: o cache do catálogo pode usar o LocMem
+@override_settings(CATALOG_CACHE={**settings.CATALOG_CACHE, 'SINGLE_PROCESS': True})
+@override_settings(AUTH_USER_CACHE_SINGLE_PROCESS=True)
+class APITestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        catalog_cache.local.clear()
+        self.user = User.objects.create_user(username='cliente', password='senha-forte-123')
+        self.cart = self.user.cliente.cart
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class EagerLoadingTests(QueryCountTestMixin, APITestCase):
+    def grow(self):
+        # cada rodada cria categorias, produtos, itens no carrinho e pagamentos novos
+        category = make_category()
+        for _ in range(3):
+            product = make_product(category)
+            CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+        other = User.objects.create_user(username=f"u{next(_seq)}")
+        cart = other.cliente.cart
+        CartItem.objects.create(cart=cart, product=product)
+        Payment.objects.create(cart=cart, payment_method='pix', amount=Decimal('10.00'))
+
+    def test_list_endpoints_have_constant_queries(self):
+        self.grow()
+        for route in ('categories', 'products', 'carts', 'cart-items', 'payments',
+                      'categories/?expand=products', 'carts/?expand=items.product',
+                      'payments/?expand=cart.items.product'):
+            with self.subTest(route=route):
+                self.assertConstantQueries(f'/api/v1/{route}' if '?' in route else f'/api/v1/{route}/', self.grow)
+
+    def test_soft_deleted_children_are_not_prefetched(self):
+        category = make_category()
+        make_product(category)
+        make_product(category).delete()
+        response = self.client.get(f'/api/v1/categories/{category.pk}/')
+        self.assertEqual(len(response.data['products']), 1)
+        response = self.client.get(f'/api/v1/categories/{category.pk}/?expand=products')
+        self.assertEqual(len(response.data['products']), 1)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        category = make_category()
+        self.products = [make_product(category) for _ in range(25)]
+
+    def test_cursor_mode_walks_every_row_once(self):
+        seen = []
+        url = '/api/v1/products/?pagination=cursor'
+        while url:
+            response = self.client.get(url)
+            self.assertNotIn('count', response.data)
+            seen += [row['id'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(seen, [p.pk for p in self.products])
+
+    def test_previous_link_returns_the_same_page(self):
+        first = self.client.get('/api/v1/products/?pagination=cursor').data
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_page_numbers_still_available(self):
+        response = self.client.get('/api/v1/products/?page=3')
+        self.assertEqual(response.data['count'], 25)
+        self.assertEqual([row['id'] for row in response.data['results']],
+                         [p.pk for p in self.products[20:]])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/v1/products/?cursor=lixo')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_rejects_other_orderings(self):
+        for query in ('ordering=-price', 'search=produto'):
+            response = self.client.get(f'/api/v1/products/?pagination=cursor&{query}')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(query.split('=')[0], response.data)
+        self.assertEqual(self.client.get('/api/v1/products/?ordering=-price').status_code, 200)
+
+
+class CatalogCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = make_category()
+        self.product = make_product(self.category)
+
+    def test_second_read_is_served_from_cache(self):
+        url = f'/api/v1/products/{self.product.pk}/'
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(response.data['name'], self.product.name)
+
+    def test_query_params_are_part_of_the_key(self):
+        self.client.get('/api/v1/products/')
+        self.assertEqual(self.client.get('/api/v1/products/?page=1')['X-Cache'], 'MISS')
+
+    def test_writes_bump_the_version(self):
+        url = '/api/v1/categories/'
+        self.client.get(url)
+        writes = [
+            lambda: Product.objects.filter(pk=self.product.pk).update(price=Decimal('20.00')),
+            lambda: self.product.delete(),
+            lambda: make_category(),
+        ]
+        for write in writes:
+            write()
+            self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+            self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+    def test_process_local_version_disables_the_cache(self):
+        url = f'/api/v1/products/{self.product.pk}/'
+        # LocMem: a versão não seria vista pelos outros workers
+        with override_settings(CATALOG_CACHE={**settings.CATALOG_CACHE, 'SINGLE_PROCESS': False}):
+            self.assertFalse(catalog_cache.cross_process)
+            self.client.get(url)
+            self.assertNotIn('X-Cache', self.client.get(url))
+            self.assertEqual([error.id for error in check_catalog_cache(None)], ['app.W001'])
+        self.assertEqual(check_catalog_cache(None), [])
+
+    def test_lru_is_bounded_and_counts_hits(self):
+        local_only = VersionedCache('t', max_entries=2)
+        for i in range(3):
+            local_only.set(local_only.make_key(i), i)
+        self.assertIsNone(local_only.get(local_only.make_key(0)))
+        self.assertEqual(local_only.get(local_only.make_key(2)), 2)
+        local_only.bump()
+        self.assertIsNone(local_only.get(local_only.make_key(2)))
+        stats = local_only.stats()
+        self.assertEqual((stats['local_hits'], stats['misses']), (1, 2))
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = make_category()
+        self.product = make_product(self.category)
+
+    def test_if_none_match_gets_304_without_reading(self):
+        url = f'/api/v1/products/{self.product.pk}/'
+        response = self.client.get(url)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+        # validadores no catalog_cache: o 304 não vai ao banco
+        with self.assertNumQueries(0):
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        modified = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(modified.status_code, 304)
+
+    def test_writes_change_the_etag(self):
+        url = '/api/v1/categories/'
+        etag = self.client.get(url)['ETag']
+        writes = [
+            lambda: Product.objects.filter(pk=self.product.pk).update(price=Decimal('20.00')),
+            lambda: self.product.delete(),
+            lambda: make_category(),
+        ]
+        for write in writes:
+            write()
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
+            etag = response['ETag']
+
+    def test_list_has_no_last_modified(self):
+        # o soft delete tiraria o produto mais recente do MAX(updated_at): a data voltaria
+        response = self.client.get('/api/v1/products/')
+        self.assertNotIn('Last-Modified', response)
+        self.product.delete()
+        stale = self.client.get('/api/v1/products/', HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(stale.status_code, 200)
+
+    def test_list_reuses_the_validator_count(self):
+        CartItem.objects.create(cart=self.cart, product=self.product)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/cart-items/')
+        self.assertEqual(response.data['count'], 1)
+        # um COUNT só: o da paginação vem dos validadores
+        self.assertEqual(sum('COUNT(' in query['sql'] for query in queries), 1)
+        self.assertEqual(self.client.get('/api/v1/cart-items/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_expanded_relations_are_part_of_the_validators(self):
+        CartItem.objects.create(cart=self.cart, product=self.product)
+        url = '/api/v1/cart-items/'
+        collapsed = self.client.get(url)['ETag']
+        expanded = self.client.get(f'{url}?expand=product')['ETag']
+        Product.objects.filter(pk=self.product.pk).update(price=Decimal('11.00'))
+        # o item só mostra o id do produto: a mudança no produto não muda a resposta
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=collapsed).status_code, 304)
+        self.assertEqual(self.client.get(f'{url}?expand=product', HTTP_IF_NONE_MATCH=expanded).status_code, 200)
+
+    def test_if_match_guards_updates(self):
+        url = f'/api/v1/products/{self.product.pk}/'
+        etag = self.client.get(url)['ETag']
+        response = self.client.patch(url, {'stock': 50}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        # a ETag antiga não vale mais: outra escrita já passou por cima
+        stale = self.client.patch(url, {'stock': 10}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(stale.status_code, 412)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 50)
+        fresh = self.client.patch(url, {'stock': 10}, format='json', HTTP_IF_MATCH=response['ETag'])
+        self.assertEqual(fresh.status_code, 200)
+
+    def test_if_match_accepts_the_etag_of_any_representation(self):
+        url = f'/api/v1/products/{self.product.pk}/'
+        expanded = self.client.get(f'{url}?expand=category&fields=id,name,category')
+        plain_etag = self.client.get(url)['ETag']
+        self.assertNotEqual(expanded['ETag'], plain_etag)
+        response = self.client.patch(url, {'stock': 50}, format='json', HTTP_IF_MATCH=expanded['ETag'])
+        self.assertEqual(response.status_code, 200, response.data)
+        # a linha mudou: as ETags lidas antes não valem mais, de nenhuma representação
+        self.assertEqual(self.client.patch(url, {'stock': 1}, format='json',
+                                           HTTP_IF_MATCH=expanded['ETag']).status_code, 412)
+        self.assertEqual(self.client.patch(url, {'stock': 1}, format='json',
+                                           HTTP_IF_MATCH=plain_etag).status_code, 412)
+        # If-Unmodified-Since compara o updated_at da própria linha
+        since = http_date(Product.objects.get(pk=self.product.pk).updated_at.timestamp() + 1)
+        self.assertEqual(self.client.patch(url, {'stock': 2}, format='json',
+                                           HTTP_IF_UNMODIFIED_SINCE=since).status_code, 200)
+
+    def test_missing_detail_is_still_404(self):
+        response = self.client.get('/api/v1/products/999999/', HTTP_IF_NONE_MATCH='"x"')
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response)
+
+
+class SparseFieldsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = make_category()
+        self.products = [make_product(self.category) for _ in range(12)]
+        CartItem.objects.create(cart=self.cart, product=self.products[0], quantity=2)
+        self.payment = Payment.objects.create(cart=self.cart, payment_method='pix', amount=Decimal('20.00'))
+
+    def test_relations_are_ids_until_expanded(self):
+        url = f'/api/v1/categories/{self.category.pk}/'
+        self.assertEqual(self.client.get(url).data['products'], [p.pk for p in self.products])
+        expanded = self.client.get(f'{url}?expand=products').data['products']
+        self.assertEqual(expanded[0]['name'], self.products[0].name)
+
+    def test_nested_fields_and_expand(self):
+        response = self.client.get(
+            f'/api/v1/payments/{self.payment.pk}/?expand=cart.items&fields=id,cart.id,cart.items')
+        self.assertEqual(set(response.data), {'id', 'cart'})
+        self.assertEqual(set(response.data['cart']), {'id', 'items'})
+        self.assertEqual(response.data['cart']['items'][0]['product'], self.products[0].pk)
+
+    def test_unrequested_relations_are_not_queried(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/v1/categories/{self.category.pk}/?fields=id,name')
+        self.assertEqual(set(response.data), {'id', 'name'})
+        self.assertFalse([q['sql'] for q in queries if 'app_product' in q['sql']])
+
+    def test_fields_do_not_drop_input_on_writes(self):
+        url = f'/api/v1/products/{self.products[0].pk}/?fields=id'
+        response = self.client.patch(url, {'name': 'Renomeado'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['name'], 'Renomeado')
+
+    def test_large_responses_are_compressed(self):
+        response = self.client.get('/api/v1/products/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        small = self.client.get(f'/api/v1/products/{self.products[0].pk}/?fields=id', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(small.has_header('Content-Encoding'))
+
+    def test_if_match_accepts_the_compressed_etag(self):
+        url = f'/api/v1/categories/{self.category.pk}/?expand=products'
+        etag = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        response = self.client.patch(url, {'description': 'nova'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class CurrentCartTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = make_product(make_category())
+
+    def test_registration_creates_cliente_and_cart(self):
+        response = self.client.post('/api/v1/register/', {'username': 'novo', 'password': 'senha-forte-123'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Cart.objects.filter(cliente__user__username='novo').exists())
+
+    def test_cart_id_comes_from_the_token(self):
+        client = APIClient()
+        token = self.client.post('/api/token/', {'username': 'cliente', 'password': 'senha-forte-123'}, format='json').data['access']
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        # o snapshot do usuário entra no cache no commit (que o TestCase não faz) ou no primeiro request
+        client.get('/api/v1/cart-items/')
+        CartItem.objects.create(cart=self.cart, product=self.product)
+        # só a listagem dos itens (validadores com o count + página): usuário e carrinho vêm do token/cache
+        with self.assertNumQueries(2):
+            response = client.get('/api/v1/cart-items/')
+        self.assertEqual(response.data['count'], 1)
+
+    def test_create_uses_the_resolved_cart(self):
+        response = self.client.post('/api/v1/cart-items/', {'product_id': self.product.pk, 'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.cart.items.get().quantity, 2)
+
+
+class CheckoutTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        category = make_category()
+        self.a = make_product(category, price=Decimal('10.50'), stock=5)
+        self.b = make_product(category, price=Decimal('3.00'), stock=1)
+        CartItem.objects.create(cart=self.cart, product=self.a, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.b, quantity=1)
+
+    def test_checkout_charges_server_side_total_and_reserves_stock(self):
+        response = self.client.post('/api/v1/carts/checkout/', {'payment_method': 'pix'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['amount'], '24.00')
+        self.a.refresh_from_db()
+        self.b.refresh_from_db()
+        self.assertEqual((self.a.stock, self.b.stock), (3, 0))
+        # itens gravados no pagamento com o preço cobrado
+        items = PaymentItem.objects.filter(payment_id=response.data['id']).order_by('product_id')
+        self.assertEqual([(item.product_id, item.quantity, item.unit_price) for item in items],
+                         [(self.a.pk, 2, Decimal('10.50')), (self.b.pk, 1, Decimal('3.00'))])
+
+    def test_out_of_stock_rolls_back_every_item(self):
+        Product.objects.filter(pk=self.b.pk).update(stock=0)
+        response = self.client.post('/api/v1/carts/checkout/', {'payment_method': 'pix'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['products'], [str(self.b.pk)])
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.stock, 5)
+        self.assertFalse(Payment.objects.exists())
+
+    def test_empty_cart(self):
+        self.cart.items.all().delete()
+        response = self.client.post('/api/v1/carts/checkout/', {'payment_method': 'pix'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_checkout_empties_the_cart_and_is_not_repeated(self):
+        first = self.client.post('/api/v1/carts/checkout/', {'payment_method': 'pix'}, format='json')
+        self.assertEqual(first.status_code, 201)
+        self.cart.refresh_from_db()
+        self.assertFalse(self.cart.items.exists())
+        self.assertEqual((self.cart.subtotal, self.cart.item_count), (Decimal('0'), 0))
+        # clique duplo / retentativa: nada é cobrado nem baixado de novo
+        again = self.client.post('/api/v1/carts/checkout/', {'payment_method': 'pix'}, format='json')
+        self.assertEqual(again.status_code, 400)
+        self.assertEqual(Payment.objects.count(), 1)
+        self.a.refresh_from_db()
+        self.assertEqual(self.a.stock, 3)
+        self.assertEqual(reconcile_cart_totals(fix=False), [])
+
+    def test_only_lock_timeouts_become_conflicts(self):
+        from unittest import mock
+
+        from django.db import OperationalError
+
+        class LockNotAvailable(Exception):
+            sqlstate = '55P03'
+
+        def failing(error):
+            def fail(*args):
+                raise error
+            return fail
+
+        timeout = OperationalError('canceling statement due to lock timeout')
+        timeout.__cause__ = LockNotAvailable()
+        with mock.patch('app.checkout._reserve_and_charge', failing(timeout)):
+            with self.assertRaises(CheckoutConflict):
+                checkout_cart(self.cart.pk, 'pix')
+        with mock.patch('app.checkout._reserve_and_charge', failing(OperationalError('disk I/O error'))):
+            with self.assertRaises(OperationalError):
+                checkout_cart(self.cart.pk, 'pix')
+
+
+class ConcurrentCheckoutTests(TransactionTestCase):
+    STOCK = 5
+    BUYERS = 20
+
+    def test_parallel_checkouts_never_oversell(self):
+        product = make_product(make_category(), stock=self.STOCK)
+        carts = []
+        for i in range(self.BUYERS):
+            cart = User.objects.create_user(username=f'comprador{i}').cliente.cart
+            CartItem.objects.create(cart=cart, product=product, quantity=1)
+            carts.append((cart.pk, 'pix'))
+
+        results = run_concurrently(checkout_cart, carts, workers=8)
+
+        errors = [exc for _, exc in results if exc is not None]
+        self.assertTrue(all(isinstance(exc, CheckoutConflict) for exc in errors), errors)
+        sold = len(results) - len(errors)
+        product.refresh_from_db()
+        self.assertGreater(sold, 0)
+        self.assertLessEqual(sold, self.STOCK)
+        self.assertEqual(product.stock, self.STOCK - sold)
+        self.assertEqual(Payment.objects.count(), sold)
+
+
+class BulkCartTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        category = make_category()
+        self.products = [make_product(category) for _ in range(4)]
+        a, b, c, _ = self.products
+        CartItem.objects.create(cart=self.cart, product=a, quantity=1)
+        CartItem.objects.create(cart=self.cart, product=b, quantity=5)
+        CartItem.objects.create(cart=self.cart, product=c, quantity=1).delete()
+
+    def post(self, items):
+        return self.client.post('/api/v1/cart-items/bulk/?expand=items.product', {'items': items}, format='json')
+
+    def test_set_increment_and_remove_in_one_call(self):
+        a, b, c, d = self.products
+        response = self.post([
+            {'product_id': a.pk, 'quantity': 2, 'op': 'increment'},
+            {'product_id': b.pk, 'op': 'remove'},
+            {'product_id': c.pk, 'quantity': 3},
+            {'product_id': d.pk, 'quantity': 4, 'op': 'set'},
+        ])
+        self.assertEqual(response.status_code, 200, response.data)
+        quantities = {item['product']['id']: item['quantity'] for item in response.data['items']}
+        self.assertEqual(quantities, {a.pk: 3, c.pk: 3, d.pk: 4})
+
+    def test_queries_do_not_grow_with_items(self):
+        # inclui o UPDATE dos totais do carrinho
+        changes = [{'product_id': p.pk, 'quantity': 2} for p in self.products]
+        with self.assertNumQueries(9):
+            self.post(changes)
+        more = [make_product(self.products[0].category) for _ in range(10)]
+        changes += [{'product_id': p.pk, 'quantity': 1} for p in more]
+        with self.assertNumQueries(9):
+            self.post(changes)
+
+    def test_unknown_products_are_rejected_before_writing(self):
+        response = self.post([{'product_id': self.products[3].pk}, {'product_id': 999999}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(self.cart.items.filter(product=self.products[3]).exists())
+
+
+class CartTotalsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        category = make_category()
+        self.a = make_product(category, price=Decimal('10.50'), sku='TOT-A')
+        self.b = make_product(category, price=Decimal('3.00'))
+
+    def totals(self):
+        self.cart.refresh_from_db()
+        return self.cart.subtotal, self.cart.item_count
+
+    def test_item_changes_adjust_totals(self):
+        response = self.client.post('/api/v1/cart-items/', {'product_id': self.a.pk, 'quantity': 2}, format='json')
+        item_id = response.data['id']
+        self.client.post('/api/v1/cart-items/', {'product_id': self.b.pk, 'quantity': 1}, format='json')
+        self.assertEqual(self.totals(), (Decimal('24.00'), 3))
+
+        self.client.patch(f'/api/v1/cart-items/{item_id}/', {'quantity': 5}, format='json')
+        self.assertEqual(self.totals(), (Decimal('55.50'), 6))
+
+        self.client.delete(f'/api/v1/cart-items/{item_id}/')
+        self.assertEqual(self.totals(), (Decimal('3.00'), 1))
+
+        self.client.post('/api/v1/cart-items/bulk/', {'items': [
+            {'product_id': self.a.pk, 'quantity': 1},
+            {'product_id': self.b.pk, 'quantity': 2, 'op': 'increment'},
+        ]}, format='json')
+        self.assertEqual(self.totals(), (Decimal('19.50'), 4))
+        self.assertEqual(reconcile_cart_totals(fix=False), [])
+
+    def test_stale_instances_do_not_drift(self):
+        item = CartItem.objects.create(cart=self.cart, product=self.a, quantity=1)
+        # duas requests que carregaram o item antes de qualquer uma gravar
+        first, second = CartItem.objects.get(pk=item.pk), CartItem.objects.get(pk=item.pk)
+        first.quantity = 3
+        first.save()
+        second.quantity = 5
+        second.save()
+        self.assertEqual(self.totals(), (Decimal('52.50'), 5))
+        self.assertEqual(reconcile_cart_totals(fix=False), [])
+
+    def test_price_change_reprices_carts(self):
+        CartItem.objects.create(cart=self.cart, product=self.a, quantity=2)
+        product = Product.objects.get(pk=self.a.pk)
+        product.price = Decimal('12.00')
+        product.save()
+        self.assertEqual(self.totals(), (Decimal('24.00'), 2))
+
+        # a importação atualiza os preços com bulk_update
+        import_products([{'sku': 'TOT-A', 'name': 'x', 'price': '2.25', 'stock': 1, 'category': 'Nova'}])
+        self.assertEqual(self.totals(), (Decimal('4.50'), 2))
+
+    def test_cart_endpoint_exposes_totals(self):
+        CartItem.objects.create(cart=self.cart, product=self.a, quantity=2)
+        data = self.client.get(f'/api/v1/carts/{self.cart.pk}/').data
+        self.assertEqual((data['subtotal'], data['item_count']), ('21.00', 2))
+
+    def test_payment_amount_defaults_to_subtotal(self):
+        CartItem.objects.create(cart=self.cart, product=self.b, quantity=3)
+        response = self.client.post('/api/v1/payments/', {'cart_id': self.cart.pk, 'payment_method': 'pix'},
+                                    format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['amount'], '9.00')
+        item = PaymentItem.objects.get(payment_id=response.data['id'])
+        self.assertEqual((item.product_id, item.quantity, item.unit_price, item.name),
+                         (self.b.pk, 3, self.b.price, self.b.name))
+
+    def test_reconcile_fixes_drift(self):
+        CartItem.objects.create(cart=self.cart, product=self.a, quantity=2)
+        # caminhos que não passam pelo save(): update em lote de preço
+        Product.objects.filter(pk=self.a.pk).update(price=Decimal('1.00'))
+        out = StringIO()
+        call_command('reconcile_cart_totals', '--dry-run', stdout=out)
+        self.assertIn('1 carrinhos divergentes encontrados', out.getvalue())
+        self.assertEqual(self.totals(), (Decimal('21.00'), 2))
+
+        call_command('reconcile_cart_totals', stdout=StringIO())
+        self.assertEqual(self.totals(), (Decimal('2.00'), 2))
+        self.assertEqual(reconcile_cart_totals(fix=False), [])
+
+
+class CatalogTransferTests(APITestCase):
+    CSV_FEED = (
+        'sku,name,description,price,stock,category\n'
+        'A-1,Caneca,"Caneca de, cerâmica",19.90,10,Cozinha\n'
+        'A-2,Prato,Prato fundo,9.50,3,Cozinha\n'
+        'B-1,Lápis,Lápis HB,1.20,100,Papelaria\n'
+        ',Sem sku,x,1,1,Cozinha\n'
+    )
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_staff = True
+        self.user.save()
+
+    def upload(self, body, content_type='text/csv'):
+        return self.client.generic('POST', '/api/v1/products/import/', body, content_type=content_type)
+
+    def test_import_creates_then_updates_by_sku(self):
+        response = self.upload(self.CSV_FEED)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['created'], response.data['updated']), (3, 0))
+        self.assertEqual(response.data['errors'][0]['line'], 4)
+        self.assertEqual(Category.objects.count(), 2)
+
+        jsonl = '{"sku": "A-2", "name": "Prato raso", "price": "8.00", "stock": 7, "category": "Mesa"}\n'
+        response = self.upload(jsonl, 'application/x-ndjson')
+        self.assertEqual((response.data['created'], response.data['updated']), (0, 1))
+        product = Product.objects.get(sku='A-2')
+        self.assertEqual((product.name, product.stock, product.category.name), ('Prato raso', 7, 'Mesa'))
+
+    def test_import_requires_staff(self):
+        self.user.is_staff = False
+        self.user.save()
+        self.assertEqual(self.upload(self.CSV_FEED).status_code, 403)
+
+    def test_export_round_trips(self):
+        self.upload(self.CSV_FEED)
+        response = self.client.get('/api/v1/products/export/')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.splitlines()[0], 'sku,name,description,price,stock,category')
+        self.assertIn('A-1,Caneca,"Caneca de, cerâmica",19.90,10,Cozinha', body)
+
+        # reimportar o dump revive os produtos com soft delete, pelo sku
+        for product in Product.objects.all():
+            product.delete()
+        result = import_products(read_rows(body.splitlines(keepends=True), 'csv'))
+        self.assertEqual((result.created, result.updated), (0, 3))
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_jsonl_rows_with_other_types_are_line_errors(self):
+        lines = [
+            '{"sku": 123, "name": "Caneca", "price": "9.90", "stock": 1, "category": 7}\n',
+            '[1]\n',
+            '5\n',
+        ]
+        result = import_products(read_rows(lines, 'jsonl'))
+        self.assertEqual((result.created, [error['line'] for error in result.errors]), (1, [2, 3]))
+        product = Product.objects.get(sku='123')
+        self.assertEqual(product.category.name, '7')
+
+
+class ProductSearchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.kitchen, self.office = make_category(), make_category()
+        make_product(self.kitchen)
+        self.mug = Product.objects.create(
+            name='Caneca azul', description='Cerâmica', price=Decimal('25.00'), stock=3, category=self.kitchen)
+        self.pen = Product.objects.create(
+            name='Caneta azul', description='Esferográfica', price=Decimal('2.50'), stock=0, category=self.office)
+
+    def ids(self, query):
+        response = self.client.get(f'/api/v1/products/?{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data['results']]
+
+    def test_filters(self):
+        self.assertEqual(self.ids('search=azul&ordering=price'), [self.pen.pk, self.mug.pk])
+        self.assertEqual(self.ids('search=azul&in_stock=true'), [self.mug.pk])
+        self.assertEqual(self.ids(f'search=azul&category={self.office.pk}'), [self.pen.pk])
+        self.assertEqual(self.ids('search=azul&min_price=3&max_price=30'), [self.mug.pk])
+        self.assertEqual(self.client.get('/api/v1/products/?min_price=abc').status_code, 400)
+
+    def test_facets_ignore_the_category_filter(self):
+        response = self.client.get(f'/api/v1/products/facets/?search=azul&category={self.office.pk}')
+        counts = {row['id']: row['count'] for row in response.data['categories']}
+        self.assertEqual(counts, {self.kitchen.pk: 1, self.office.pk: 1})
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/products/facets/?in_stock=false')
+
+
+class SoftDeleteArchiveTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = make_category()
+        self.kept, self.gone, self.in_cart = (make_product(self.category) for _ in range(3))
+        CartItem.objects.create(cart=self.cart, product=self.in_cart)
+
+    def age(self, *objs):
+        Product.all_objects.filter(pk__in=[obj.pk for obj in objs]).update(
+            updated_at=timezone.now() - timedelta(days=60))
+
+    def test_bulk_soft_delete_is_one_update(self):
+        with self.assertNumQueries(1):
+            Product.objects.filter(pk__in=[self.kept.pk, self.gone.pk]).soft_delete()
+        self.assertEqual(list(Product.objects.all()), [self.in_cart])
+
+    def test_archive_moves_only_old_unreferenced_rows(self):
+        for product in (self.kept, self.gone, self.in_cart):
+            product.delete()
+        self.age(self.gone, self.in_cart)
+
+        totals = archive_deleted(days=30, batch_size=1)
+
+        self.assertEqual(totals['app.Product'], 1)
+        self.assertEqual(
+            set(Product.all_objects.values_list('pk', flat=True)), {self.kept.pk, self.in_cart.pk})
+        record = ArchivedRecord.objects.get()
+        self.assertEqual((record.model, record.object_id), ('app.Product', self.gone.pk))
+        self.assertEqual(record.data['name'], self.gone.name)
+        self.assertTrue(CartItem.objects.filter(product=self.in_cart).exists())
+
+    def test_archived_payment_takes_its_items(self):
+        payment = Payment.objects.create(cart=self.cart, payment_method='pix', amount=Decimal('10.00'))
+        snapshot_payment_items(payment, {self.in_cart.pk: 1})
+        payment.delete()
+        Payment.all_objects.filter(pk=payment.pk).update(updated_at=timezone.now() - timedelta(days=60))
+
+        self.assertEqual(archive_deleted(days=30)['app.Payment'], 1)
+        self.assertFalse(PaymentItem.objects.exists())
+        record = ArchivedRecord.objects.get(model='app.Payment')
+        self.assertEqual([item['product_id'] for item in record.data['items']], [self.in_cart.pk])
+
+
+class RendererTests(APITestCase):
+    def test_fast_json_matches_the_default_renderer(self):
+        data = {
+            'price': Decimal('10.50'), 'when': timezone.now(), 1: 'chave int',
+            'text': 'ação \u2028 linha', 'items': [{'a': None, 'b': 1.5, 'c': True}],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, 'application/json; indent=2'),
+            JSONRenderer().render(data, 'application/json; indent=2'))
+
+    def test_xml_and_yaml_are_still_negotiated(self):
+        make_product(make_category())
+        for media_type in ('application/xml', 'application/yaml'):
+            with self.subTest(media_type=media_type):
+                response = self.client.get('/api/v1/products/', HTTP_ACCEPT=media_type)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response['Content-Type'].startswith(media_type))
+
+    def test_yaml_body_is_parsed(self):
+        response = self.client.generic(
+            'POST', '/api/v1/categories/', 'name: Nova\ndescription: via yaml\n',
+            content_type='application/yaml')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Category.objects.get(name='Nova').description, 'via yaml')
+
+
+class FastReadTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        for _ in range(2):
+            category = make_category()
+            for i in range(3):
+                product = make_product(category, price=Decimal('7.35') * (i + 1))
+                CartItem.objects.create(cart=self.cart, product=product, quantity=i + 1)
+        make_product(category).delete()
+        Category.objects.create(name='Vazia')
+
+    def bodies(self, url):
+        cache.clear()
+        catalog_cache.local.clear()
+        fast = self.client.get(url, HTTP_ACCEPT='application/json').content
+        cache.clear()
+        catalog_cache.local.clear()
+        with override_settings(FAST_READ_ENABLED=False):
+            slow = self.client.get(url, HTTP_ACCEPT='application/json').content
+        return fast, slow
+
+    def test_output_is_byte_identical(self):
+        product = Product.objects.first()
+        for url in ('/api/v1/products/', '/api/v1/products/?pagination=cursor',
+                    f'/api/v1/products/{product.pk}/', '/api/v1/categories/',
+                    f'/api/v1/categories/{product.category_id}/', '/api/v1/carts/',
+                    f'/api/v1/carts/{self.cart.pk}/', '/api/v1/categories/?expand=products',
+                    '/api/v1/products/?fields=id,name,price', '/api/v1/carts/?expand=items.product',
+                    f'/api/v1/carts/{self.cart.pk}/?expand=items&fields=id,items.quantity'):
+            with self.subTest(url=url):
+                fast, slow = self.bodies(url)
+                self.assertEqual(fast, slow)
+
+    def test_missing_object(self):
+        self.assertEqual(self.client.get('/api/v1/products/999999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/v1/products/abc/').status_code, 404)
+
+    def test_object_permissions_get_the_model_instance(self):
+        from unittest import mock
+
+        from rest_framework.permissions import BasePermission, IsAuthenticated
+
+        from app.api.v1.viewsets import CartViewSet
+
+        seen = []
+
+        class OwnCart(BasePermission):
+            def has_object_permission(self, request, view, obj):
+                seen.append(obj)
+                return obj.cliente.user_id == request.user.pk
+
+        other = User.objects.create_user(username='outro').cliente.cart
+        with mock.patch.object(CartViewSet, 'permission_classes', [IsAuthenticated, OwnCart]):
+            self.assertEqual(self.client.get(f'/api/v1/carts/{self.cart.pk}/').status_code, 200)
+            self.assertEqual(self.client.get(f'/api/v1/carts/{other.pk}/').status_code, 403)
+        self.assertTrue(seen and all(isinstance(obj, Cart) for obj in seen))
+
+
+class CachedJWTAuthenticationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        CartItem.objects.create(cart=self.cart, product=make_product(make_category()))
+
+    def token_client(self):
+        client = APIClient()
+        token = client.post(
+            '/api/token/', {'username': 'cliente', 'password': 'senha-forte-123'}, format='json').data['access']
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return client
+
+    def test_user_comes_from_cache(self):
+        client = self.token_client()
+        client.get('/api/v1/cart-items/')
+        # só as queries da listagem (validadores com o count + página); nenhuma para o usuário
+        with self.assertNumQueries(2):
+            response = client.get('/api/v1/cart-items/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_db_load_on_cache_miss(self):
+        client = self.token_client()
+        cache.clear()
+        with self.assertNumQueries(3):
+            client.get('/api/v1/cart-items/')
+
+    def test_password_change_revokes_tokens(self):
+        client = self.token_client()
+        self.user.set_password('outra-senha-456')
+        self.user.save()
+        self.assertEqual(client.get('/api/v1/cart-items/').status_code, 401)
+
+    def test_deactivation_revokes_tokens(self):
+        client = self.token_client()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(client.get('/api/v1/cart-items/').status_code, 401)
+
+    def test_snapshot_is_written_only_on_commit(self):
+        client = self.token_client()
+        client.get('/api/v1/cart-items/')
+        try:
+            with transaction.atomic():
+                self.user.set_password('outra-senha-456')
+                self.user.save()
+                raise RuntimeError('desfaz')
+        except RuntimeError:
+            pass
+        # rollback: o cache não ficou com uma versão que o banco não tem
+        self.assertEqual(client.get('/api/v1/cart-items/').status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password('outra-senha-456')
+            self.user.save()
+        self.assertEqual(client.get('/api/v1/cart-items/').status_code, 401)
+        self.assertIsNotNone(cache.get(f'auth:user:{self.user.pk}'))
+
+    def test_bulk_update_revokes_tokens(self):
+        client = self.token_client()
+        client.get('/api/v1/cart-items/')
+        self.assertEqual(update_users(User.objects.filter(username='cliente'), is_active=False), 1)
+        self.assertEqual(client.get('/api/v1/cart-items/').status_code, 401)
+
+    def test_process_local_cache_is_not_used(self):
+        client = self.token_client()
+        client.get('/api/v1/cart-items/')
+        # LocMem: outro worker não veria a revogação, então o usuário vem do banco
+        with self.settings(AUTH_USER_CACHE_SINGLE_PROCESS=False):
+            with self.assertNumQueries(3):
+                client.get('/api/v1/cart-items/')
+
+
+def writes(queries):
+    # 'INSERT app_cart', 'UPDATE auth_user'...
+    return [' '.join(q['sql'].replace(' INTO ', ' ').split()[:2]).replace('"', '') for q in queries
+            if q['sql'].startswith(('INSERT', 'UPDATE'))]
+
+
+class UserRegistrationTests(TestCase):
+    def test_one_write_per_table(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = APIClient().post('/api/v1/register/', {
+                'username': 'novo', 'password': 'senha-forte-123', 'email': 'novo@example.com',
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(writes(ctx.captured_queries),
+                         ['INSERT auth_user', 'INSERT app_cliente', 'INSERT app_cart'])
+        self.assertTrue(Cart.objects.filter(cliente__user__username='novo').exists())
+
+    def test_cliente_saved_only_when_changed(self):
+        user = User.objects.create_user('fulano', password='x')
+        user = User.objects.select_related('cliente').get(pk=user.pk)
+        with CaptureQueriesContext(connection) as ctx:
+            user.first_name = 'Fulano'
+            user.save()
+        self.assertEqual(writes(ctx.captured_queries), ['UPDATE auth_user'])
+
+        user.cliente.telefone = '11 99999-0000'
+        user.save()
+        self.assertEqual(Cliente.objects.get(user=user).telefone, '11 99999-0000')
+
+
+class UserImportTests(TestCase):
+    def test_bulk_import(self):
+        hashed = make_password('senha-forte-123')
+        rows = [
+            {'username': 'ana', 'password': hashed, 'cpf': '111', 'data_nascimento': '1990-05-01'},
+            {'username': 'bia', 'password': hashed},
+            {'username': 'ana', 'password': hashed},
+            {'username': 'caio', 'password': 'texto-puro'},
+        ]
+        with self.assertNumQueries(7):
+            result = import_users(rows)
+        self.assertEqual(result.created, 2)
+        self.assertEqual([error['line'] for error in result.errors], [3, 4])
+
+        ana = User.objects.get(username='ana')
+        self.assertTrue(ana.check_password('senha-forte-123'))
+        self.assertEqual(str(ana.cliente.data_nascimento), '1990-05-01')
+        self.assertEqual(Cart.objects.filter(cliente__user__username__in=['ana', 'bia']).count(), 2)
+
+        # segunda rodada: usernames já existentes viram erro
+        result = import_users(read_rows(['username,password\n', f'bia,{hashed}\n'], 'csv'))
+        self.assertEqual((result.created, len(result.errors)), (0, 1))
+
+    def test_jsonl_rows_with_other_types_are_line_errors(self):
+        lines = ['{"username": 42, "cpf": 12345678900}\n', '"carla"\n', '[]\n']
+        result = import_users(read_rows(lines, 'jsonl'))
+        self.assertEqual((result.created, [error['line'] for error in result.errors]), (1, [2, 3]))
+        self.assertEqual(User.objects.get(username='42').cliente.cpf, '12345678900')
+
+
+class AsyncViewTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        for _ in range(2):
+            category = make_category()
+            for i in range(6):
+                product = make_product(category, price=Decimal('3.10') * (i + 1))
+        CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+        token = MyTokenObtainPairSerializer.get_token(self.user).access_token
+        self.headers = {'Authorization': f'Bearer {token}'}
+
+    def async_get(self, url):
+        return async_to_sync(AsyncClient().get)(url, headers=self.headers)
+
+    def test_same_output_as_sync_routes(self):
+        product = Product.objects.first()
+        pairs = [
+            ('products/', 'products/'),
+            ('products/?page=2&ordering=-price', 'products/?page=2&ordering=-price'),
+            ('products/?pagination=cursor&min_price=5', 'products/?pagination=cursor&min_price=5'),
+            (f'products/{product.pk}/', f'products/{product.pk}/'),
+            ('categories/', 'categories/'),
+            ('carts/current/', f'carts/{self.cart.pk}/'),
+            ('categories/?expand=products', 'categories/?expand=products'),
+            ('carts/current/?expand=items.product', f'carts/{self.cart.pk}/?expand=items.product'),
+        ]
+        for async_route, sync_route in pairs:
+            with self.subTest(route=async_route):
+                catalog_cache.local.clear()
+                expected = self.client.get(f'/api/v1/{sync_route}', HTTP_ACCEPT='application/json')
+                response = self.async_get(f'/api/v1/async/{async_route}')
+                self.assertEqual(response.status_code, 200, response.content)
+                # os links de paginação apontam para a própria rota async
+                self.assertEqual(response.content.replace(b'/api/v1/async/', b'/api/v1/'), expected.content)
+
+    def test_cursor_follows_to_next_page(self):
+        first = self.async_get('/api/v1/async/products/?pagination=cursor').json()
+        second = self.async_get(first['next']).json()
+        self.assertEqual(len(first['results']) + len(second['results']), 12)
+
+    def test_errors(self):
+        self.assertEqual(self.async_get('/api/v1/async/products/999999/').status_code, 404)
+        self.assertEqual(self.async_get('/api/v1/async/products/?page=99').status_code, 404)
+        response = async_to_sync(AsyncClient().get)('/api/v1/async/products/')
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('Bearer', response['WWW-Authenticate'])
+
+
+class DatabaseStatsTests(APITestCase):
+    def test_admin_only(self):
+        self.assertEqual(self.client.get('/api/v1/db/stats/').status_code, 403)
+
+    def test_reports_connections(self):
+        self.user.is_staff = True
+        self.user.save()
+        stats = self.client.get('/api/v1/db/stats/').data['default']
+        self.assertEqual(stats['vendor'], 'sqlite')
+        self.assertIn('connections_opened', stats)
+        self.assertNotIn('pool', stats)
+
+
+@override_settings(METRICS={'ENABLED': True, 'SAMPLE_RATE': 1.0, 'SERVER_TIMING': True, 'QUERY_BUDGET': 20,
+                            'TOKEN': 'segredo'})
+class MetricsMiddlewareTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        category = make_category()
+        for _ in range(3):
+            CartItem.objects.create(cart=self.cart, product=make_product(category))
+
+    def exposed(self):
+        return self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer segredo').content.decode()
+
+    def test_server_timing_header(self):
+        response = self.client.get('/api/v1/cart-items/')
+        timing = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertEqual(set(timing), {'db', 'serialize', 'render', 'total'})
+        self.assertIn('desc="', timing['db'])
+        self.assertNotIn("X-Query-Budget", response)
+
+    def test_histograms_are_exposed_per_view(self):
+        self.client.get('/api/v1/cart-items/')
+        self.client.get(f'/api/v1/products/{Product.objects.first().pk}/')
+        body = self.exposed()
+        self.assertIn('api_request_duration_seconds_count{view="CartItemViewSet.list"} 1', body)
+        self.assertIn('api_request_phase_seconds_bucket{view="ProductViewSet.retrieve",phase="render",le="+Inf"} 1', body)
+        self.assertIn('api_requests_total{view="CartItemViewSet.list",status="200"} 1', body)
+
+    def test_serialize_phase_is_timed_by_the_view(self):
+        with self.settings(FAST_READ_ENABLED=False):
+            response = self.client.get('/api/v1/cart-items/')
+        timing = dict(part.split(';', 1) for part in response['Server-Timing'].split(', '))
+        self.assertNotEqual(timing['serialize'], 'dur=0.00')
+
+    def test_server_timing_is_opt_in(self):
+        with self.settings(METRICS={'SAMPLE_RATE': 1.0}):
+            self.assertNotIn('Server-Timing', self.client.get('/api/v1/cart-items/'))
+
+    def test_query_budget(self):
+        with self.settings(METRICS={'QUERY_BUDGET': 1, 'SAMPLE_RATE': 0.0, 'TOKEN': 'segredo'}):
+            with self.assertLogs('app.core.metrics', 'WARNING'):
+                response = self.client.get('/api/v1/cart-items/')
+            self.assertIn('api_requests_over_query_budget_total{view="CartItemViewSet.list"} 1', self.exposed())
+        self.assertTrue(response['X-Query-Budget'].startswith('exceeded'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_token_protects_endpoint(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer errado').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer segredo').status_code, 200)
+
+    def test_without_token_only_staff(self):
+        with self.settings(METRICS={'TOKEN': ''}):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            staff = User.objects.create_user(username='ops', password='senha-forte-123', is_staff=True)
+            self.client.force_login(staff)
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class SeedAndBenchmarkTests(TestCase):
+    def setUp(self):
+        # snapshots de usuários de outros testes (ids reaproveitados no SQLite)
+        cache.clear()
+
+    def test_dataset_is_deterministic(self):
+        sizes = dict(categories=3, products=20, users=4, items_per_cart=3, payments=5, seed=7, batch_size=8)
+        counts = generate_dataset(prefix='a', **sizes)
+        generate_dataset(prefix='b', **sizes)
+        self.assertEqual((counts['categories'], counts['products'], counts['users'], counts['payments']),
+                         (3, 20, 4, 5))
+        self.assertEqual(Cart.objects.filter(cliente__user__username__startswith='a_').count(), 4)
+
+        def products(prefix):
+            return list(Product.objects.filter(sku__startswith=f'{prefix.upper()}-')
+                        .order_by('sku').values_list('name', 'price', 'stock'))
+        self.assertEqual(products('a'), products('b'))
+        self.assertTrue(User.objects.get(username='a_user000000').check_password('senha-forte-123'))
+
+    def test_benchmark_writes_json_and_rolls_back_writes(self):
+        generate_dataset(categories=2, products=10, users=1, payments=0, prefix='seed', batch_size=5)
+        payments = Payment.objects.count()
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'bench.json')
+            call_command('bench_api', '--requests', '2', '--query-sample', '1', '--output', output,
+                         '--route', 'product-list', 'product-detail', 'cart-checkout', stdout=StringIO())
+            with open(output) as stream:
+                report = json.load(stream)
+        self.assertEqual([row['name'] for row in report['routes']],
+                         ['product-list', 'product-detail', 'cart-checkout'])
+        self.assertEqual(report['routes'][0]['status'], {'200': 2})
+        self.assertIn('p95_ms', report['routes'][1])
+        self.assertEqual(Payment.objects.count(), payments)
+
+
+@override_settings(SALES_ROLLUP_OVERLAP_SECONDS=0)
+class SalesRollupTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = make_category()
+        self.a = make_product(self.category, price=Decimal('10.00'))
+        self.b = make_product(self.category, price=Decimal('4.00'))
+        CartItem.objects.create(cart=self.cart, product=self.a, quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.b, quantity=1)
+        self.today = timezone.localdate()
+        now = timezone.now()
+        self.pix = Payment.objects.create(cart=self.cart, payment_method='pix', amount=Decimal('24.00'),
+                                          status='approved', paid_at=now)
+        self.boleto = Payment.objects.create(cart=self.cart, payment_method='boleto', amount=Decimal('24.00'),
+                                             status='approved', paid_at=now - timedelta(days=3))
+        pending = Payment.objects.create(cart=self.cart, payment_method='pix', amount=Decimal('99.00'))
+        for payment in (self.pix, self.boleto, pending):
+            snapshot_payment_items(payment, {self.a.pk: 2, self.b.pk: 1})
+
+    def report(self, group_by):
+        return sales_report(self.today - timedelta(days=6), self.today, group_by)
+
+    def test_rollups_and_incremental_refund(self):
+        self.assertEqual(refresh_sales_rollups()['days'], 2)
+        report = self.report('payment_method')
+        self.assertEqual(report['totals'], {'payments': 2, 'units': 6, 'revenue': Decimal('48.00')})
+        self.assertEqual([(row['payment_method'], row['revenue']) for row in report['rows']],
+                         [('boleto', Decimal('24.00')), ('pix', Decimal('24.00'))])
+        products = {row['product_id']: (row['units'], row['revenue']) for row in self.report('product')['rows']}
+        self.assertEqual(products, {self.a.pk: (4, Decimal('40.00')), self.b.pk: (2, Decimal('8.00'))})
+        self.assertEqual(self.report('category')['rows'][0]['name'], self.category.name)
+
+        # sem mudanças, nada a recalcular; o estorno só recalcula o dia dele
+        self.assertEqual(refresh_sales_rollups()['days'], 0)
+        self.pix.status = 'refunded'
+        self.pix.save()
+        self.assertEqual(refresh_sales_rollups()['days'], 1)
+        self.assertEqual(self.report('day')['totals']['revenue'], Decimal('24.00'))
+        self.assertEqual([row['day'] for row in self.report('day')['rows']], [self.today - timedelta(days=3)])
+
+    def test_history_ignores_later_cart_and_price_changes(self):
+        CartItem.objects.filter(cart=self.cart, product=self.b).soft_delete()
+        self.a.price = Decimal('99.00')
+        self.a.save()
+        refresh_sales_rollups(full=True)
+        products = {row['product_id']: (row['units'], row['revenue']) for row in self.report('product')['rows']}
+        self.assertEqual(products, {self.a.pk: (4, Decimal('40.00')), self.b.pk: (2, Decimal('8.00'))})
+
+    def test_moving_paid_at_rebuilds_the_old_day(self):
+        refresh_sales_rollups()
+        old_day = self.today - timedelta(days=3)
+        self.boleto.paid_at = timezone.now() - timedelta(days=1)
+        self.boleto.save()
+        self.assertEqual(refresh_sales_rollups()['days'], 2)
+        self.assertFalse(DailyPaymentMethodSales.objects.filter(day=old_day).exists())
+        self.assertFalse(DailyProductSales.objects.filter(day=old_day).exists())
+        self.assertEqual([row['day'] for row in self.report('day')['rows']],
+                         [self.today - timedelta(days=1), self.today])
+
+    def test_endpoint_reads_only_rollups(self):
+        refresh_sales_rollups()
+        self.assertEqual(self.client.get('/api/v1/reports/sales/').status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/v1/reports/sales/?group_by=product')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(len(response.data['rows']), 2)
+        self.assertFalse([q for q in ctx.captured_queries if 'app_payment' in q['sql']])
+        self.assertEqual(self.client.get('/api/v1/reports/sales/?group_by=x').status_code, 400)
+
+    def test_benchmark_runs(self):
+        generate_dataset(categories=1, products=5, users=2, payments=0, prefix='seed', batch_size=5)
+        out = StringIO()
+        call_command('bench_reports', '--steps', '5', '--requests', '1', '--group-by', 'day', '--json', stdout=out)
+        row = json.loads(out.getvalue())[0]
+        self.assertIn('p50_ms', row['rollup'])
+        self.assertIn('p50_ms', row['scan'])
+
+
+class AdminTests(QueryCountTestMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'senha-forte-123')
+        self.client.force_login(admin)
+        self.category = make_category()
+
+    def grow(self):
+        user = User.objects.create_user(username=f'u{next(_seq)}')
+        cart = user.cliente.cart
+        for _ in range(2):
+            CartItem.objects.create(cart=cart, product=make_product(self.category))
+        Payment.objects.create(cart=cart, payment_method='pix', amount=Decimal('10.00'))
+
+    def test_changelists_have_constant_queries(self):
+        self.grow()
+        for model in ('product', 'cart', 'cartitem', 'payment', 'category'):
+            with self.subTest(model=model):
+                self.assertConstantQueries(f'/admin/app/{model}/', self.grow)
+
+    def test_search_and_autocomplete(self):
+        product = make_product(self.category, sku='ADM-1')
+        make_product(self.category)
+        response = self.client.get('/admin/app/product/', {'q': 'ADM-1'})
+        self.assertEqual(list(response.context['cl'].result_list), [product])
+        response = self.client.get('/admin/app/product/', {'q': product.name})
+        self.assertEqual(list(response.context['cl'].result_list), [product])
+
+        response = self.client.get('/admin/autocomplete/', {
+            'app_label': 'app', 'model_name': 'cartitem', 'field_name': 'product', 'term': 'ADM-1'})
+        self.assertEqual([row['id'] for row in response.json()['results']], [str(product.pk)])
+        response = self.client.get('/admin/app/category/', {'q': self.category.name[:5].lower()})
+        self.assertIn(self.category, response.context['cl'].result_list)
+
+
+class OutboxTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = make_product(make_category(), price=Decimal('5.00'), stock=3)
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=2)
+
+    def checkout(self):
+        return self.client.post('/api/v1/carts/checkout/', {'payment_method': 'pix'}, format='json')
+
+    def test_events_are_written_with_the_payment_and_processed_later(self):
+        payment_id = self.checkout().data['id']
+        event = OutboxEvent.objects.get()
+        self.assertEqual((event.topic, event.payload['payment_id'], event.payload['status']),
+                         ('payment.status_changed', payment_id, 'pending'))
+        # nada do trabalho derivado roda no request
+        self.assertFalse(RollupState.objects.exists())
+
+        self.client.patch(f'/api/v1/payments/{payment_id}/', {'status': 'approved', 'paid_at': timezone.now()},
+                          format='json')
+        self.assertEqual(drain(workers=1), {'done': 2})
+        self.assertEqual(sales_report(timezone.localdate(), timezone.localdate())['totals']['revenue'],
+                         Decimal('10.00'))
+
+        # checkout sem estoque: a transação desfeita leva o evento junto
+        self.client.post('/api/v1/cart-items/bulk/', {'items': [{'product_id': self.product.pk, 'quantity': 2}]},
+                         format='json')
+        self.assertEqual(self.checkout().status_code, 409)
+        self.assertEqual(OutboxEvent.objects.count(), 2)
+
+    def test_failures_back_off_then_fail(self):
+        calls = []
+
+        @outbox_handler('test.flaky')
+        def flaky(payload):
+            calls.append(payload)
+            raise RuntimeError('fora do ar')
+
+        publish('test.flaky', {'n': 1})
+        publish('test.unknown', {})
+        with self.assertLogs('app.outbox', 'ERROR'):
+            self.assertEqual(drain(workers=1, max_attempts=2), {'pending': 1, 'failed': 1})
+        event = OutboxEvent.objects.get(topic='test.flaky')
+        self.assertEqual((event.attempts, event.status), (1, 'pending'))
+        self.assertGreater(event.available_at, timezone.now())
+        self.assertIn('fora do ar', event.last_error)
+
+        OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+        with self.assertLogs('app.outbox', 'ERROR'):
+            self.assertEqual(drain(workers=1, max_attempts=2), {'failed': 1})
+        self.assertEqual(len(calls), 2)
+
+    def test_event_that_kills_the_worker_fails_when_out_of_attempts(self):
+        event = publish('test.crash', {})
+        # o worker morreu na última tentativa: o prazo venceu sem o process() registrar nada
+        OutboxEvent.objects.filter(pk=event.pk).update(attempts=2, available_at=timezone.now())
+        self.assertEqual(claim(10, max_attempts=2)[1], [])
+        event.refresh_from_db()
+        self.assertEqual((event.status, event.attempts), ('failed', 2))
+        self.assertIn('Tentativas esgotadas', event.last_error)
+
+    def test_rollups_refresh_once_per_batch(self):
+        from unittest import mock
+
+        from app import reports
+
+        for _ in range(3):
+            Payment.objects.create(cart=self.cart, payment_method='pix', amount=Decimal('5.00'),
+                                   status='approved', paid_at=timezone.now())
+        with mock.patch.object(reports, '_record_counted_days', wraps=reports._record_counted_days) as refreshed:
+            self.assertEqual(drain(workers=1), {'done': 3})
+            self.assertEqual(refreshed.call_count, 1)
+            # evento novo, lote novo: atualiza de novo
+            Payment.objects.create(cart=self.cart, payment_method='pix', amount=Decimal('5.00'))
+            self.assertEqual(drain(workers=1), {'done': 1})
+            self.assertEqual(refreshed.call_count, 2)
+        self.assertEqual(sales_report(timezone.localdate(), timezone.localdate())['totals']['payments'], 3)
+
+
+class OutboxWorkerTests(TransactionTestCase):
+    def test_claims_never_overlap(self):
+        for n in range(7):
+            publish('test.count', {'n': n})
+        first = {event.pk for event in claim(5)[1]}
+        second = {event.pk for event in claim(5)[1]}
+        self.assertEqual((len(first), len(second), first & second), (5, 2, set()))
+        self.assertEqual(claim(5)[1], [])
+
+    @skipUnlessDBFeature('has_select_for_update_skip_locked')
+    def test_parallel_workers_process_each_event_once(self):
+        seen = []
+
+        @outbox_handler('test.count')
+        def count_event(payload):
+            seen.append(payload['n'])
+
+        for n in range(40):
+            publish('test.count', {'n': n})
+        results = run_concurrently(lambda: drain(workers=2, batch_size=5), [()] * 4, workers=4)
+        self.assertEqual([exc for _, exc in results if exc is not None], [])
+        self.assertEqual(sorted(seen), list(range(40)))
+        self.assertEqual(OutboxEvent.objects.filter(status='done').count(), 40)
+
+
+class SchemaTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'schema.yml')
+        call_command('build_schema', file=self.path, stdout=StringIO())
+        override = override_settings(OPENAPI_SCHEMA_FILE=self.path)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(load_artifact, reload=True)
+        load_artifact(reload=True)
+
+    def test_served_from_memory_with_etag(self):
+        # nenhuma introspecção nem query: só o arquivo gerado no build
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/schema/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('application/vnd.oai.openapi'))
+        with open(self.path, 'rb') as f:
+            self.assertEqual(response.content, f.read())
+        cached = self.client.get('/api/schema/', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        as_json = self.client.get('/api/schema/?format=json')
+        self.assertIn('/api/v1/products/', as_json.json()['paths'])
+        self.assertNotEqual(as_json['ETag'], response['ETag'])
+
+    def test_check_fails_when_out_of_date(self):
+        call_command('build_schema', file=self.path, check=True, stdout=StringIO())
+        with open(self.path, 'ab') as f:
+            f.write(b'# editado\n')
+        with self.assertRaises(CommandError):
+            call_command('build_schema', file=self.path, check=True, stdout=StringIO())
+
+    def test_live_introspection_only_in_debug(self):
+        self.assertEqual(self.client.get('/api/schema/live/').status_code, 404)
+
+
+class WarmUpTests(TestCase):
+    def test_warm_up_builds_readers_without_the_database(self):
+        _reader_for.cache_clear()
+        with self.assertNumQueries(0):
+            timings = warm_up()
+        self.assertEqual(set(timings), {'urls', 'serializers', 'schema', 'renderers'})
+        # os readers padrão das viewsets com leitura rápida já estão prontos
+        self.assertGreaterEqual(_reader_for.cache_info().currsize, 3)
+
+    def test_profile_startup_reports_imports_and_stages(self):
+        out = StringIO()
+        call_command('profile_startup', no_warm=True, json=True, top=5, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertIn('django', [row['package'] for row in report['packages']])
+        stages = [row['stage'] for row in report['stages']['cold']]
+        self.assertEqual(stages[0], 'django.setup (settings, apps, models)')
+        self.assertIn('1º GET /api/schema/', stages)
+
+    def test_gc_freeze_waits_for_a_fork(self):
+        import gc
+        from unittest import mock
+
+        from app.core import warmup
+
+        frozen = gc.get_freeze_count()
+        self.addCleanup(gc.unfreeze)
+        with mock.patch('os.register_at_fork') as register, \
+                override_settings(WARM_UP_ON_BOOT=True, WARM_UP_GC_FREEZE='fork'):
+            warmup.warm_up_on_boot()
+        # sem fork (runserver, sem preload) nada fica congelado
+        self.assertEqual(gc.get_freeze_count(), frozen)
+        register.assert_called_once_with(before=warmup._freeze_before_fork)
+        warmup._freeze_before_fork()
+        self.assertGreater(gc.get_freeze_count(), frozen)
+
+    def test_profile_passes_the_token_outside_the_command_line(self):
+        from unittest import mock
+
+        from app.core import startup
+
+        done = mock.Mock(returncode=0, stdout='[]', stderr='')
+        with mock.patch.object(startup.subprocess, 'run', return_value=done) as run:
+            startup.profile(['/api/v1/products/'], False, {'Authorization': 'Bearer segredo'})
+        args, kwargs = run.call_args
+        self.assertNotIn('segredo', ' '.join(args[0]))
+        self.assertIn('segredo', kwargs['input'])
 
-# Create your tests here.
@@ -0,0 +1,110 @@
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from .catalog_io import ImportResult, check_row, text_value
+from .core.batching import batches
+from .models import Cart, Cliente
+
+# Importação de usuários em lote (CSV ou JSONL, mesmo leitor do catálogo).
+# Cada lote grava User, Cliente e Cart com um bulk_create por tabela, sem passar
+# pelos signals de post_save. A senha deve vir já em hash (formato do Django,
+# ex.: 'pbkdf2_sha256$...'); senha em texto só com hash_plaintext=True, que roda
+# o hasher linha a linha e é bem mais lento.
+
+USER_COLUMNS = ('username', 'email', 'first_name', 'last_name', 'password',
+                'cpf', 'telefone', 'data_nascimento')
+
+
+def _clean_password(password, hash_plaintext):
+    if not password:
+        # sem senha: usuário criado com senha inutilizável
+        return make_password(None)
+    try:
+        identify_hasher(password)
+    except ValueError:
+        if not hash_plaintext:
+            raise ValueError('senha deve vir em hash (use --hash-plaintext para texto puro)')
+        return make_password(password)
+    return password
+
+
+def _clean_user(row, hash_plaintext):
+    check_row(row)
+    username = text_value(row, 'username')
+    if not username:
+        raise ValueError('username obrigatório')
+    birth = row.get('data_nascimento') or None
+    if birth is not None and parse_date(str(birth)) is None:
+        raise ValueError(f'data de nascimento inválida: {birth!r}')
+    return {
+        'user': {
+            'username': username,
+            'email': text_value(row, 'email'),
+            'first_name': text_value(row, 'first_name'),
+            'last_name': text_value(row, 'last_name'),
+            'password': _clean_password(text_value(row, 'password'), hash_plaintext),
+        },
+        'cliente': {
+            'cpf': text_value(row, 'cpf') or None,
+            'telefone': text_value(row, 'telefone') or None,
+            'data_nascimento': parse_date(str(birth)) if birth else None,
+        },
+    }
+
+
+def import_users(rows, batch_size=1000, hash_plaintext=False):
+    """Cria usuários novos (username já existente é reportado como erro)."""
+    result = ImportResult()
+
+    line = 0
+    for batch in batches(rows, batch_size):
+        cleaned = {}
+        for row in batch:
+            line += 1
+            try:
+                data = _clean_user(row, hash_plaintext)
+            except (TypeError, ValueError) as exc:
+                result.error(line, str(exc))
+                continue
+            username = data['user']['username']
+            if username in cleaned:
+                result.error(line, f'username repetido no arquivo: {username}')
+                continue
+            cleaned[username] = (line, data)
+
+        existing = set(User.objects.filter(username__in=cleaned).values_list('username', flat=True))
+        cpfs = [data['cliente']['cpf'] for _, data in cleaned.values() if data['cliente']['cpf']]
+        taken_cpfs = set(Cliente.all_objects.filter(cpf__in=cpfs).values_list('cpf', flat=True))
+        seen_cpfs = set()
+        for username, (row_line, data) in list(cleaned.items()):
+            cpf = data['cliente']['cpf']
+            if username in existing:
+                result.error(row_line, f'username já cadastrado: {username}')
+            elif cpf and (cpf in taken_cpfs or cpf in seen_cpfs):
+                result.error(row_line, f'CPF já cadastrado: {cpf}')
+            else:
+                seen_cpfs.add(cpf)
+                continue
+            del cleaned[username]
+
+        if not cleaned:
+            continue
+
+        with transaction.atomic():
+            users = User.objects.bulk_create([User(**data['user']) for _, data in cleaned.values()])
+            user_ids = {user.username: user.pk for user in users}
+            if None in user_ids.values():
+                # bancos que não devolvem o pk no bulk_create: busca pelo username
+                user_ids = dict(User.objects.filter(username__in=cleaned).values_list('username', 'id'))
+            clientes = Cliente.objects.bulk_create([
+                Cliente(user_id=user_ids[username], **data['cliente'])
+                for username, (_, data) in cleaned.items()
+            ])
+            if any(cliente.pk is None for cliente in clientes):
+                clientes = Cliente.objects.filter(user_id__in=user_ids.values()).only('id')
+            Cart.objects.bulk_create([Cart(cliente_id=cliente.pk) for cliente in clientes])
+
+        result.created += len(cleaned)
+    return result
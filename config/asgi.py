@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# rotas, serializers e schema prontos antes do fork/do primeiro request (app/core/warmup.py)
+from app.core.warmup import warm_up_on_boot  # noqa: E402
+
+warm_up_on_boot()
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 
 from pathlib import Path
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -48,6 +49,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # primeiro da lista para medir o request inteiro (app/core/metrics.py)
+    'app.core.metrics.MetricsMiddleware',
+    # antes de quem lê ou escreve o corpo da resposta
+    'app.core.compression.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -65,30 +70,96 @@ CORS_ALLOWED_ORIGINS = env.list(
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'app.core.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 
     #content negotiation
     #formatos suportados para as respostas
+    # JSON via orjson (app/core/renderers.py); XML e YAML são importados só quando pedidos
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework_xml.renderers.XMLRenderer', #XML
-        'rest_framework_yaml.renderers.YAMLRenderer', #YAML
+        'app.core.renderers.FastJSONRenderer',
+        'app.core.renderers.LazyXMLRenderer', #XML
+        'app.core.renderers.LazyYAMLRenderer', #YAML
     ),
 
     #formatos suportados para entrada 
     'DEFAULT_PARSER_CLASSES': (
-        'rest_framework.parsers.JSONParser',
-        'rest_framework_xml.parsers.XMLParser', #XML
-        'rest_framework_yaml.parsers.YAMLParser', #YAML
+        'app.core.parsers.FastJSONParser',
+        'app.core.parsers.LazyXMLParser', #XML
+        'app.core.parsers.LazyYAMLParser', #YAML
     ),
 
 }
 
-REST_FRAMEWORK['DEFAULT_PAGINATION_CLASS'] = 'rest_framework.pagination.PageNumberPagination'
+REST_FRAMEWORK['DEFAULT_PAGINATION_CLASS'] = 'app.api.v1.pagination.CountedPageNumberPagination'
 REST_FRAMEWORK['PAGE_SIZE'] = 10
 
+# Cache
+# Em produção aponte 'default' para um cache compartilhado (Redis/Memcached);
+# o LocMem serve de substituto local.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'api-ecommerce',
+    }
+}
+
+# cache de leitura do catálogo (produtos e categorias), ver app/core/cache.py
+CATALOG_CACHE = {
+    'ENABLED': env.bool('CATALOG_CACHE_ENABLED', default=True),
+    'LOCAL_MAX_ENTRIES': env.int('CATALOG_CACHE_LOCAL_MAX_ENTRIES', default=1024),
+    # alias em CACHES para o nível compartilhado (e para a versão); vazio = só o LRU local
+    'SHARED_ALIAS': env('CATALOG_CACHE_SHARED_ALIAS', default='default') or None,
+    # sem um backend compartilhado (Redis/Memcached) o cache só liga com um processo só
+    'SINGLE_PROCESS': env.bool('CATALOG_CACHE_SINGLE_PROCESS', default=DEBUG),
+    'TIMEOUT': env.int('CATALOG_CACHE_TIMEOUT', default=300),
+}
+
+# list/retrieve de produtos, categorias e carrinhos via .values() (app/core/fastread.py)
+FAST_READ_ENABLED = env.bool('FAST_READ_ENABLED', default=True)
+
+# Pré-aquecimento no boot do worker (config/wsgi.py e config/asgi.py, ver app/core/warmup.py)
+WARM_UP_ON_BOOT = env.bool('WARM_UP_ON_BOOT', default=True)
+# gc.freeze() depois do pré-aquecimento: 'fork' (antes do fork de um servidor com
+# preload), 'always' (no boot) ou 'never'
+WARM_UP_GC_FREEZE = env.str('WARM_UP_GC_FREEZE', default='fork')
+
+# Respostas a partir deste tamanho (bytes) são comprimidas com gzip se o cliente aceitar
+COMPRESSION_MIN_LENGTH = env.int('COMPRESSION_MIN_LENGTH', default=1024)
+
+# métricas por view: Server-Timing, histogramas em /metrics e orçamento de queries (app/core/metrics.py)
+METRICS = {
+    'ENABLED': env.bool('METRICS_ENABLED', default=True),
+    # fração dos requests com detalhamento por fase e header Server-Timing
+    'SAMPLE_RATE': env.float('METRICS_SAMPLE_RATE', default=0.1),
+    # header Server-Timing nos requests amostrados (expõe os tempos a qualquer cliente)
+    'SERVER_TIMING': env.bool('METRICS_SERVER_TIMING', default=False),
+    # requests com mais queries que isso são sinalizados (header X-Query-Budget, log e contador)
+    'QUERY_BUDGET': env.int('METRICS_QUERY_BUDGET', default=20),
+    # /metrics aceita "Authorization: Bearer <token>"; sem token, só usuários staff (sessão)
+    'TOKEN': env('METRICS_TOKEN', default=''),
+}
+
+# TTL (s) do snapshot do usuário usado pela autenticação JWT (app/core/authentication.py)
+AUTH_USER_CACHE_TTL = env.int('AUTH_USER_CACHE_TTL', default=60)
+# alias em CACHES dos snapshots; precisa ser compartilhado (Redis/Memcached) para a
+# revogação valer em todos os workers, senão o usuário vem do banco a cada request
+AUTH_USER_CACHE_ALIAS = env('AUTH_USER_CACHE_ALIAS', default='default')
+AUTH_USER_CACHE_SINGLE_PROCESS = env.bool('AUTH_USER_CACHE_SINGLE_PROCESS', default=DEBUG)
+
+# acima deste nº de linhas (estimado pelo planner do Postgres) o admin mostra a estimativa em vez do COUNT(*)
+ADMIN_ESTIMATED_COUNT_THRESHOLD = env.int('ADMIN_ESTIMATED_COUNT_THRESHOLD', default=10000)
+
+# janela de sobreposição (s) da marca d'água dos rollups de vendas (app/reports.py)
+SALES_ROLLUP_OVERLAP_SECONDS = env.int('SALES_ROLLUP_OVERLAP_SECONDS', default=300)
+
+# tempo máximo esperando lock de estoque no checkout antes de responder 409
+CHECKOUT_LOCK_TIMEOUT_MS = env.int('CHECKOUT_LOCK_TIMEOUT_MS', default=2000)
+
+# Schema OpenAPI servido em /api/schema/, gerado por `manage.py build_schema` (app/core/openapi.py)
+OPENAPI_SCHEMA_FILE = BASE_DIR / 'schema.yml'
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Ecommerce api',
     'DESCRIPTION': 'Api to help ecommerce owners',
@@ -126,11 +197,37 @@ DATABASES = {
         'NAME': env("DB_NAME"),
         'USER': env("DB_USER"),
         'PASSWORD': env("DB_PASSWORD"),
-        'HOST': 'localhost',
-        'PORT': '5432',
+        'HOST': env("DB_HOST", default='localhost'),
+        'PORT': env("DB_PORT", default='5432'),
+        'OPTIONS': {
+            # tempo máximo (s) para abrir uma conexão nova
+            'connect_timeout': env.int('DB_CONNECT_TIMEOUT', default=5),
+        },
     }
 }
 
+# Reaproveitamento de conexões (DB_POOL_MODE):
+#   none        uma conexão nova por request (comportamento antigo)
+#   persistent  conexão mantida por thread por DB_CONN_MAX_AGE segundos, com health check (psycopg2 ou 3)
+#   pool        pool do psycopg 3 por processo: requer `pip install "psycopg[binary,pool]"`;
+#               é o modo indicado para ASGI. Os tamanhos valem por worker: workers x DB_POOL_MAX_SIZE
+#               precisa caber no max_connections do Postgres.
+DB_POOL_MODE = env('DB_POOL_MODE', default='persistent')
+if DB_POOL_MODE == 'persistent':
+    DATABASES['default']['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=60)
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+elif DB_POOL_MODE == 'pool':
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+        'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+        # tempo máximo (s) esperando uma conexão livre antes de falhar
+        'timeout': env.float('DB_POOL_TIMEOUT', default=5.0),
+        'max_idle': env.float('DB_POOL_MAX_IDLE', default=300.0),
+        'max_lifetime': env.float('DB_POOL_MAX_LIFETIME', default=1800.0),
+    }
+elif DB_POOL_MODE != 'none':
+    raise ImproperlyConfigured(f'DB_POOL_MODE inválido: {DB_POOL_MODE!r} (use none, persistent ou pool)')
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
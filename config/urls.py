@@ -1,11 +1,18 @@
 
 from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
 from django.http import JsonResponse
 from .router.api import api_urls
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 from app.api.v1.viewsets import MyTokenObtainPairView
+from app.core.openapi import SchemaView
+from app.core.metrics import metrics_view
+
+
+# em DEBUG as docs leem o schema ao vivo (mudanças aparecem sem rodar o build_schema)
+SCHEMA_URL_NAME = 'schema-live' if settings.DEBUG else 'schema'
 
 
 def welcome_view(request):
@@ -15,6 +22,7 @@ def welcome_view(request):
 urlpatterns = [
     path('', welcome_view, name='welcome'),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
 
     # adicionamos o arquivo do .router para que ele direcione a api para a versão desejada
     path('api/', include((api_urls, 'api'), namespace="api")),
@@ -22,10 +30,14 @@ urlpatterns = [
     path('api/token/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'), # 👈 ALTERADO
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
-    # Docs
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    # Docs: o schema.yml gerado no build (manage.py build_schema), servido da memória
+    path('api/schema/', SchemaView.as_view(), name='schema'),
     path('api/docs/',
-         SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+         SpectacularSwaggerView.as_view(url_name=SCHEMA_URL_NAME), name='swagger-ui'),
     path('api/redoc/',
-         SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
+         SpectacularRedocView.as_view(url_name=SCHEMA_URL_NAME), name='redoc'),
 ]
+
+if settings.DEBUG:
+    # introspecção a cada request, só para desenvolvimento
+    urlpatterns.append(path('api/schema/live/', SpectacularAPIView.as_view(), name='schema-live'))
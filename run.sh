@@ -39,8 +39,15 @@ echo "Running migrations..."
 python manage.py makemigrations app
 python manage.py migrate
 
-echo "Running mock"
-python manage.py loaddata mock_data.json
+echo "Loading data"
+if [ "${SEED_DATA:-0}" = "1" ]; then
+    # opcional (SEED_DATA=1 ./run.sh): dados sintéticos determinísticos em vez do mock
+    # (só na primeira vez; depois o prefixo já existe)
+    python manage.py seed_data || echo "Synthetic data already present"
+else
+    # app/fixtures/mock_data.json (o loaddata procura nas pastas fixtures dos apps)
+    python manage.py loaddata mock_data.json
+fi
 
 echo "👤 Checking for superuser..."
 python manage.py shell -c "